@@ -8,25 +8,41 @@
 # or in the "LICENSE.txt" file accompanying this file. This file is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES
 # OR CONDITIONS OF ANY KIND, express or implied. See the License for the specific language governing permissions and
 # limitations under the License.
+import datetime
 import functools
+import itertools
 import json
 import os
 import re
 import shlex
 import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 
 import boto3
 import botocore
 import requests
-import yaml
-from flask import abort, redirect, request, Blueprint
+from flask import abort, redirect, request, stream_with_context, Blueprint, Response
 from jose import jwt
 
+from api.aws.clients import get_client
+from api.aws.credentials import CachedCredentialsProvider, assumed_role_credentials, default_credentials
+from api.aws.secrets import LazySecret
+from api.aws.sessions import HttpSessionPool
+from api.caching import SnapshotStore, TTLCache, cacheable_json_response
+from api.clusters import ClusterConfig, config_version
 from api.exception.exceptions import RefreshTokenError
+from api.metrics import timed
+from api.pricing import Ec2PriceIndex, on_demand_price
 from api.pcm_globals import set_auth_cookies_in_context, logger, auth_cookies
 from api.security.csrf.constants import CSRF_COOKIE_NAME
 from api.security.csrf.csrf import csrf_needed
-from api.utils import disable_auth, read_and_delete_ssm_output_from_cloudwatch
+from api.security.jwks import JwksKeyStore
+from api.security.token_cache import VerifiedTokenCache
+from api.slurm import NDJSON_MIMETYPE, SacctCursor, expand_job_expressions, parse_scancel_output, parse_scontrol_jobs, \
+    parse_squeue_jobs, sacct_page_command, scancel_command, stream_accounting
+from api.ssm import CommandTimeoutError, CommandWaiter, LogStreamCleanup, read_command_output, ssm_output_log_stream
+from api.utils import disable_auth, read_ssm_output_from_cloudwatch, to_iso_timestr
 from api.validation import validated
 from api.validation.schemas import PCProxyArgs, PCProxyBody
 
@@ -41,6 +57,7 @@ OIDC_PROVIDER = os.getenv("OIDC_PROVIDER")
 CLIENT_ID = os.getenv("CLIENT_ID")
 CLIENT_SECRET = os.getenv("CLIENT_SECRET")
 SECRET_ID = os.getenv("SECRET_ID")
+CSRF_FINGERPRINT = os.getenv("CSRF_FINGERPRINT")
 SCOPES_LIST = os.getenv("SCOPES_LIST")
 REGION = os.getenv("AWS_DEFAULT_REGION")
 TOKEN_URL = os.getenv("TOKEN_URL", f"{AUTH_PATH}/oauth2/token")
@@ -50,21 +67,54 @@ JWKS_URL = os.getenv("JWKS_URL")
 AUDIENCE = os.getenv("AUDIENCE")
 USER_ROLES_CLAIM = os.getenv("USER_ROLES_CLAIM", "cognito:groups")
 SSM_LOG_GROUP_NAME = os.getenv("SSM_LOG_GROUP_NAME")
+JWKS_CACHE_TTL = int(os.getenv("JWKS_CACHE_TTL", 60 * 60))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 1024))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", 10))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", 3))
+INSTANCE_TYPES_CACHE_TTL = int(os.getenv("INSTANCE_TYPES_CACHE_TTL", 24 * 60 * 60))
+INSTANCE_TYPES_SNAPSHOT_DIR = os.getenv("INSTANCE_TYPES_SNAPSHOT_DIR")
+INSTANCE_TYPES_BROWSER_MAX_AGE = 60 * 60
+AWS_CONFIG_CACHE_TTL = int(os.getenv("AWS_CONFIG_CACHE_TTL", 60))
+AWS_CONFIG_CALL_TIMEOUT = int(os.getenv("AWS_CONFIG_CALL_TIMEOUT", 20))
+AWS_CONFIG_MAX_WORKERS = int(os.getenv("AWS_CONFIG_MAX_WORKERS", 8))
+SSM_COMMAND_TIMEOUT = 60
+SSM_LOG_STREAM_CLEANUP_DELAY = int(os.getenv("SSM_LOG_STREAM_CLEANUP_DELAY", 30))
+QUEUE_STATUS_MAX_AGE = int(os.getenv("QUEUE_STATUS_MAX_AGE", 10))
+DCV_SESSION_TIMEOUT = 15
+CLUSTER_CONFIG_CACHE_TTL = int(os.getenv("CLUSTER_CONFIG_CACHE_TTL", 24 * 60 * 60))
+EC2_PRICES_CACHE_TTL = int(os.getenv("EC2_PRICES_CACHE_TTL", 7 * 24 * 60 * 60))
+EC2_PRICE_LIST_FILE = os.getenv("EC2_PRICE_LIST_FILE")
+SACCT_STREAM_PAGE_SIZE = 100
+SACCT_STREAM_MAX_DURATION = int(os.getenv("SACCT_STREAM_MAX_DURATION", 20))
 ARG_VERSION="version"
 
-try:
-    if (not USER_POOL_ID or USER_POOL_ID == "") and SECRET_ID:
-        secrets = boto3.client("secretsmanager")
-        secret = json.loads(secrets.get_secret_value(SecretId=SECRET_ID)["SecretString"])
-        USER_POOL_ID = secret.get("userPoolId")
-        CLIENT_ID = secret.get("clientId")
-        CLIENT_SECRET = secret.get("clientSecret")
-except Exception:
-    pass
+# The Cognito settings are read from SECRET_ID, on first use, when they are not set in the environment
+cognito_secret = LazySecret(SECRET_ID if not USER_POOL_ID else None)
 
-if not JWKS_URL:
-    JWKS_URL = os.getenv("JWKS_URL",
-                         f"https://cognito-idp.{REGION}.amazonaws.com/{USER_POOL_ID}/" ".well-known/jwks.json")
+
+def _cognito_setting(env_value, secret_key):
+    return cognito_secret.get(secret_key) if cognito_secret.secret_id else env_value
+
+
+def cognito_user_pool_id():
+    return _cognito_setting(USER_POOL_ID, "userPoolId")
+
+
+def cognito_client_id():
+    return _cognito_setting(CLIENT_ID, "clientId")
+
+
+def cognito_client_secret():
+    return _cognito_setting(CLIENT_SECRET, "clientSecret")
+
+
+def csrf_fingerprint():
+    """ Returns the precomputed CSRF fingerprint, from the environment or from the Cognito secret, if any """
+    return CSRF_FINGERPRINT or (cognito_secret.get("csrfFingerprint") if cognito_secret.secret_id else None)
+
+
+def jwks_url():
+    return JWKS_URL or f"https://cognito-idp.{REGION}.amazonaws.com/{cognito_user_pool_id()}/.well-known/jwks.json"
 
 def create_url_map(url_list):
     url_map = {}
@@ -80,14 +130,31 @@ SITE_URL = os.getenv("SITE_URL", API_BASE_URL_MAPPING.get(DEFAULT_API_VERSION))
 
 
 
+def _fetch_jwks():
+    response = requests.get(jwks_url(), timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+# Shared by all the requests served by this process (and by warm Lambda invocations)
+jwks = JwksKeyStore(_fetch_jwks, ttl=JWKS_CACHE_TTL)
+verified_tokens = VerifiedTokenCache(max_size=TOKEN_CACHE_SIZE)
+
+
 def jwt_decode(token, audience=None, access_token=None):
-    return jwt.decode(
-        token, requests.get(JWKS_URL).json(), audience=audience, access_token=access_token, algorithms=["RS256"]
+    claims = verified_tokens.get(token, audience, access_token)
+    if claims is not None:
+        return claims
+
+    kid = jwt.get_unverified_header(token).get("kid")
+    claims = jwt.decode(
+        token, jwks.get_key(kid), audience=audience, access_token=access_token, algorithms=["RS256"]
     )
+    verified_tokens.put(token, claims, audience, access_token)
+    return claims
 
 
 def setup_api_credentials(role_arn, credential_external_id=None):
-    sts = boto3.client("sts")
+    sts = get_client("sts")
 
     assume_role_kwargs = {
         "RoleArn": role_arn,
@@ -99,6 +166,13 @@ def setup_api_credentials(role_arn, credential_external_id=None):
     assumed_role_object = sts.assume_role(**assume_role_kwargs)
     return assumed_role_object["Credentials"]
 
+# Kept-alive connections to the ParallelCluster API and to S3, shared by all the requests served by this process
+http_sessions = HttpSessionPool(pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=HTTP_MAX_RETRIES)
+
+# Credentials used to sign the ParallelCluster API requests, shared by all the requests served by this process
+api_user_credentials = CachedCredentialsProvider(lambda: assumed_role_credentials(lambda: setup_api_credentials(API_USER_ROLE)))
+api_default_credentials = CachedCredentialsProvider(default_credentials)
+
 
 def sigv4_request(method, host, path, params={}, headers={}, body=None):
     "Make a signed request to an api-gateway hosting an AWS ParallelCluster API."
@@ -108,43 +182,27 @@ def sigv4_request(method, host, path, params={}, headers={}, body=None):
     request_parameters = "&".join([f"{k}={v}" for k, v in (params or {}).items()])
     url = f"{host}{path}?{request_parameters}"
 
-    if API_USER_ROLE:
-        sts_credentials = setup_api_credentials(API_USER_ROLE)
-        session = boto3.session.Session(
-            aws_access_key_id=sts_credentials["AccessKeyId"],
-            aws_secret_access_key=sts_credentials["SecretAccessKey"],
-            aws_session_token=sts_credentials["SessionToken"]
-        )
-    else:
-        session = boto3.session.Session()
+    credentials = api_user_credentials.get() if API_USER_ROLE else api_default_credentials.get()
 
     body_data = json.dumps(body) if body else None
     new_request = botocore.awsrequest.AWSRequest(method=method, url=url, data=body_data)
-    botocore.auth.SigV4Auth(session.get_credentials(), "execute-api", region).add_auth(new_request)
+    botocore.auth.SigV4Auth(credentials, "execute-api", region).add_auth(new_request)
     boto_request = new_request.prepare()
 
-    req_call = {
-        "POST": requests.post,
-        "GET": requests.get,
-        "PUT": requests.put,
-        "PATCH": requests.patch,
-        "DELETE": requests.delete,
-    }.get(method)
-
     if body:
         boto_request.headers["content-type"] = "application/json"
 
     for k, val in headers.items():
         boto_request.headers[k] = val
 
-    return req_call(boto_request.url, data=body_data, headers=boto_request.headers, timeout=30)
+    return http_sessions.request(method, boto_request.url, data=body_data, headers=boto_request.headers, timeout=30)
 
 def refresh_tokens(refresh_token):
-    auth = requests.auth.HTTPBasicAuth(CLIENT_ID, CLIENT_SECRET)
+    auth = requests.auth.HTTPBasicAuth(cognito_client_id(), cognito_client_secret())
 
     resp = requests.post(
         TOKEN_URL,
-        data={"grant_type": 'refresh_token', "refresh_token": refresh_token, "client_id": CLIENT_ID},
+        data={"grant_type": 'refresh_token', "refresh_token": refresh_token, "client_id": cognito_client_id()},
         auth=auth,
         headers={"Content-Type": "application/x-www-form-urlencoded"},
     )
@@ -217,18 +275,14 @@ def get_version():
 def get_app_config():
   return {
     "auth_url": AUTH_URL,
-    "client_id": CLIENT_ID,
+    "client_id": cognito_client_id(),
     "oidc_provider": OIDC_PROVIDER,
     "scopes": get_scopes_list(),
     "redirect_uri": get_redirect_uri()
   }
 
 def ec2_action():
-    if request.args.get("region"):
-        config = botocore.config.Config(region_name=request.args.get("region"))
-        ec2 = boto3.client("ec2", config=config)
-    else:
-        ec2 = boto3.client("ec2")
+    ec2 = get_client("ec2", request.args.get("region"))
 
     try:
         instance_id = request.args.get("instance_id")
@@ -246,7 +300,17 @@ def ec2_action():
     return ret
 
 
-def get_cluster_config_text(cluster_name, region=None):
+# Parsed cluster configurations, keyed by the version of the configuration reported by describe-cluster
+cluster_configs = TTLCache(ttl=CLUSTER_CONFIG_CACHE_TTL, max_size=128)
+
+
+def _download_cluster_config(url):
+    configuration = http_sessions.get(url, timeout=30)
+    configuration.raise_for_status()
+    return ClusterConfig(configuration.text)
+
+
+def get_parsed_cluster_config(cluster_name, region=None):
     url = f"/v3/clusters/{cluster_name}"
     if region:
         info_resp = sigv4_request("GET", get_base_url(request), url, params={"region": region})
@@ -256,61 +320,70 @@ def get_cluster_config_text(cluster_name, region=None):
         abort(info_resp.status_code)
 
     cluster_info = info_resp.json()
-    configuration = requests.get(cluster_info["clusterConfiguration"]["url"])
-    return configuration.text
+    return cluster_configs.get(
+        (cluster_name, region, config_version(cluster_info)),
+        lambda: _download_cluster_config(cluster_info["clusterConfiguration"]["url"]),
+    )
+
+
+def get_cluster_config_text(cluster_name, region=None):
+    return get_parsed_cluster_config(cluster_name, region).text
 
 
 def get_cluster_config():
     return get_cluster_config_text(request.args.get("cluster_name"), request.args.get("region"))
 
 
-def ssm_command(region, instance_id, user, run_command):
-    # working_directory |= f"/home/{user}"
-    start = time.time()
+# Shared by ssm_command and get_dcv_session, it keeps count of the polls performed by every command
+ssm_waiter = CommandWaiter()
+
+# Output log streams are deleted in the background once the SSM agent has uploaded them
+log_stream_cleanup = LogStreamCleanup(lambda region: get_client("logs", region), delay=SSM_LOG_STREAM_CLEANUP_DELAY)
+
+
+def _ssm_timeout(default):
+    """ Deadline in seconds for the SSM command of the current request, as requested by the client """
+    return request.args.get("timeout", default=default, type=int)
 
-    if region:
-        config = botocore.config.Config(region_name=region)
-        ssm = boto3.client("ssm", config=config)
-    else:
-        ssm = boto3.client("ssm")
+
+def ssm_command(region, instance_id, user, run_command, timeout=SSM_COMMAND_TIMEOUT):
+    # working_directory |= f"/home/{user}"
+    ssm = get_client("ssm", region)
 
     command = f"runuser -l {shlex.quote(user)} -c {shlex.quote(run_command)}"
 
-    ssm_resp = ssm.send_command(
-        InstanceIds=[instance_id],
-        DocumentName="AWS-RunShellScript",
-        Comment=f"Run ssm command.",
-        Parameters={"commands": [command]},
-        CloudWatchOutputConfig={
-            'CloudWatchLogGroupName': SSM_LOG_GROUP_NAME,
-            'CloudWatchOutputEnabled': True
-        },
-    )
+    with timed("SsmSendCommand"):
+        ssm_resp = ssm.send_command(
+            InstanceIds=[instance_id],
+            DocumentName="AWS-RunShellScript",
+            Comment=f"Run ssm command.",
+            Parameters={"commands": [command]},
+            CloudWatchOutputConfig={
+                'CloudWatchLogGroupName': SSM_LOG_GROUP_NAME,
+                'CloudWatchOutputEnabled': True
+            },
+        )
 
     command_id = ssm_resp["Command"]["CommandId"]
 
     logger.info(f"Submitted SSM command {command_id}")
 
-    # Wait for command to complete
-    time.sleep(0.75)
-    while time.time() - start < 60:
-        status = ssm.get_command_invocation(CommandId=command_id, InstanceId=instance_id)
-        if status["Status"] != "InProgress":
-            break
-        time.sleep(0.75)
-
-    if time.time() - start > 60:
-        raise Exception("Timed out waiting for command to complete.")
+    with timed("SsmWaitCommand"):
+        status, polls = ssm_waiter.wait(ssm, command_id, instance_id, timeout)
+    logger.info(f"SSM command {command_id} completed with status {status['Status']} after {polls} polls",
+                extra={"command_id": command_id, "ssm_polls": polls})
 
     if status["Status"] != "Success":
         raise Exception(status["StandardErrorContent"])
 
-    output = read_and_delete_ssm_output_from_cloudwatch(
-        region=region,
-        log_group_name=SSM_LOG_GROUP_NAME,
-        command_id=command_id,
-        instance_id=instance_id,
-    )
+    with timed("CloudWatchLogsReadOutput"):
+        output = read_command_output(status, lambda: read_ssm_output_from_cloudwatch(
+            region=region,
+            log_group_name=SSM_LOG_GROUP_NAME,
+            command_id=command_id,
+            instance_id=instance_id,
+        ))
+    log_stream_cleanup.schedule(region, SSM_LOG_GROUP_NAME, ssm_output_log_stream(command_id, instance_id))
 
     return output
 
@@ -324,43 +397,39 @@ def _get_instance_types_for_compute_resource(compute_resource):
         raise Exception("Cannot find instance types for compute resource: %s".format(compute_resource))
 
 
+def _fetch_ec2_price(key):
+    pricing_filters = [
+        {"Field": "tenancy", "Value": key.tenancy, "Type": "TERM_MATCH"},
+        {"Field": "instanceType", "Value": key.instance_type, "Type": "TERM_MATCH"},
+        {"Field": "operatingSystem", "Value": key.operating_system, "Type": "TERM_MATCH"},
+        {"Field": "regionCode", "Value": key.region, "Type": "TERM_MATCH"},
+        {"Field": "preInstalledSw", "Value": "NA", "Type": "TERM_MATCH"},
+        {"Field": "capacityStatus", "Value": "Used", "Type": "TERM_MATCH"},
+    ]
+
+    # Pricing endpoint only available from "us-east-1" region
+    pricing = get_client("pricing", "us-east-1")
+    prices = pricing.get_products(ServiceCode="AmazonEC2", Filters=pricing_filters)["PriceList"]
+    return on_demand_price(json.loads(prices[0])) if prices else None
+
+
+# On-demand prices, shared by price_estimate and sacct
+ec2_prices = Ec2PriceIndex(_fetch_ec2_price, ttl=EC2_PRICES_CACHE_TTL, seed_file=EC2_PRICE_LIST_FILE)
+
+
 def _price_estimate(cluster_name, region, queue_name):
-    config_text = get_cluster_config_text(cluster_name, region)
-    config_data = yaml.safe_load(config_text)
-    queues = {q["Name"]: q for q in config_data["Scheduling"]["SlurmQueues"]}
-    queue = queues[queue_name]
-
-    if len(queue["ComputeResources"]) == 1:
-        instance_types = _get_instance_types_for_compute_resource(compute_resource=queue["ComputeResources"][0])
-        if len(instance_types) > 1:
-            return {"message": "Cost estimate not available for compute resources with multiple instance types."}, 400
-        instance_type = instance_types[0]
-        pricing_filters = [
-            {"Field": "tenancy", "Value": "shared", "Type": "TERM_MATCH"},
-            {"Field": "instanceType", "Value": instance_type, "Type": "TERM_MATCH"},
-            {"Field": "operatingSystem", "Value": "Linux", "Type": "TERM_MATCH"},
-            {"Field": "regionCode", "Value": region, "Type": "TERM_MATCH"},
-            {"Field": "preInstalledSw", "Value": "NA", "Type": "TERM_MATCH"},
-            {"Field": "capacityStatus", "Value": "Used", "Type": "TERM_MATCH"},
-        ]
-
-        # Pricing endpoint only available from "us-east-1" region
-        pricing = boto3.client("pricing", region_name="us-east-1")
-        prices = pricing.get_products(ServiceCode="AmazonEC2", Filters=pricing_filters)["PriceList"]
-        prices = list(map(json.loads, prices))
-        on_demand_prices = list(prices[0]["terms"]["OnDemand"].values())
-        price_guess = float(list(on_demand_prices[0]["priceDimensions"].values())[0]["pricePerUnit"]["USD"])
-        price_guess = None if price_guess != price_guess else price_guess  # check for NaN
-        return price_guess
-    else:
-        return {"message": "Cost estimate not available for queues with multiple resource types."}, 400
+    compute_resources = get_parsed_cluster_config(cluster_name, region).compute_resources(queue_name)
+    return ec2_prices.price_range(region, [
+        (_get_instance_types_for_compute_resource(compute_resource), compute_resource.get("MaxCount"))
+        for compute_resource in compute_resources
+    ])
 
 
 def price_estimate():
-    price_guess = _price_estimate(
+    price_range = _price_estimate(
         request.args.get("cluster_name"), request.args.get("region"), request.args.get("queue_name")
     )
-    return price_guess if isinstance(price_guess, tuple) else {"estimate": price_guess}
+    return price_range._asdict()
 
 
 def sacct():
@@ -381,19 +450,19 @@ def sacct():
             user,
             f"sacct {sacct_args} --json "
             + "| jq -c .jobs[0:120]\\|\\map\\({name,user,partition,state,job_id,exit_code\\}\\)",
+            timeout=_ssm_timeout(SSM_COMMAND_TIMEOUT),
             )
         if type(accounting) is tuple:
             return accounting
     else:
 
-        accounting = ssm_command(region, instance_id, user, f"sacct {sacct_args} --json | jq -c .jobs")
+        accounting = ssm_command(region, instance_id, user, f"sacct {sacct_args} --json | jq -c .jobs",
+                                 timeout=_ssm_timeout(SSM_COMMAND_TIMEOUT))
         if isinstance(accounting, tuple):
             return accounting
         # Try to retrieve relevant cost information
         queue_name = json.loads(accounting)[0]["partition"]
-        _price_guess = _price_estimate(cluster_name, region, queue_name)
-        if not isinstance(_price_guess, tuple):
-            price_guess = _price_guess
+        price_guess = _price_estimate(cluster_name, region, queue_name).estimate
 
     if accounting == "":
         return {"jobs": []}
@@ -403,6 +472,25 @@ def sacct():
     return accounting_ret
 
 
+def sacct_stream():
+    user = request.args.get("user", "ec2-user")
+    instance_id = request.args.get("instance_id")
+    region = request.args.get("region")
+    page_size = request.args.get("page_size", default=SACCT_STREAM_PAGE_SIZE, type=int)
+    cursor = SacctCursor.parse(request.args.get("cursor"))
+    timeout = _ssm_timeout(SSM_COMMAND_TIMEOUT)
+    filters = request.json or {}
+
+    def run_page(page_cursor):
+        return ssm_command(region, instance_id, user, sacct_page_command(filters, page_cursor, page_size),
+                           timeout=timeout)
+
+    lines = stream_accounting(run_page, cursor, page_size, SACCT_STREAM_MAX_DURATION)
+    # the first page is fetched before responding, so that its errors get a proper status code
+    first_line = next(lines)
+    return Response(stream_with_context(itertools.chain([first_line], lines)), mimetype=NDJSON_MIMETYPE)
+
+
 def scontrol_job():
     user = request.args.get("user", "ec2-user")
     instance_id = request.args.get("instance_id")
@@ -411,51 +499,95 @@ def scontrol_job():
     if not job_id:
         return {"message": "You must specify a job id."}, 400
 
-    job_data = (
-        ssm_command(request.args.get("region"), instance_id, user, f"scontrol show job {shlex.quote(job_id)} -o").strip().split(" ")
-    )
-    if isinstance(job_data, tuple):
-        return job_data
-
-    kvs = [jd.split("=", 1) for jd in job_data]
-    job_info = {k: v for k, v in kvs}
-    return job_info
+    output = ssm_command(request.args.get("region"), instance_id, user, f"scontrol show job {shlex.quote(job_id)} -o",
+                         timeout=_ssm_timeout(SSM_COMMAND_TIMEOUT))
+    jobs = parse_scontrol_jobs(output)
+    if not jobs:
+        return {"message": f"Job {job_id} not found."}, 404
+    return jobs[0].to_dict()
 
 
-def queue_status():
+def scontrol_jobs():
     user = request.args.get("user", "ec2-user")
     instance_id = request.args.get("instance_id")
+    job_ids = request.args.get("job_ids", "").split(",")
+
+    # a single round-trip for all the jobs, the ones no longer known by slurmctld are reported as missing
+    run_command = "; ".join(f"scontrol show job {shlex.quote(job_id)} -o 2>/dev/null" for job_id in job_ids) + "; true"
+    jobs = parse_scontrol_jobs(ssm_command(request.args.get("region"), instance_id, user, run_command,
+                                           timeout=_ssm_timeout(SSM_COMMAND_TIMEOUT)))
+    found = set()
+    for job in jobs:
+        found.update({str(job.job_id), str(job.array_job_id), f"{job.array_job_id}_{job.fields.get('ArrayTaskId')}"})
+    return {
+        "jobs": [job.to_dict() for job in jobs],
+        "missing": [job_id for job_id in job_ids if job_id not in found],
+    }
+
+
+# One squeue snapshot per head node, shared by all the viewers of the Scheduling page
+queue_snapshots = TTLCache(ttl=QUEUE_STATUS_MAX_AGE, max_size=256)
+
 
+def _queue_snapshot(region, instance_id, user, timeout):
     jobs = ssm_command(
-        request.args.get("region"),
+        region,
         instance_id,
         user,
         "squeue --json | jq .jobs\\|\\map\\({name,nodes,partition,job_state,job_id,time\\}\\)",
+        timeout=timeout,
     )
+    return {
+        "jobs": [job.to_dict() for job in parse_squeue_jobs(jobs)],
+        "snapshot_time": to_iso_timestr(datetime.datetime.now(datetime.timezone.utc)),
+    }
+
+
+def queue_status():
+    user = request.args.get("user", "ec2-user")
+    instance_id = request.args.get("instance_id")
+    region = request.args.get("region")
+    timeout = _ssm_timeout(SSM_COMMAND_TIMEOUT)
 
-    return {"jobs": []} if jobs == "" else {"jobs": json.loads(jobs)}
+    return queue_snapshots.get((region, instance_id, user), lambda: _queue_snapshot(region, instance_id, user, timeout))
 
 
 def cancel_job():
     user = request.args.get("user", "ec2-user")
     instance_id = request.args.get("instance_id")
     job_id = request.args.get("job_id")
-    ssm_command(request.args.get("region"), instance_id, user, f"scancel {shlex.quote(job_id)}")
+    ssm_command(request.args.get("region"), instance_id, user, f"scancel {shlex.quote(job_id)}",
+                timeout=_ssm_timeout(SSM_COMMAND_TIMEOUT))
+    queue_snapshots.invalidate((request.args.get("region"), instance_id, user))
     return {"status": "success"}
 
 
+def cancel_jobs():
+    user = request.args.get("user", "ec2-user")
+    instance_id = request.args.get("instance_id")
+    region = request.args.get("region")
+    job_ids = expand_job_expressions(request.json["job_ids"])
+
+    output = ssm_command(region, instance_id, user, scancel_command(job_ids), timeout=_ssm_timeout(SSM_COMMAND_TIMEOUT))
+    queue_snapshots.invalidate((region, instance_id, user))
+
+    outcomes, errors = parse_scancel_output(job_ids, output)
+    if errors:
+        logger.warning(f"scancel reported errors not attributed to any job: {errors}")
+    return {
+        "status": "success" if all(outcome["status"] == "cancelled" for outcome in outcomes) else "partial",
+        "jobs": outcomes,
+        "errors": errors,
+    }
+
+
 def get_dcv_session():
-    start = time.time()
     user = request.args.get("user", "ec2-user")
     instance_id = request.args.get("instance_id")
     dcv_command = "/opt/parallelcluster/scripts/pcluster_dcv_connect.sh"
     session_directory = f"/home/{user}"
 
-    if request.args.get("region"):
-        config = botocore.config.Config(region_name=request.args.get("region"))
-        ssm = boto3.client("ssm", config=config)
-    else:
-        ssm = boto3.client("ssm")
+    ssm = get_client("ssm", request.args.get("region"))
 
     inner_command = f"{dcv_command} {shlex.quote(session_directory)}"
     command = f"runuser -l {shlex.quote(user)} -c {shlex.quote(inner_command)}"
@@ -469,16 +601,12 @@ def get_dcv_session():
 
     command_id = ssm_resp["Command"]["CommandId"]
 
-    # Wait for command to complete
-    time.sleep(0.75)
-    while time.time() - start < 15:
-        status = ssm.get_command_invocation(CommandId=command_id, InstanceId=instance_id)
-        if status["Status"] != "InProgress":
-            break
-        time.sleep(0.75)
-
-    if time.time() - start > 15:
+    try:
+        status, polls = ssm_waiter.wait(ssm, command_id, instance_id, _ssm_timeout(DCV_SESSION_TIMEOUT))
+    except CommandTimeoutError:
         raise Exception("Timed out waiting for dcv session to start.")
+    logger.info(f"DCV session command {command_id} completed after {polls} polls",
+                extra={"command_id": command_id, "ssm_polls": polls})
 
     if status["Status"] != "Success":
         raise Exception(status["StandardErrorContent"])
@@ -502,87 +630,156 @@ def get_dcv_session():
 
 def get_custom_image_config():
     image_info = sigv4_request("GET", get_base_url(request), f"/v3/images/custom/{request.args.get('image_id')}").json()
-    configuration = requests.get(image_info["imageConfiguration"]["url"])
+    configuration = http_sessions.get(image_info["imageConfiguration"]["url"], timeout=30)
     return configuration.text
 
 
-def get_aws_config():
-    if request.args.get("region"):
-        config = botocore.config.Config(region_name=request.args.get("region"))
-        ec2 = boto3.client("ec2", config=config)
-        fsx = boto3.client("fsx", config=config)
-        efs = boto3.client("efs", config=config)
-    else:
-        ec2 = boto3.client("ec2")
-        fsx = boto3.client("fsx")
-        efs = boto3.client("efs")
+def _describe_all(client, operation, result_key, **kwargs):
+    """ Yields the items of every page of a describe call, so that large accounts are not truncated to the first page """
+    if client.can_paginate(operation):
+        for page in client.get_paginator(operation).paginate(**kwargs):
+            yield from page.get(result_key, [])
+        return
+
+    describe = getattr(client, operation)
+    next_token = None
+    while True:
+        page = describe(**kwargs, NextToken=next_token) if next_token else describe(**kwargs)
+        yield from page.get(result_key, [])
+        next_token = page.get("NextToken")
+        if not next_token:
+            break
+
+
+def _vpc_filters(vpc_id):
+    return {"Filters": [{"Name": "vpc-id", "Values": [vpc_id]}]} if vpc_id else {}
+
+
+def _describe_key_pairs(region):
+    return get_client("ec2", region).describe_key_pairs()["KeyPairs"]
+
+
+def _describe_vpcs(region):
+    return list(_describe_all(get_client("ec2", region), "describe_vpcs", "Vpcs"))
 
-    keypairs = ec2.describe_key_pairs()["KeyPairs"]
-    vpcs = ec2.describe_vpcs()["Vpcs"]
-    subnets = ec2.describe_subnets()["Subnets"]
 
-    security_groups = ec2.describe_security_groups()["SecurityGroups"]
-    security_groups = [{k: sg[k] for k in {"GroupId", "GroupName"}} for sg in security_groups]
+def _describe_subnets(region, vpc_id=None):
+    return list(_describe_all(get_client("ec2", region), "describe_subnets", "Subnets", **_vpc_filters(vpc_id)))
 
+
+def _describe_security_groups(region, vpc_id=None):
+    security_groups = _describe_all(get_client("ec2", region), "describe_security_groups", "SecurityGroups",
+                                    **_vpc_filters(vpc_id))
+    return [{k: sg[k] for k in {"GroupId", "GroupName"}} for sg in security_groups]
+
+
+def _describe_efa_instance_types(region):
     efa_filters = [{"Name": "network-info.efa-supported", "Values": ["true"]}]
-    instance_paginator = ec2.get_paginator("describe_instance_types")
-    efa_instances_paginator = instance_paginator.paginate(Filters=efa_filters)
-    efa_instance_types = []
-    for efa_instances in efa_instances_paginator:
-        efa_instance_types += [e["InstanceType"] for e in efa_instances["InstanceTypes"]]
+    efa_instances = _describe_all(get_client("ec2", region), "describe_instance_types", "InstanceTypes",
+                                  Filters=efa_filters)
+    return [e["InstanceType"] for e in efa_instances]
 
-    fsx_filesystems = []
-    try:
-        fsx_filesystems = fsx.describe_file_systems()["FileSystems"]
-    except:
-        pass
 
-    fsx_volumes = []
-    try:
-        fsx_volumes = list(filter(lambda vol: (vol["Lifecycle"] == "CREATED" or vol["Lifecycle"] == "AVAILABLE"),
-                                  fsx.describe_volumes()["Volumes"]))
-    except:
-        pass
+def _describe_fsx_filesystems(region):
+    return list(_describe_all(get_client("fsx", region), "describe_file_systems", "FileSystems"))
 
-    file_caches = []
-    try:
-        file_caches = list(filter(lambda file_cache: (file_cache["Lifecycle"] == "AVAILABLE"),
-                                  fsx.describe_file_caches()["FileCaches"]))
-    except:
-        pass
 
-    efs_filesystems = []
-    try:
-        efs_filesystems = efs.describe_file_systems()["FileSystems"]
-    except:
-        pass
+def _describe_fsx_volumes(region):
+    return list(filter(lambda vol: (vol["Lifecycle"] == "CREATED" or vol["Lifecycle"] == "AVAILABLE"),
+                       _describe_all(get_client("fsx", region), "describe_volumes", "Volumes")))
+
+
+def _describe_file_caches(region):
+    return list(filter(lambda file_cache: (file_cache["Lifecycle"] == "AVAILABLE"),
+                       _describe_all(get_client("fsx", region), "describe_file_caches", "FileCaches")))
+
+
+def _describe_efs_filesystems(region):
+    return list(_describe_all(get_client("efs", region), "describe_file_systems", "FileSystems"))
+
+
+AwsConfigSource = namedtuple("AwsConfigSource", ["describe", "optional", "vpc_scoped"])
+
+# Resources shown by the cluster wizard: a failure of the optional ones results in an empty list,
+# the vpc scoped ones can be filtered server side on the VPC selected in the wizard
+AWS_CONFIG_SOURCES = {
+    "security_groups": AwsConfigSource(_describe_security_groups, optional=False, vpc_scoped=True),
+    "keypairs": AwsConfigSource(_describe_key_pairs, optional=False, vpc_scoped=False),
+    "vpcs": AwsConfigSource(_describe_vpcs, optional=False, vpc_scoped=False),
+    "subnets": AwsConfigSource(_describe_subnets, optional=False, vpc_scoped=True),
+    "fsx_filesystems": AwsConfigSource(_describe_fsx_filesystems, optional=True, vpc_scoped=False),
+    "fsx_volumes": AwsConfigSource(_describe_fsx_volumes, optional=True, vpc_scoped=False),
+    "file_caches": AwsConfigSource(_describe_file_caches, optional=True, vpc_scoped=False),
+    "efs_filesystems": AwsConfigSource(_describe_efs_filesystems, optional=True, vpc_scoped=False),
+    "efa_instance_types": AwsConfigSource(_describe_efa_instance_types, optional=False, vpc_scoped=False),
+}
+
+aws_config_cache = TTLCache(ttl=AWS_CONFIG_CACHE_TTL, max_size=256)
+aws_config_executor = ThreadPoolExecutor(max_workers=AWS_CONFIG_MAX_WORKERS, thread_name_prefix="aws-config")
+
+
+def _timed_aws_config_source(name, region, vpc_id):
+    source = AWS_CONFIG_SOURCES[name]
+    if source.vpc_scoped and vpc_id:
+        describe = functools.partial(source.describe, region, vpc_id=vpc_id)
+    else:
+        vpc_id = None
+        describe = functools.partial(source.describe, region)
 
-    region = ""
+    start = time.perf_counter()
+    value = aws_config_cache.get((name, region, vpc_id), describe)
+    return value, round((time.perf_counter() - start) * 1000, 1)
+
+
+def _requested_aws_config_sources(resources):
+    if not resources:
+        return list(AWS_CONFIG_SOURCES)
+    names = [name.strip() for name in resources.split(",") if name.strip()]
+    unknown = [name for name in names if name not in AWS_CONFIG_SOURCES]
+    if unknown:
+        raise ValueError(f"Unknown AWS configuration resources: {', '.join(unknown)}")
+    return names
+
+
+def get_aws_config():
+    region = request.args.get("region")
+    vpc_id = request.args.get("vpc_id")
+    futures = {
+        name: aws_config_executor.submit(_timed_aws_config_source, name, region, vpc_id)
+        for name in _requested_aws_config_sources(request.args.get("resources"))
+    }
+
+    deadline = time.monotonic() + AWS_CONFIG_CALL_TIMEOUT
+    aws_config, latencies = {}, {}
+    for name, future in futures.items():
+        try:
+            aws_config[name], latencies[name] = future.result(timeout=max(0, deadline - time.monotonic()))
+        except Exception as e:
+            if not AWS_CONFIG_SOURCES[name].optional:
+                raise
+            logger.warning(f"Unable to retrieve {name} for the AWS configuration: {e!r}")
+            aws_config[name] = []
+
+    aws_config["region"] = ""
     try:
-        region = boto3.Session().region_name
+        aws_config["region"] = boto3.Session().region_name
     except:
         pass
 
-    return {
-        "security_groups": security_groups,
-        "keypairs": keypairs,
-        "vpcs": vpcs,
-        "subnets": subnets,
-        "region": region,
-        "fsx_filesystems": fsx_filesystems,
-        "fsx_volumes": fsx_volumes,
-        "file_caches": file_caches,
-        "efs_filesystems": efs_filesystems,
-        "efa_instance_types": efa_instance_types,
-    }
+    aws_config["latencies"] = latencies
+    return aws_config
 
 
-def get_instance_types():
-    if request.args.get("region"):
-        config = botocore.config.Config(region_name=request.args.get("region"))
-        ec2 = boto3.client("ec2", config=config)
-    else:
-        ec2 = boto3.client("ec2")
+# Instance types only change when AWS launches new ones: stale lists are served for up to a week while revalidating
+instance_types_cache = TTLCache(
+    ttl=INSTANCE_TYPES_CACHE_TTL,
+    stale_ttl=7 * 24 * 60 * 60,
+    snapshots=SnapshotStore(INSTANCE_TYPES_SNAPSHOT_DIR, "instance-types") if INSTANCE_TYPES_SNAPSHOT_DIR else None,
+)
+
+
+def _describe_instance_types(region):
+    ec2 = get_client("ec2", region)
     filters = [{"Name": "current-generation", "Values": ["true"]}]
     instance_paginator = ec2.get_paginator("describe_instance_types")
     instances_paginator = instance_paginator.paginate(Filters=filters)
@@ -598,6 +795,12 @@ def get_instance_types():
     return {"instance_types": sorted(instance_types, key=lambda x: x["InstanceType"])}
 
 
+def get_instance_types():
+    region = request.args.get("region")
+    instance_types = instance_types_cache.get(region, lambda: _describe_instance_types(region))
+    return cacheable_json_response(instance_types, max_age=INSTANCE_TYPES_BROWSER_MAX_AGE)
+
+
 def _get_identity_from_token(decoded, claims):
     identity = {"attributes": {}}
 
@@ -644,7 +847,7 @@ def get_identity():
 
 def _augment_user(cognito, user):
     try:
-        groups_list = cognito.admin_list_groups_for_user(UserPoolId=USER_POOL_ID, Username=user["Username"])
+        groups_list = cognito.admin_list_groups_for_user(UserPoolId=cognito_user_pool_id(), Username=user["Username"])
         user["Groups"] = groups_list["Groups"]
     except Exception as e:
         user["exception"] = str(e)
@@ -653,41 +856,41 @@ def _augment_user(cognito, user):
 
 
 def list_users():
-    cognito = boto3.client("cognito-idp")
-    users = cognito.list_users(UserPoolId=USER_POOL_ID)["Users"]
+    cognito = get_client("cognito-idp")
+    users = cognito.list_users(UserPoolId=cognito_user_pool_id())["Users"]
     return {"users": [_augment_user(cognito, user) for user in users]}
 
 
 def delete_user():
-    cognito = boto3.client("cognito-idp")
+    cognito = get_client("cognito-idp")
     username = request.args.get("username")
-    cognito.admin_delete_user(UserPoolId=USER_POOL_ID, Username=username)
+    cognito.admin_delete_user(UserPoolId=cognito_user_pool_id(), Username=username)
     return {"Username": username}
 
 def create_user():
-    cognito = boto3.client("cognito-idp")
+    cognito = get_client("cognito-idp")
     username = request.json.get("Username")
     phone_number = request.json.get("Phonenumber")
     user_attributes = [{"Name": "email", "Value": username}, {"Name": "email_verified", "Value": "True"}]
     if phone_number:
         user_attributes.append({"Name": "phone_number", "Value": phone_number})
     user = cognito.admin_create_user(
-        UserPoolId=USER_POOL_ID, Username=username, DesiredDeliveryMediums=["EMAIL"], UserAttributes=user_attributes
+        UserPoolId=cognito_user_pool_id(), Username=username, DesiredDeliveryMediums=["EMAIL"], UserAttributes=user_attributes
     ).get("User")
-    cognito.admin_add_user_to_group(UserPoolId=USER_POOL_ID, Username=username, GroupName="admin")
+    cognito.admin_add_user_to_group(UserPoolId=cognito_user_pool_id(), Username=username, GroupName="admin")
     return _augment_user(cognito, user)
 
 def login():
     code = request.args.get("code")
 
     # Convert the authorization code into a jwt
-    auth = requests.auth.HTTPBasicAuth(CLIENT_ID, CLIENT_SECRET)
+    auth = requests.auth.HTTPBasicAuth(cognito_client_id(), cognito_client_secret())
     grant_type = "authorization_code"
 
     url = TOKEN_URL
     code_resp = requests.post(
         url,
-        data={"grant_type": grant_type, "code": code, "client_id": CLIENT_ID, "redirect_uri": get_redirect_uri()},
+        data={"grant_type": grant_type, "code": code, "client_id": cognito_client_id(), "redirect_uri": get_redirect_uri()},
         auth=auth,
         headers={"Content-Type": "application/x-www-form-urlencoded"},
     )
@@ -720,7 +923,7 @@ def logout():
     return resp
 
 def revoke_cognito_refresh_token(refresh_token):
-    auth = requests.auth.HTTPBasicAuth(CLIENT_ID, CLIENT_SECRET)
+    auth = requests.auth.HTTPBasicAuth(cognito_client_id(), cognito_client_secret())
     revoke_resp = requests.post(
         REVOKE_REFRESH_TOKEN_URL,
         data={"token": refresh_token},
@@ -0,0 +1 @@
+from api.assets.static_assets import IndexPage, StaticAssets, is_hashed_asset
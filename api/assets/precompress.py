@@ -0,0 +1,56 @@
+"""
+Writes the `.gz` (and, when brotli is installed, `.br`) variants of the compressible files of a frontend build,
+served by `StaticAssets` to the clients accepting them. Run when building the container image (not the Lambda one,
+where `StaticAssets` sends the files uncompressed):
+
+    python -m api.assets.precompress frontend/public
+"""
+import argparse
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:  # brotli is optional: without it only the gzip variants are written
+    brotli = None
+
+PRECOMPRESS_MIN_SIZE = 1024
+PRECOMPRESSED_FILE_EXTENSIONS = ('.html', '.js', '.css', '.json', '.map', '.svg', '.txt', '.xml', '.ico')
+
+
+def _encoders():
+    encoders = {'.gz': lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        encoders['.br'] = lambda data: brotli.compress(data, quality=11)
+    return encoders
+
+
+def precompress(directory, min_size=PRECOMPRESS_MIN_SIZE):
+    """ Writes the compressed variants smaller than the original files, returning the bytes before and after """
+    encoders = _encoders()
+    bytes_in, bytes_out = 0, 0
+    for root, _dirs, files in os.walk(directory):
+        for name in files:
+            if not name.endswith(PRECOMPRESSED_FILE_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                data = f.read()
+            if len(data) < min_size:
+                continue
+            for extension, encode in encoders.items():
+                compressed = encode(data)
+                if len(compressed) < len(data):
+                    with open(path + extension, 'wb') as f:
+                        f.write(compressed)
+                    bytes_in += len(data)
+                    bytes_out += len(compressed)
+    return bytes_in, bytes_out
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('directory')
+    args = parser.parse_args()
+    compressed_in, compressed_out = precompress(args.directory)
+    print(f'Precompressed {compressed_in} bytes into {compressed_out} bytes')
@@ -0,0 +1,125 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+
+from flask import Flask, Response, abort, request, send_file
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # brotli is optional: without it index.html is only gzipped in memory
+    brotli = None
+
+INDEX_FILE = 'index.html'
+# Next.js build outputs, and files carrying a content hash in their name, never change once deployed
+HASHED_ASSET = re.compile(r'(^|/)_next/static/|[.-][0-9a-f]{8,}\.\w+$')
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+# build-time precompressed variants, by preference order
+PRECOMPRESSED_EXTENSIONS = {'br': '.br', 'gzip': '.gz'}
+
+
+def is_hashed_asset(filename):
+    return HASHED_ASSET.search(filename) is not None
+
+
+class IndexPage(object):
+    """ index.html read once and kept in memory, along with its compressed variants, each with its own ETag """
+
+    def __init__(self, path, compressed=True):
+        with open(path, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()[:32]
+        self.variants = {None: (data, digest)}
+        if not compressed:
+            return
+        self.variants['gzip'] = (gzip.compress(data, compresslevel=9, mtime=0), f'{digest}-gzip')
+        if brotli is not None:
+            self.variants['br'] = (brotli.compress(data), f'{digest}-br')
+
+    def response(self):
+        encoding = request.accept_encodings.best_match([e for e in self.variants if e])
+        data, etag = self.variants[encoding]
+        response = Response(data, mimetype='text/html')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if len(self.variants) > 1:
+            response.vary.add('Accept-Encoding')
+        # the browser revalidates index.html on every load, answered with a 304 until the next deployment
+        response.cache_control.no_cache = True
+        response.set_etag(etag)
+        return response.make_conditional(request)
+
+
+class StaticAssets(object):
+    """
+    Serves the frontend build from the app static folder, replacing the default Flask static view.
+
+    Assets are sent in their build-time precompressed `.br`/`.gz` variant when the client accepts it
+    (see `api.assets.precompress`). Hashed assets are cacheable for a year as immutable. The SPA entry point,
+    index.html, is kept in memory after its first read and served with an ETag.
+    With `compressed=False`, as in Lambda where the REST API has no binary media types to decode compressed
+    bodies, everything is sent with the identity encoding.
+    """
+
+    def __init__(self, app: Flask = None, compressed=True):
+        self.compressed = compressed
+        self.static_folder = None
+        self._index = None
+        self._variants = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        self.static_folder = app.static_folder
+        app.extensions['assets'] = self
+        if 'static' in app.view_functions:
+            app.view_functions['static'] = self.send_asset
+
+    def index(self):
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    path = os.path.join(self.static_folder, INDEX_FILE)
+                    if not os.path.isfile(path):
+                        abort(404)
+                    self._index = IndexPage(path, compressed=self.compressed)
+        return self._index.response()
+
+    def send_asset(self, filename):
+        if filename == INDEX_FILE:
+            return self.index()
+
+        path = safe_join(self.static_folder, filename)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+
+        variants = self.__precompressed_variants(path) if self.compressed else {}
+        encoding = request.accept_encodings.best_match(list(variants)) if variants else None
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        response = send_file(variants.get(encoding, path), mimetype=mimetype, conditional=True)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if variants:
+            response.vary.add('Accept-Encoding')
+        if is_hashed_asset(filename):
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        return response
+
+    def __precompressed_variants(self, path):
+        # the build is immutable, look for the variants of each file once
+        variants = self._variants.get(path)
+        if variants is None:
+            variants = {
+                encoding: path + extension
+                for encoding, extension in PRECOMPRESSED_EXTENSIONS.items()
+                if os.path.isfile(path + extension)
+            }
+            self._variants[path] = variants
+        return variants
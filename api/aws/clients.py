@@ -0,0 +1,90 @@
+import os
+import threading
+import time
+
+import boto3
+import botocore.config
+
+
+class ClientRegistry(object):
+    """
+    Thread-safe registry of boto3 clients keyed by service, region and client config.
+
+    Building a client loads and parses the service model, which costs tens of milliseconds, while
+    boto3 clients are thread-safe and can be shared: each client is built once per process and then
+    reused by all the following requests (and by warm Lambda invocations).
+    Clients are built while holding a lock since the boto3 default session is not thread-safe.
+    """
+
+    def __init__(self):
+        self.created = 0
+        self.reused = 0
+        self.construction_time = 0.0
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def get(self, service, region=None, **config_options):
+        key = self.__key(service, region, config_options)
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = self._clients[key] = self.__create(service, region, config_options)
+                    return client
+
+        with self._lock:
+            self.reused += 1
+        return client
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+
+    def stats(self):
+        """ Returns the number of built and reused clients, and an estimate of the construction time saved in seconds """
+        with self._lock:
+            average_construction_time = self.construction_time / self.created if self.created else 0.0
+            return {
+                'created': self.created,
+                'reused': self.reused,
+                'construction_time': self.construction_time,
+                'construction_time_saved': average_construction_time * self.reused,
+            }
+
+    def __create(self, service, region, config_options):
+        start = time.perf_counter()
+        config = botocore.config.Config(**config_options) if config_options else None
+        client = boto3.client(service, region_name=region, config=config)
+        self.construction_time += time.perf_counter() - start
+        self.created += 1
+        return client
+
+    @staticmethod
+    def __key(service, region, config_options):
+        # clients without an explicit region are bound to the default one at the time they are built
+        region = region or os.getenv('AWS_DEFAULT_REGION')
+        return service, region, repr(sorted(config_options.items()))
+
+
+clients = ClientRegistry()
+
+
+def get_client(service, region=None, **config_options):
+    """ Returns the shared boto3 client for `service` in `region` (the default region if not given) """
+    return clients.get(service, region, **config_options)
+
+
+class LazyClient(object):
+    """
+    Stand-in for the shared boto3 client of `service`, looked up in the registry when one of its methods is
+    first accessed rather than when the module holding it is imported, to keep the Lambda cold start cheap.
+    """
+
+    def __init__(self, service, region=None, **config_options):
+        self.service = service
+        self.region = region
+        self.config_options = config_options
+
+    def __getattr__(self, name):
+        return getattr(get_client(self.service, self.region, **self.config_options), name)
@@ -0,0 +1,55 @@
+import threading
+from datetime import datetime
+
+import botocore.session
+from botocore.credentials import RefreshableCredentials
+
+
+class CachedCredentialsProvider(object):
+    """
+    Lazily loads a set of AWS credentials once and shares them across all the requests served by the
+    process (and across warm Lambda invocations). Refreshable credentials, such as the ones of an
+    assumed role, are renewed by botocore ahead of their expiry.
+    """
+
+    def __init__(self, load_credentials):
+        self.load_credentials = load_credentials
+        self._credentials = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """ Returns a consistent (access key, secret key, token) snapshot of the cached credentials """
+        if self._credentials is None:
+            with self._lock:
+                if self._credentials is None:
+                    self._credentials = self.load_credentials()
+        return self._credentials.get_frozen_credentials()
+
+    def reset(self):
+        with self._lock:
+            self._credentials = None
+
+
+def assumed_role_credentials(assume_role):
+    """
+    Wraps `assume_role`, a callable returning the `Credentials` of an STS AssumeRole response,
+    into credentials refreshed before they expire
+    """
+    def refresh():
+        credentials = assume_role()
+        expiration = credentials['Expiration']
+        return {
+            'access_key': credentials['AccessKeyId'],
+            'secret_key': credentials['SecretAccessKey'],
+            'token': credentials['SessionToken'],
+            'expiry_time': expiration.isoformat() if isinstance(expiration, datetime) else expiration,
+        }
+
+    return RefreshableCredentials.create_from_metadata(
+        metadata=refresh(), refresh_using=refresh, method='sts-assume-role'
+    )
+
+
+def default_credentials():
+    """ Credentials resolved through the default provider chain (env, container or instance role) """
+    return botocore.session.get_session().get_credentials()
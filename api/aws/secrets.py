@@ -0,0 +1,49 @@
+import json
+import logging
+import threading
+
+from api.aws.clients import get_client
+
+_logger = logging.getLogger(__name__)
+
+
+class LazySecret(object):
+    """
+    JSON secret read from Secrets Manager on first use, instead of when the module defining it is imported,
+    so that the cold start of the Lambda does not wait for a call the first request may not need.
+
+    The secret is read once per process: a secret that cannot be read is logged and then treated as empty,
+    like a secret that is not configured (`secret_id` is None).
+    """
+
+    def __init__(self, secret_id, get_secrets_client=lambda: get_client("secretsmanager")):
+        self.secret_id = secret_id
+        self.get_secrets_client = get_secrets_client
+        self._value = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._value is not None
+
+    def get(self, key, default=None):
+        return self.value().get(key, default)
+
+    def value(self):
+        value = self._value
+        if value is None:
+            with self._lock:
+                if self._value is None:
+                    self._value = self.__load()
+                value = self._value
+        return value
+
+    def __load(self):
+        if not self.secret_id:
+            return {}
+        try:
+            secret = self.get_secrets_client().get_secret_value(SecretId=self.secret_id)
+            return json.loads(secret["SecretString"])
+        except Exception as e:
+            _logger.warning("Unable to read secret %s: %s", self.secret_id, e)
+            return {}
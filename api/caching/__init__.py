@@ -0,0 +1,4 @@
+from .responses import cacheable_json_response
+from .single_flight import SingleFlight
+from .snapshots import SnapshotStore
+from .ttl_cache import TTLCache
@@ -0,0 +1,13 @@
+from flask import jsonify, request
+
+
+def cacheable_json_response(payload, max_age):
+    """
+    Builds a JSON response that the browser may keep for `max_age` seconds, carrying an ETag so that
+    a revalidation of an unchanged payload is answered with an empty 304
+    """
+    response = jsonify(payload)
+    response.cache_control.private = True
+    response.cache_control.max_age = max_age
+    response.add_etag()
+    return response.make_conditional(request)
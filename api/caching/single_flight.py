@@ -0,0 +1,41 @@
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight(object):
+    """
+    Runs at most one call per key at a time: concurrent callers of the same key wait for the call
+    in flight and share its result (or its exception) instead of starting their own.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, call):
+        """ Returns the result of `call()`, or of the call in flight for `key`, and whether this caller ran it """
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+
+        if not leader:
+            return future.result(), False
+
+        try:
+            value = call()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._inflight.pop(key, None)
+        future.set_result(value)
+        return value, True
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._inflight
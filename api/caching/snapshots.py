@@ -0,0 +1,43 @@
+import json
+import logging
+import os
+import re
+import tempfile
+
+_logger = logging.getLogger(__name__)
+
+
+class SnapshotStore(object):
+    """ Persists cached values as JSON files in `directory`, one file per cache key """
+
+    def __init__(self, directory, name):
+        self.directory = directory
+        self.name = name
+
+    def path(self, key):
+        safe_key = re.sub(r'[^A-Za-z0-9_-]', '_', str(key or 'default'))
+        return os.path.join(self.directory, f'{self.name}-{safe_key}.json')
+
+    def load(self, key):
+        try:
+            with open(self.path(key)) as snapshot:
+                return json.load(snapshot)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            _logger.warning(f'Unable to read snapshot {self.path(key)}: {e}')
+            return None
+
+    def save(self, key, value):
+        """ Atomically replaces the snapshot of `key`, failures (e.g. read-only file systems) are only logged """
+        tmp_path = None
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as snapshot:
+                json.dump(value, snapshot)
+            os.replace(tmp_path, self.path(key))
+        except Exception as e:
+            _logger.warning(f'Unable to write snapshot {self.path(key)}: {e}')
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
@@ -0,0 +1,121 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from .single_flight import SingleFlight
+
+_logger = logging.getLogger(__name__)
+
+
+class TTLCache(object):
+    """
+    Thread-safe in-process cache whose entries expire `ttl` seconds after being loaded.
+
+    Expired entries younger than `ttl + stale_ttl` are still served while a background thread
+    reloads them (stale-while-revalidate). Loads are single-flight: concurrent callers asking for
+    the same missing key wait for the one in-flight load and share its result (or its exception).
+    When `snapshots` is given, loaded values are persisted there and a cold cache is seeded from
+    them as stale entries, so that they are served straight away and refreshed in the background.
+
+    Loaders may run on a background thread: they must not rely on the Flask request context.
+    """
+
+    def __init__(self, ttl, stale_ttl=0, max_size=None, snapshots=None, clock=time.monotonic):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_size = max_size
+        self.snapshots = snapshots
+        self.clock = clock
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._loads = SingleFlight()
+        self._lock = threading.Lock()
+
+    def get(self, key, load):
+        """ Returns the value cached for `key`, calling `load()` to (re)load it when needed """
+        entry = self.__entry(key)
+        if entry is None and self.snapshots is not None:
+            entry = self.__seed_from_snapshot(key)
+
+        if entry is not None:
+            value, loaded_at = entry
+            age = self.clock() - loaded_at
+            if age < self.ttl:
+                self.__count('hits')
+                return value
+            if age < self.ttl + self.stale_ttl:
+                self.__count('stale_hits')
+                self.__load_in_background(key, load)
+                return value
+
+        self.__count('misses')
+        return self.__load(key, load)
+
+    def age(self, key):
+        """ Returns the number of seconds since the value cached for `key` was loaded, None if not cached """
+        entry = self.__entry(key)
+        return None if entry is None else self.clock() - entry[1]
+
+    def put(self, key, value, loaded_at=None):
+        with self._lock:
+            self._entries[key] = (value, self.clock() if loaded_at is None else loaded_at)
+            self._entries.move_to_end(key)
+            while self.max_size is not None and len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'stale_hits': self.stale_hits, 'misses': self.misses,
+                    'size': len(self._entries)}
+
+    def __entry(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def __count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def __seed_from_snapshot(self, key):
+        value = self.snapshots.load(key)
+        if value is None:
+            return None
+        loaded_at = self.clock() - self.ttl
+        self.put(key, value, loaded_at=loaded_at)
+        return value, loaded_at
+
+    def __load(self, key, load):
+        value, leader = self._loads.do(key, lambda: self.__load_and_put(key, load))
+        if leader and self.snapshots is not None:
+            self.snapshots.save(key, value)
+        return value
+
+    def __load_and_put(self, key, load):
+        value = load()
+        self.put(key, value)
+        return value
+
+    def __load_in_background(self, key, load):
+        if self._loads.in_flight(key):
+            return
+        threading.Thread(target=self.__load_safely, args=(key, load), daemon=True).start()
+
+    def __load_safely(self, key, load):
+        try:
+            self.__load(key, load)
+        except Exception as e:
+            _logger.warning(f'Unable to refresh cache entry {key}, the stale value will be used: {e}')
@@ -0,0 +1 @@
+from .config import ClusterConfig, config_version
@@ -0,0 +1,47 @@
+import threading
+from urllib.parse import parse_qs, urlsplit
+
+import yaml
+
+
+def config_version(cluster_info):
+    """
+    Identifies the configuration of a described cluster: the S3 object and version of the presigned url,
+    whose signature changes on every call, and the last update of the cluster
+    """
+    url = urlsplit(cluster_info["clusterConfiguration"]["url"])
+    version_id = parse_qs(url.query).get("versionId", [""])[0]
+    updated = cluster_info.get("lastUpdatedTime") or cluster_info.get("creationTime") or ""
+    return f"{url.netloc}{url.path}?versionId={version_id}@{updated}"
+
+
+class ClusterConfig(object):
+    """
+    The configuration of a cluster as downloaded, parsed on first access to `data` and indexed by queue name
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self._data = None
+        self._queues = None
+        self._lock = threading.Lock()
+
+    @property
+    def data(self):
+        if self._data is None:
+            with self._lock:
+                if self._data is None:
+                    self._data = yaml.safe_load(self.text) or {}
+        return self._data
+
+    @property
+    def queues(self):
+        if self._queues is None:
+            scheduling = self.data.get("Scheduling") or {}
+            queues = scheduling.get("SlurmQueues") or scheduling.get("AwsBatchQueues") or []
+            self._queues = {queue["Name"]: queue for queue in queues}
+        return self._queues
+
+    def compute_resources(self, queue_name):
+        """ Returns the compute resources of `queue_name`, raises a KeyError if the queue does not exist """
+        return self.queues[queue_name].get("ComputeResources", [])
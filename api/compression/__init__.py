@@ -0,0 +1 @@
+from api.compression.response_compression import ResponseCompression, is_compressible
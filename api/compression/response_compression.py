@@ -0,0 +1,115 @@
+import gzip
+import threading
+
+from flask import Flask, Response, request
+
+try:
+    import brotli
+except ImportError:  # brotli is optional: without it responses are only gzipped
+    brotli = None
+
+COMPRESSION_MIN_SIZE = 1024
+GZIP_LEVEL = 6
+# higher brotli qualities compress a bit better but are far too slow for dynamic responses
+BROTLI_QUALITY = 4
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'application/vnd.api+json',
+    'image/svg+xml',
+}
+
+
+def _gzip(data):
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _brotli(data):
+    return brotli.compress(data, quality=BROTLI_QUALITY)
+
+
+def is_compressible(mimetype):
+    return bool(mimetype) and (mimetype.startswith('text/') or mimetype in COMPRESSIBLE_MIMETYPES)
+
+
+class ResponseCompression(object):
+    """
+    Compresses the text responses larger than `min_size` with the best encoding accepted by the client,
+    brotli (when installed) or gzip.
+
+    Streamed and file responses (e.g. NDJSON streams and static assets) are left untouched.
+    The ETag of a compressed response is made weak, since the bytes differ while the representation does not,
+    so that conditional requests keep being answered with a 304.
+    The bytes saved are accounted by route in `stats()` and, when given, in the metrics `registry`.
+    Not used in Lambda: the adapter returns responses carrying a Content-Encoding as base64-encoded bodies,
+    which the REST API, having no binary media types, would pass as such to the browser.
+    """
+
+    def __init__(self, app: Flask = None, min_size=COMPRESSION_MIN_SIZE, registry=None):
+        self.min_size = min_size
+        self.registry = registry
+        self.encoders = {'gzip': _gzip}
+        if brotli is not None:
+            self.encoders = {'br': _brotli, **self.encoders}
+        self._route_stats = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        app.extensions['compression'] = self
+        app.after_request(self.compress)
+
+    def compress(self, response: Response):
+        if not self.__should_compress(response):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(list(self.encoders))
+        data = response.get_data()
+        if encoding is None or len(data) < self.min_size:
+            return response
+
+        compressed = self.encoders[encoding](data)
+        self.__record(len(data), len(compressed))
+        if len(compressed) >= len(data):
+            return response
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+    def stats(self):
+        """ Returns, by route, the number of compressed responses with their size before and after compression """
+        with self._lock:
+            return {
+                route: {**stats, 'bytes_saved': stats['bytes_in'] - stats['bytes_out']}
+                for route, stats in self._route_stats.items()
+            }
+
+    @staticmethod
+    def __should_compress(response):
+        return (
+            200 <= response.status_code < 300 and response.status_code != 204
+            and request.method != 'HEAD'
+            and not response.direct_passthrough
+            and not response.is_streamed
+            and 'Content-Encoding' not in response.headers
+            and is_compressible(response.mimetype)
+        )
+
+    def __record(self, bytes_in, bytes_out):
+        route = request.url_rule.rule if request.url_rule else request.path
+        bytes_out = min(bytes_in, bytes_out)
+        with self._lock:
+            stats = self._route_stats.setdefault(route, {'responses': 0, 'bytes_in': 0, 'bytes_out': 0})
+            stats['responses'] += 1
+            stats['bytes_in'] += bytes_in
+            stats['bytes_out'] += bytes_out
+        if self.registry is not None:
+            self.registry.response_compressed(route, bytes_in, bytes_out)
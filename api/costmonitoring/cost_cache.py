@@ -0,0 +1,121 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+
+from ..caching import SingleFlight
+
+DEFAULT_MAX_PERIODS = 100000
+# Cost Explorer keeps updating the costs of the last days, a period is only final once they are over
+SETTLEMENT_DELAY = timedelta(days=2)
+
+
+def cost_periods(start, end, granularity):
+    """ Returns the (start, end) ISO dates of the periods Cost Explorer returns for [start, end) """
+    periods = []
+    period_start, end_date = date.fromisoformat(start), date.fromisoformat(end)
+    while period_start < end_date:
+        if granularity == 'DAILY':
+            period_end = period_start + timedelta(days=1)
+        else:
+            period_end = (period_start.replace(day=1) + timedelta(days=32)).replace(day=1)
+        period_end = min(period_end, end_date)
+        periods.append((period_start.isoformat(), period_end.isoformat()))
+        period_start = period_end
+    return periods
+
+
+def _utc_today():
+    return datetime.now(timezone.utc).date()
+
+
+class CostDataCache(object):
+    """
+    Cost Explorer results cached per query (e.g. a cluster name), granularity and period.
+
+    Closed periods, that ended a few days ago and whose costs are no longer estimated, never change: they are
+    cached until evicted by the `max_periods` bound. The open period expires after `open_period_ttl` seconds.
+    Only the periods missing from the cache are fetched, with a single `fetch(query, start, end, granularity)`
+    call spanning from the first to the last of them, shared by the concurrent requests missing the same periods
+    since Cost Explorer is billed per request. Periods without results are cached as such, so they are not
+    fetched again on every request.
+    """
+
+    def __init__(self, fetch, open_period_ttl, max_periods=DEFAULT_MAX_PERIODS, clock=time.monotonic,
+                 today=_utc_today):
+        self.fetch = fetch
+        self.open_period_ttl = open_period_ttl
+        self.max_periods = max_periods
+        self.clock = clock
+        self.today = today
+        self.hits = 0
+        self.misses = 0
+        self._periods = OrderedDict()
+        self._fetches = SingleFlight()
+        self._lock = threading.Lock()
+
+    def get(self, query, start, end, granularity):
+        """
+        Returns the results of the periods of [start, end) in period order, and the number of seconds they
+        can still be served from the cache before the open period expires (None if all periods are closed)
+        """
+        periods = [(query, granularity) + period for period in cost_periods(start, end, granularity)]
+        missing = [key for key in periods if self.__cached(key) is None]
+        self.__count(len(periods) - len(missing), len(missing))
+        if missing:
+            fetch_start, fetch_end = missing[0][2], missing[-1][3]
+            self._fetches.do((query, granularity, fetch_start, fetch_end),
+                             lambda: self.__store(missing, self.fetch(query, fetch_start, fetch_end, granularity)))
+
+        results, freshness = [], None
+        for key in periods:
+            entry = self.__cached(key)
+            if entry is None:
+                continue
+            result, expires_at = entry
+            if result is not None:
+                results.append(result)
+            if expires_at is not None:
+                remaining = max(0, expires_at - self.clock())
+                freshness = remaining if freshness is None else min(freshness, remaining)
+        return results, freshness
+
+    def clear(self):
+        with self._lock:
+            self._periods.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._periods)}
+
+    def __cached(self, key):
+        with self._lock:
+            entry = self._periods.get(key)
+            if entry is None:
+                return None
+            if entry[1] is not None and entry[1] <= self.clock():
+                del self._periods[key]
+                return None
+            self._periods.move_to_end(key)
+            return entry
+
+    def __store(self, missing, results):
+        # periods Cost Explorer returned nothing for are cached with a None result
+        entries = {key: None for key in missing}
+        query, granularity = missing[0][0], missing[0][1]
+        for result in results:
+            entries[(query, granularity, result['TimePeriod']['Start'], result['TimePeriod']['End'])] = result
+
+        settled = self.today() - SETTLEMENT_DELAY
+        with self._lock:
+            for key, result in entries.items():
+                closed = date.fromisoformat(key[3]) <= settled and not (result or {}).get('Estimated', False)
+                self._periods[key] = (result, None if closed else self.clock() + self.open_period_ttl)
+                self._periods.move_to_end(key)
+            while len(self._periods) > self.max_periods:
+                self._periods.popitem(last=False)
+
+    def __count(self, hits, misses):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
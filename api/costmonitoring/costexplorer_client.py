@@ -1,3 +1,7 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
 from botocore.exceptions import ClientError
 
 from api.pcm_globals import logger
@@ -10,6 +14,11 @@ COST_DATA_FILTER_CLUSTER_NAME = 'parallelcluster:cluster-name'
 COST_DATA_FILTER_METRIC = 'UnblendedCost'
 COST_DATA_FILTER_MATCH_OPTIONS = ['EQUALS']
 
+# long date ranges are fetched in windows of whole months, a few of them at a time to stay below the
+# Cost Explorer request rate limit
+COST_DATA_WINDOW_MONTHS = 3
+COST_DATA_MAX_WORKERS = 4
+
 
 def is_costexplorer_not_active_exception(error: ClientError):
     message = error.response['Error']['Message']
@@ -28,13 +37,32 @@ def clienterror_handled(func):
     return handle_costexplorer_clienterror
 
 
+def split_in_windows(start, end, months=COST_DATA_WINDOW_MONTHS):
+    """
+    Splits the [start, end) ISO dates range in consecutive windows of `months` months, aligned on the
+    first day of a month so that no monthly period is split across two windows
+    """
+    windows = []
+    window_start = date.fromisoformat(start)
+    end_date = date.fromisoformat(end)
+    while window_start < end_date:
+        month_index = window_start.year * 12 + window_start.month - 1 + months
+        window_end = min(date(month_index // 12, month_index % 12 + 1, 1), end_date)
+        windows.append((window_start.isoformat(), window_end.isoformat()))
+        window_start = window_end
+    return windows
+
+
 class CostExplorerClient:
 
-    def __init__(self, client, cost_allocation_tags):
+    def __init__(self, client, cost_allocation_tags, window_months=COST_DATA_WINDOW_MONTHS,
+                 max_workers=COST_DATA_MAX_WORKERS):
         self.client = client
         if not cost_allocation_tags:
             raise ValueError('cost_allocation_tags cannot be empty or None')
         self.cost_allocation_tags = cost_allocation_tags
+        self.window_months = window_months
+        self.max_workers = max_workers
 
     @clienterror_handled
     def activate(self):
@@ -70,41 +98,93 @@ class CostExplorerClient:
 
     def get_cost_data(self, cluster_name, start, end, granularity=COST_DATA_FILTER_DEFAULT_GRANULARITY,
                       metric=COST_DATA_FILTER_METRIC):
+        costs = self.get_cost_results(cluster_name, start, end, granularity, metric)
+        return self.map_cost_values(costs, metric)
+
+    def get_cost_results(self, cluster_name, start, end, granularity=COST_DATA_FILTER_DEFAULT_GRANULARITY,
+                         metric=COST_DATA_FILTER_METRIC):
+        """ Returns the `ResultsByTime` of the cost data of a cluster as returned by Cost Explorer, in period order """
         if not cluster_name:
             raise ValueError('Missing mandatory `cluster_name` parameter')
         if not start or not end:
             raise ValueError('Missing mandatory `start` and/or `end` parameters')
 
-        costs, next_token = self.__retrieve_cost_data(cluster_name, start, end, granularity, [metric])
+        query = {
+            'Filter': {
+                'Tags': {
+                    'Key': COST_DATA_FILTER_CLUSTER_NAME,
+                    'Values': [cluster_name],
+                    'MatchOptions': COST_DATA_FILTER_MATCH_OPTIONS
+                }
+            }
+        }
+        return self.__retrieve_windows(f'cluster: "{cluster_name}"', query, start, end, granularity, [metric])
+
+    def get_cost_results_by_cluster(self, start, end, granularity=COST_DATA_FILTER_DEFAULT_GRANULARITY,
+                                    metrics=(COST_DATA_FILTER_METRIC,)):
+        """
+        Returns the `ResultsByTime` of the cost data of all the clusters, grouped by cluster name tag, in period
+        order. The groups of a period split across pages by Cost Explorer are merged back into one result.
+        """
+        if not start or not end:
+            raise ValueError('Missing mandatory `start` and/or `end` parameters')
+
+        query = {'GroupBy': [{'Type': 'TAG', 'Key': COST_DATA_FILTER_CLUSTER_NAME}]}
+        costs = self.__retrieve_windows('all clusters', query, start, end, granularity, list(metrics))
+
+        merged = {}
+        for cost in costs:
+            period = (cost['TimePeriod']['Start'], cost['TimePeriod']['End'])
+            if period in merged:
+                merged[period]['Groups'].extend(cost.get('Groups', []))
+            else:
+                merged[period] = {**cost, 'Groups': list(cost.get('Groups', []))}
+        return list(merged.values())
+
+    def __retrieve_windows(self, description, query, start, end, granularity, metrics):
+        windows = split_in_windows(start, end, self.window_months)
+        if len(windows) <= 1:
+            costs = self.__retrieve_all_cost_data(description, query, start, end, granularity, metrics)
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(windows))) as executor:
+                # each task runs in a copy of the request context, for the request-scoped logger
+                futures = [
+                    executor.submit(contextvars.copy_context().run, self.__retrieve_all_cost_data,
+                                    description, query, window_start, window_end, granularity, metrics)
+                    for window_start, window_end in windows
+                ]
+                costs = [cost for future in futures for cost in future.result()]
+
+        return sorted(costs, key=lambda cost: cost['TimePeriod']['Start'])
+
+    def __retrieve_all_cost_data(self, description, query, start, end, granularity, metrics):
+        costs, next_token = self.__retrieve_cost_data(description, query, start, end, granularity, metrics)
 
         while next_token is not None:
-            _costs, next_token = self.__retrieve_cost_data(cluster_name, start, end, granularity, [metric])
+            _costs, next_token = self.__retrieve_cost_data(description, query, start, end, granularity, metrics,
+                                                           next_token=next_token)
             costs.extend(_costs)
 
-        costs = self.map_cost_values(costs, metric)
-        return sorted(costs, key=lambda cost: cost['period']['start'])
+        return costs
 
     @clienterror_handled
-    def __retrieve_cost_data(self, cluster_name, start, end, granularity, metrics):
-        response = self.client.get_cost_and_usage(
+    def __retrieve_cost_data(self, description, query, start, end, granularity, metrics, next_token=None):
+        request_params = dict(
             TimePeriod={
                 'Start': start,
                 'End': end
             },
             Granularity=granularity,
-            Filter={
-                'Tags': {
-                    'Key': COST_DATA_FILTER_CLUSTER_NAME,
-                    'Values': [cluster_name],
-                    'MatchOptions': COST_DATA_FILTER_MATCH_OPTIONS
-                }
-            },
-            Metrics=metrics
+            Metrics=metrics,
+            **query
         )
+        if next_token:
+            request_params['NextPageToken'] = next_token
+        response = self.client.get_cost_and_usage(**request_params)
         if not self.__is_boto_response_successful(response):
-            logger.error(f'Unable to retrieve costs data for cluster: "{cluster_name}"',
-                         extra={'cluster_name': cluster_name, 'start': start, 'end': end})
-            raise Exception(f'Unable to retrieve costs data for cluster: "{cluster_name}"')
+            logger.error(f'Unable to retrieve costs data for {description}',
+                         extra={'start': start, 'end': end})
+            raise Exception(f'Unable to retrieve costs data for {description}')
 
         costs = response['ResultsByTime']
         next_token = response.get('NextPageToken')
@@ -121,6 +201,36 @@ class CostExplorerClient:
         total = cost['Total'][metric]
         return {'period': {'start': start, 'end': end}, 'amount': float(total['Amount']), 'unit': total['Unit']}
 
+    @staticmethod
+    def costs_by_cluster(costs, metrics):
+        """
+        Returns the costs grouped by cluster as columns: for each metric a matrix with one row per period and
+        one column per cluster, clusters being sorted by name. Costs not tagged with a cluster name are dropped.
+        """
+        prefix = f'{COST_DATA_FILTER_CLUSTER_NAME}$'
+        clusters = sorted({group['Keys'][0][len(prefix):] for cost in costs for group in cost.get('Groups', [])} - {''})
+        columns = {cluster: index for index, cluster in enumerate(clusters)}
+
+        amounts = {metric: [[0.0] * len(clusters) for _ in costs] for metric in metrics}
+        units = {}
+        for row, cost in enumerate(costs):
+            for group in cost.get('Groups', []):
+                column = columns.get(group['Keys'][0][len(prefix):])
+                if column is None:
+                    continue
+                for metric in metrics:
+                    amounts[metric][row][column] += float(group['Metrics'][metric]['Amount'])
+                    units.setdefault(metric, group['Metrics'][metric]['Unit'])
+
+        return {
+            'periods': {
+                'start': [cost['TimePeriod']['Start'] for cost in costs],
+                'end': [cost['TimePeriod']['End'] for cost in costs],
+            },
+            'clusters': clusters,
+            'metrics': {metric: {'unit': units.get(metric), 'amounts': amounts[metric]} for metric in metrics},
+        }
+
     def __is_boto_response_successful(self, response):
         return response['ResponseMetadata']['HTTPStatusCode'] == 200
 
@@ -1,30 +1,42 @@
 from datetime import datetime
 
-import boto3
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request
 
-from .costexplorer_client import CostExplorerClient, CostExplorerNotActiveException
+from .cost_cache import CostDataCache
+from .costexplorer_client import CostExplorerClient, CostExplorerNotActiveException, \
+    COST_DATA_FILTER_DEFAULT_GRANULARITY, COST_DATA_FILTER_METRIC
 from ..PclusterApiHandler import authenticated
+from ..aws.clients import LazyClient
+from ..caching import TTLCache, cacheable_json_response
 from ..pcm_globals import logger
 from ..security.csrf.csrf import csrf_needed
 from ..utils import to_utc_datetime
 from ..validation import validated
-from ..validation.schemas import GetCostData
+from ..validation.schemas import GetCostData, GetCostDataByCluster
 
 CACHED_RESPONSE_MAX_AGE = 60 * 60 * 12
+COST_MONITORING_STATUS_MAX_AGE = 60 * 10
 
 COST_ALLOCATION_TAGS = ['parallelcluster:cluster-name']
 
 costs = Blueprint('costs', __name__)
 
-costexplorer = boto3.client('ce')
+costexplorer = LazyClient('ce')
 client = CostExplorerClient(costexplorer, cost_allocation_tags=COST_ALLOCATION_TAGS)
 
+# Cost Explorer is billed per request: closed periods are cached for good, the open one for CACHED_RESPONSE_MAX_AGE
+cost_data = CostDataCache(client.get_cost_results, open_period_ttl=CACHED_RESPONSE_MAX_AGE)
+cost_data_by_cluster = CostDataCache(
+    lambda metrics, start, end, granularity: client.get_cost_results_by_cluster(start, end, granularity, metrics),
+    open_period_ttl=CACHED_RESPONSE_MAX_AGE,
+)
+cost_monitoring_status_cache = TTLCache(ttl=COST_MONITORING_STATUS_MAX_AGE)
+
 
 @costs.get('')
 @authenticated({'admin'})
 def cost_monitoring_status():
-    active = client.is_active()
+    active = cost_monitoring_status_cache.get('active', client.is_active)
     return {'active': active}, 200
 
 
@@ -33,6 +45,7 @@ def cost_monitoring_status():
 @csrf_needed
 def activate_cost_monitoring():
     client.activate()
+    cost_monitoring_status_cache.invalidate('active')
     return {}, 204
 
 
@@ -43,9 +56,28 @@ def get_cost_data_for(cluster_name):
     start = to_utc_datetime(request.args.get('start')).date().isoformat()
     end = to_utc_datetime(request.args.get('end', default=datetime.today().isoformat())).date().isoformat()
 
-    cost_amounts = client.get_cost_data(cluster_name=cluster_name, start=start, end=end)
+    granularity = request.args.get('granularity', default=COST_DATA_FILTER_DEFAULT_GRANULARITY)
+
+    results, freshness = cost_data.get(cluster_name, start, end, granularity)
+    cost_amounts = CostExplorerClient.map_cost_values(results, COST_DATA_FILTER_METRIC)
+
+    max_age = CACHED_RESPONSE_MAX_AGE if freshness is None else min(CACHED_RESPONSE_MAX_AGE, int(freshness))
+    return cacheable_json_response({'costs': cost_amounts}, max_age)
+
+
+@costs.get('/clusters')
+@authenticated({'admin'})
+@validated(params=GetCostDataByCluster)
+def get_cost_data_by_cluster():
+    start = to_utc_datetime(request.args.get('start')).date().isoformat()
+    end = to_utc_datetime(request.args.get('end', default=datetime.today().isoformat())).date().isoformat()
+    granularity = request.args.get('granularity', default=COST_DATA_FILTER_DEFAULT_GRANULARITY)
+    metrics = tuple(request.args.get('metrics', default=COST_DATA_FILTER_METRIC).split(','))
+
+    results, freshness = cost_data_by_cluster.get(metrics, start, end, granularity)
 
-    return jsonify({'costs': cost_amounts})
+    max_age = CACHED_RESPONSE_MAX_AGE if freshness is None else min(CACHED_RESPONSE_MAX_AGE, int(freshness))
+    return cacheable_json_response(CostExplorerClient.costs_by_cluster(results, metrics), max_age)
 
 
 @costs.errorhandler(CostExplorerNotActiveException)
@@ -1,8 +1,30 @@
-from flask import Flask, request
+import os
+import random
+import uuid
 
-from api.logging.http_info import log_request_body_and_headers, log_response_body_and_headers
+from flask import Flask, g, request
+
+from api.aws.clients import get_client
+from api.logging.async_logging import AsyncLogging
+from api.logging.http_info import DEFAULT_MAX_BODY_SIZE, log_request_body_and_headers, log_response_body_and_headers
+from api.logging.ingestion import DEFAULT_MAX_PENDING_EVENTS, CloudWatchLogSink, InMemoryLogSink, LogIngestion
 
 VALID_LOG_LEVELS = {'debug', 'info', 'warning', 'error', 'critical'}
+HTTP_LOGGER_NAME = 'pcluster-manager.http'
+
+# in Lambda the frontend logs go to a dedicated stream of the function log group
+FRONTEND_LOG_GROUP_NAME = os.getenv('FRONTEND_LOG_GROUP_NAME', os.getenv('AWS_LAMBDA_LOG_GROUP_NAME'))
+FRONTEND_LOG_STREAM_NAME = os.getenv('FRONTEND_LOG_STREAM_NAME', f'frontend/{uuid.uuid4().hex}')
+FRONTEND_LOGS_MAX_PENDING_EVENTS = int(os.getenv('FRONTEND_LOGS_MAX_PENDING_EVENTS', DEFAULT_MAX_PENDING_EVENTS))
+
+# Request/response records are written by a background thread, shared by all the apps of this process
+http_logging = AsyncLogging(HTTP_LOGGER_NAME)
+
+# Frontend log entries are written to CloudWatch in batches when a log group is configured, else logged one by one
+frontend_logs = LogIngestion(
+    CloudWatchLogSink(lambda: get_client('logs'), FRONTEND_LOG_GROUP_NAME, FRONTEND_LOG_STREAM_NAME),
+    max_pending_events=FRONTEND_LOGS_MAX_PENDING_EVENTS,
+) if FRONTEND_LOG_GROUP_NAME else None
 
 def parse_log_entry(_logger, entry):
     """
@@ -28,22 +50,51 @@ def push_log_entry(_logger, level, message, extra):
     logging_fun(message, extra=extra)
 
 
+def parse_sample_rates(value):
+    """ Parses per-route sampling rates given as `rule=rate` pairs, e.g. `/manager/queue_status=0.1,/api=0.5` """
+    sample_rates = {}
+    if value:
+        for pair in value.split(","):
+            if pair:
+                rule, rate = pair.rsplit("=", 1)
+                sample_rates[rule] = float(rate)
+    return sample_rates
+
+
 class RequestResponseLogging:
-    def __init__(self, logger, app: Flask = None, urls_deny_list=['/logs']):
+    """
+    Logs the headers and JSON body of requests and responses.
+
+    Only a sample of the requests to the routes listed in `sample_rates` (by url rule) is logged, both the request
+    and its response, while server errors are always logged. Bodies larger than `max_body_size` bytes are logged
+    truncated, with their size and hash.
+    """
+
+    def __init__(self, logger, app: Flask = None, urls_deny_list=['/logs'], sample_rates=None,
+                 max_body_size=DEFAULT_MAX_BODY_SIZE, sample=random.random):
         self.logger = logger
         self.urls_deny_list = urls_deny_list
+        self.sample_rates = sample_rates or {}
+        self.max_body_size = max_body_size
+        self.sample = sample
         if app:
             self.init_app(app)
 
+    def is_sampled(self):
+        rule = request.url_rule.rule if request.url_rule else request.path
+        sample_rate = self.sample_rates.get(rule, 1.0)
+        return sample_rate >= 1.0 or self.sample() < sample_rate
+
     def init_app(self, app):
 
         def log_request():
-            if request.path not in self.urls_deny_list:
-                log_request_body_and_headers(self.logger, request)
+            g.log_http = request.path not in self.urls_deny_list and self.is_sampled()
+            if g.log_http:
+                log_request_body_and_headers(self.logger, request, self.max_body_size)
 
         def log_response(response = None):
-            if request.path not in self.urls_deny_list:
-                log_response_body_and_headers(self.logger, response)
+            if request.path not in self.urls_deny_list and (g.get('log_http', True) or response.status_code >= 500):
+                log_response_body_and_headers(self.logger, response, self.max_body_size)
             return response
 
         app.before_request(log_request)
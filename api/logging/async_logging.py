@@ -0,0 +1,114 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+DEFAULT_MAX_QUEUE_SIZE = 10000
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """ Hands the records to `async_logging`, which drops them when its queue is full """
+
+    def __init__(self, async_logging):
+        super().__init__(async_logging.queue)
+        self.async_logging = async_logging
+
+    def prepare(self, record):
+        # the queue is in-process: leave the formatting of the message to the listener thread
+        return record
+
+    def enqueue(self, record):
+        self.async_logging.enqueue(record)
+
+
+class _ParentHandlers(logging.Handler):
+    """ Hands the records, in the listener thread, to the handlers of the ancestors of the queued logger """
+
+    def __init__(self, logger):
+        super().__init__()
+        self.logger = logger
+
+    def handle(self, record):
+        # an exception would stop the listener thread, and with it all the following records
+        try:
+            if self.logger.parent is not None:
+                self.logger.parent.callHandlers(record)
+        except Exception:
+            self.handleError(record)
+        return True
+
+
+class AsyncLogging(object):
+    """
+    Writes the records of the `name` logger from a background QueueListener thread, so that formatting them and
+    writing them out (to stdout, hence to CloudWatch in Lambda) does not block the request thread.
+
+    The records go through a bounded queue and are then passed to the handlers of the ancestor loggers, as if
+    the logger propagated them. When the queue is full the records are dropped and counted.
+    In Lambda the listener is frozen between invocations, so `flush` must be called before returning.
+
+    The listener thread belongs to the process that started it: processes forked afterwards (e.g. the uWSGI
+    workers forked from the master without `lazy-apps`) do not inherit it, so they start their own, with an
+    empty queue, on their first record.
+    """
+
+    def __init__(self, name, max_queue_size=DEFAULT_MAX_QUEUE_SIZE):
+        self.name = name
+        self.max_queue_size = max_queue_size
+        self.logger = logging.getLogger(name)
+        self.queue = queue.Queue(max_queue_size)
+        self.dropped = 0
+        self._listener = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def started(self):
+        return self._listener is not None and self._pid == os.getpid()
+
+    def start(self):
+        with self._lock:
+            if self.started:
+                return
+            first_start = self._pid is None
+            if not first_start:
+                # forked: the queue may hold records of the parent, and its listener thread does not exist here
+                self.queue = queue.Queue(self.max_queue_size)
+            self.logger.handlers = [_DroppingQueueHandler(self)]
+            self.logger.propagate = False
+            self._listener = QueueListener(self.queue, _ParentHandlers(self.logger))
+            self._listener.start()
+            self._pid = os.getpid()
+        if first_start:
+            atexit.register(self.stop)
+
+    def enqueue(self, record):
+        if not self.started:
+            self.start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.__on_drop()
+
+    def flush(self, timeout=1.0):
+        """ Waits up to `timeout` seconds for the queued records to be written, returns whether they all were """
+        if not self.started:
+            return True
+        with self.queue.all_tasks_done:
+            return self.queue.all_tasks_done.wait_for(lambda: not self.queue.unfinished_tasks, timeout)
+
+    def stop(self):
+        with self._lock:
+            if not self.started:
+                return
+            self._listener.stop()
+            self._listener = None
+            self._pid = None
+            self.logger.handlers = []
+            self.logger.propagate = True
+
+    def __on_drop(self):
+        with self._lock:
+            self.dropped += 1
@@ -1,10 +1,14 @@
-from typing import Union
+import hashlib
+from typing import Optional, Union
 
 from flask import Request, Response
 
+# bodies above this size are logged truncated, along with their size and hash, and are never parsed
+DEFAULT_MAX_BODY_SIZE = 8 * 1024
 
-def log_request_body_and_headers(_logger, request: Request):
-    details = __get_http_info(request)
+
+def log_request_body_and_headers(_logger, request: Request, max_body_size: Optional[int] = DEFAULT_MAX_BODY_SIZE):
+    details = __get_http_info(request, max_body_size)
     details['path'] = request.path
     if request.args:
         details['params'] = request.args
@@ -17,17 +21,17 @@ def log_request_body_and_headers(_logger, request: Request):
     _logger.info(details)
 
 
-def log_response_body_and_headers(_logger, response: Response):
-    details = __get_http_info(response)
+def log_response_body_and_headers(_logger, response: Response, max_body_size: Optional[int] = DEFAULT_MAX_BODY_SIZE):
+    details = __get_http_info(response, max_body_size)
     _logger.info(details)
 
 
-def __get_http_info(r: Union[Request,Response]) -> dict:
+def __get_http_info(r: Union[Request,Response], max_body_size: Optional[int]) -> dict:
     headers = __filter_headers(r.headers)
     details = {'headers': headers}
 
     try:
-        body = r.json
+        body = __get_body(r, max_body_size)
         if body:
             details['body'] = body
     except:
@@ -36,6 +40,21 @@ def __get_http_info(r: Union[Request,Response]) -> dict:
     return details
 
 
+def __get_body(r: Union[Request,Response], max_body_size: Optional[int]):
+    # reading a streamed response would consume it
+    if not r.is_json or getattr(r, 'is_streamed', False):
+        return None
+
+    data = r.get_data()
+    if max_body_size is not None and len(data) > max_body_size:
+        return {
+            'truncated': data[:max_body_size].decode('utf-8', 'replace'),
+            'size': len(data),
+            'sha256': hashlib.sha256(data).hexdigest(),
+        }
+    return r.get_json(silent=True)
+
+
 SENSITIVE_HEADERS = [
     'Cookie',
     'Set-Cookie',
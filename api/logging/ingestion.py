@@ -0,0 +1,155 @@
+import collections
+import json
+import logging
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+# PutLogEvents limits: the size of a batch is the sum of the UTF-8 size of its messages plus 26 bytes per event
+MAX_BATCH_BYTES = 1_048_576
+MAX_BATCH_EVENTS = 10_000
+EVENT_OVERHEAD_BYTES = 26
+MAX_EVENT_BYTES = 256 * 1024 - EVENT_OVERHEAD_BYTES
+DEFAULT_MAX_PENDING_EVENTS = 20_000
+
+_logger = logging.getLogger(__name__)
+
+
+def to_log_event(entry, timestamp):
+    """ Turns a validated frontend log entry into a CloudWatch log event, as a JSON message """
+    message = json.dumps({**(entry.get('extra') or {}), 'level': entry['level'].upper(), 'message': entry['message']})
+    encoded = message.encode('utf-8')
+    if len(encoded) > MAX_EVENT_BYTES:
+        message = encoded[:MAX_EVENT_BYTES].decode('utf-8', 'ignore')
+    return {'timestamp': timestamp, 'message': message}
+
+
+def event_size(event):
+    return len(event['message'].encode('utf-8')) + EVENT_OVERHEAD_BYTES
+
+
+class InMemoryLogSink(object):
+    """ Keeps the written batches in memory, standing in for CloudWatch in tests and local runs """
+
+    def __init__(self):
+        self.batches = []
+
+    def put(self, events):
+        self.batches.append(list(events))
+
+    @property
+    def events(self):
+        return [event for batch in self.batches for event in batch]
+
+
+class CloudWatchLogSink(object):
+    """ Writes batches of events to a dedicated log stream, created on the first write """
+
+    def __init__(self, get_logs_client, log_group_name, log_stream_name):
+        self.get_logs_client = get_logs_client
+        self.log_group_name = log_group_name
+        self.log_stream_name = log_stream_name
+
+    def put(self, events):
+        try:
+            response = self.__put_log_events(events)
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ResourceNotFoundException':
+                raise
+            self.get_logs_client().create_log_stream(logGroupName=self.log_group_name,
+                                                     logStreamName=self.log_stream_name)
+            response = self.__put_log_events(events)
+
+        rejected = response.get('rejectedLogEventsInfo')
+        if rejected:
+            _logger.warning(f'Some frontend log events were rejected by CloudWatch: {rejected}')
+
+    def __put_log_events(self, events):
+        return self.get_logs_client().put_log_events(
+            logGroupName=self.log_group_name, logStreamName=self.log_stream_name, logEvents=events
+        )
+
+
+class LogIngestion(object):
+    """
+    Buffers the log entries pushed by the frontend and writes them to `sink` on a background thread, in batches
+    as large as PutLogEvents allows, instead of a stdout line per entry.
+
+    The buffer holds at most `max_pending_events` events: a batch that does not fit is refused as a whole,
+    so that the caller can ask the client to retry later. Batches the sink fails to write are dropped and counted.
+    In Lambda the background thread is frozen between invocations, so `flush` must be called before returning.
+    """
+
+    def __init__(self, sink, max_pending_events=DEFAULT_MAX_PENDING_EVENTS, background=True, clock=time.time):
+        self.sink = sink
+        self.max_pending_events = max_pending_events
+        self.background = background
+        self.clock = clock
+        self.written = 0
+        self.failed = 0
+        self._pending = collections.deque()
+        self._writing = 0
+        self._worker = None
+        self._condition = threading.Condition()
+
+    def submit(self, entries):
+        """ Buffers the validated `entries`, returns False when the buffer cannot hold them """
+        timestamp = int(self.clock() * 1000)
+        events = [to_log_event(entry, timestamp) for entry in entries]
+        with self._condition:
+            if len(self._pending) + len(events) > self.max_pending_events:
+                return False
+            self._pending.extend(events)
+            self._condition.notify_all()
+            if self.background and (self._worker is None or not self._worker.is_alive()):
+                self._worker = threading.Thread(target=self.__run, name='log-ingestion', daemon=True)
+                self._worker.start()
+        return True
+
+    def pending(self):
+        with self._condition:
+            return len(self._pending)
+
+    def flush(self):
+        """ Writes the buffered events on the calling thread, then waits for the batch being written, if any """
+        while True:
+            batch = self.__take_batch()
+            if not batch:
+                break
+            self.__write(batch)
+        with self._condition:
+            self._condition.wait_for(lambda: self._writing == 0)
+
+    def __run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending)
+            batch = self.__take_batch()
+            if batch:
+                self.__write(batch)
+
+    def __take_batch(self):
+        with self._condition:
+            batch, size = [], 0
+            while self._pending and len(batch) < MAX_BATCH_EVENTS:
+                event_bytes = event_size(self._pending[0])
+                if batch and size + event_bytes > MAX_BATCH_BYTES:
+                    break
+                batch.append(self._pending.popleft())
+                size += event_bytes
+            if batch:
+                self._writing += 1
+            return batch
+
+    def __write(self, batch):
+        try:
+            self.sink.put(batch)
+            self.written += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            _logger.warning(f'Unable to write {len(batch)} frontend log events: {e}')
+        finally:
+            with self._condition:
+                self._writing -= 1
+                self._condition.notify_all()
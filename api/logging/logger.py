@@ -2,8 +2,8 @@ import logging
 from sys import exc_info
 
 class DefaultLogger(object):
-  def __init__(self, is_running_local):
-    self.logger = logging.getLogger("pcluster-manager")
+  def __init__(self, is_running_local, name="pcluster-manager"):
+    self.logger = logging.getLogger(name)
     if is_running_local:
       handler = logging.StreamHandler()
       handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
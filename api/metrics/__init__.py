@@ -0,0 +1,10 @@
+from api.metrics.registry import DEFAULT_BUCKETS, Histogram, MetricsRegistry
+from api.metrics.request_metrics import RequestMetrics, add_to_request_dependencies, emf_record
+
+# Metrics of this process, shared by the app and by the code timing the calls to its dependencies
+metrics = MetricsRegistry()
+
+
+def timed(operation):
+    """ Times the enclosed call to a dependency, e.g. `with timed('SsmWait'):`, attributing it to the current request """
+    return metrics.timed(operation, on_done=add_to_request_dependencies)
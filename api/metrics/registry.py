@@ -0,0 +1,171 @@
+import bisect
+import contextlib
+import threading
+import time
+
+# latency buckets in seconds, as the Prometheus client libraries default to
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PROMETHEUS_PREFIX = 'pcui'
+
+
+class Histogram(object):
+    """ Counts the observations falling in each bucket, the last count being for the values above all the buckets """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self):
+        """ Returns the (upper bound, cumulative count) pairs, ending with +Inf """
+        cumulative, total = [], 0
+        for bound, count in zip((*self.buckets, float('inf')), self.counts):
+            total += count
+            cumulative.append((bound, total))
+        return cumulative
+
+
+def _labels(**labels):
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels.items()
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _bound(value):
+    return '+Inf' if value == float('inf') else repr(value)
+
+
+class MetricsRegistry(object):
+    """
+    Thread-safe request and dependency metrics of this process: request counts by endpoint, method and status code,
+    latency histograms by endpoint and method, in-flight requests by endpoint, and latency histograms of the calls
+    to the AWS services the requests depend on (e.g. SSM or CloudWatch Logs), along with the bytes saved by
+    compressing the responses of each endpoint, rendered in the Prometheus text format.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, clock=time.perf_counter):
+        self.buckets = buckets
+        self.clock = clock
+        self._requests = {}
+        self._latencies = {}
+        self._in_flight = {}
+        self._dependencies = {}
+        self._compression = {}
+        self._lock = threading.Lock()
+
+    def request_started(self, endpoint):
+        """ Returns the number of requests in flight for `endpoint`, including the one just started """
+        with self._lock:
+            in_flight = self._in_flight[endpoint] = self._in_flight.get(endpoint, 0) + 1
+            return in_flight
+
+    def request_finished(self, endpoint, method, status_code, seconds):
+        with self._lock:
+            self._in_flight[endpoint] = self._in_flight.get(endpoint, 1) - 1
+            key = (endpoint, method, status_code)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            self.__histogram(self._latencies, (endpoint, method)).observe(seconds)
+
+    def in_flight(self, endpoint):
+        with self._lock:
+            return self._in_flight.get(endpoint, 0)
+
+    def observe_dependency(self, operation, seconds):
+        with self._lock:
+            self.__histogram(self._dependencies, operation).observe(seconds)
+
+    def response_compressed(self, endpoint, bytes_in, bytes_out):
+        with self._lock:
+            totals = self._compression.setdefault(endpoint, [0, 0])
+            totals[0] += bytes_in
+            totals[1] += bytes_in - bytes_out
+
+    @contextlib.contextmanager
+    def timed(self, operation, on_done=None):
+        """ Times the enclosed call to a dependency, also passing the duration to `on_done` if given """
+        start = self.clock()
+        try:
+            yield
+        finally:
+            seconds = self.clock() - start
+            self.observe_dependency(operation, seconds)
+            if on_done is not None:
+                on_done(operation, seconds)
+
+    def prometheus_text(self):
+        with self._lock:
+            requests = sorted(self._requests.items())
+            latencies = sorted((key, self.__snapshot(h)) for key, h in self._latencies.items())
+            in_flight = sorted(self._in_flight.items())
+            dependencies = sorted((key, self.__snapshot(h)) for key, h in self._dependencies.items())
+            compression = sorted((endpoint, tuple(totals)) for endpoint, totals in self._compression.items())
+
+        lines = [
+            f'# HELP {PROMETHEUS_PREFIX}_http_requests_total Requests by endpoint, method and status code.',
+            f'# TYPE {PROMETHEUS_PREFIX}_http_requests_total counter',
+        ]
+        for (endpoint, method, status_code), count in requests:
+            lines.append(f'{PROMETHEUS_PREFIX}_http_requests_total'
+                         f'{_labels(endpoint=endpoint, method=method, status=status_code)} {count}')
+
+        lines += [
+            f'# HELP {PROMETHEUS_PREFIX}_http_request_duration_seconds Request latency by endpoint and method.',
+            f'# TYPE {PROMETHEUS_PREFIX}_http_request_duration_seconds histogram',
+        ]
+        for (endpoint, method), histogram in latencies:
+            lines += self.__histogram_lines(f'{PROMETHEUS_PREFIX}_http_request_duration_seconds', histogram,
+                                            endpoint=endpoint, method=method)
+
+        lines += [
+            f'# HELP {PROMETHEUS_PREFIX}_http_requests_in_flight Requests being served by endpoint.',
+            f'# TYPE {PROMETHEUS_PREFIX}_http_requests_in_flight gauge',
+        ]
+        for endpoint, count in in_flight:
+            lines.append(f'{PROMETHEUS_PREFIX}_http_requests_in_flight{_labels(endpoint=endpoint)} {count}')
+
+        lines += [
+            f'# HELP {PROMETHEUS_PREFIX}_dependency_duration_seconds Latency of the calls to AWS services by operation.',
+            f'# TYPE {PROMETHEUS_PREFIX}_dependency_duration_seconds histogram',
+        ]
+        for operation, histogram in dependencies:
+            lines += self.__histogram_lines(f'{PROMETHEUS_PREFIX}_dependency_duration_seconds', histogram,
+                                            operation=operation)
+
+        for name, description, index in (
+            ('compression_input_bytes_total', 'Size of the compressed responses before compression', 0),
+            ('compression_saved_bytes_total', 'Bytes saved by compressing the responses', 1),
+        ):
+            lines += [
+                f'# HELP {PROMETHEUS_PREFIX}_{name} {description} by endpoint.',
+                f'# TYPE {PROMETHEUS_PREFIX}_{name} counter',
+            ]
+            for endpoint, totals in compression:
+                lines.append(f'{PROMETHEUS_PREFIX}_{name}{_labels(endpoint=endpoint)} {totals[index]}')
+        return '\n'.join(lines) + '\n'
+
+    def __histogram(self, histograms, key):
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = Histogram(self.buckets)
+        return histogram
+
+    @staticmethod
+    def __snapshot(histogram):
+        return histogram.cumulative_counts(), histogram.sum, histogram.count
+
+    @staticmethod
+    def __histogram_lines(name, snapshot, **labels):
+        cumulative_counts, total, count = snapshot
+        lines = [f'{name}_bucket{_labels(**labels, le=_bound(bound))} {cumulative}'
+                 for bound, cumulative in cumulative_counts]
+        lines.append(f'{name}_sum{_labels(**labels)} {total}')
+        lines.append(f'{name}_count{_labels(**labels)} {count}')
+        return lines
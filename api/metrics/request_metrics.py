@@ -0,0 +1,111 @@
+import json
+import sys
+import time
+
+from flask import Flask, Response, g, has_request_context, request
+
+from api.metrics.registry import MetricsRegistry
+
+EMF_NAMESPACE = 'ParallelClusterUI'
+PROMETHEUS_MIMETYPE = 'text/plain; version=0.0.4'
+UNMATCHED_ENDPOINT = '<unmatched>'
+
+
+def _print_line(line):
+    sys.stdout.write(line + '\n')
+    sys.stdout.flush()
+
+
+def add_to_request_dependencies(operation, seconds):
+    """ Attributes the latency of a dependency to the current request, if any, to be exported along with it """
+    if has_request_context() and 'metrics_dependencies' in g:
+        g.metrics_dependencies[operation] = g.metrics_dependencies.get(operation, 0) + seconds * 1000
+
+
+def emf_record(namespace, endpoint, method, status_code, seconds, in_flight, dependencies, timestamp):
+    """
+    Builds a CloudWatch Embedded Metric Format record for a single request: once written to the Lambda logs,
+    CloudWatch extracts its latency, error and in-flight metrics by endpoint, and the latency of its dependencies.
+    """
+    dependency_metrics = {f'{operation}Latency': round(ms, 3) for operation, ms in dependencies.items()}
+    metrics = [
+        {'Name': 'Latency', 'Unit': 'Milliseconds'},
+        {'Name': 'Requests', 'Unit': 'Count'},
+        {'Name': 'ClientErrors', 'Unit': 'Count'},
+        {'Name': 'ServerErrors', 'Unit': 'Count'},
+        {'Name': 'InFlight', 'Unit': 'Count'},
+        *({'Name': name, 'Unit': 'Milliseconds'} for name in dependency_metrics),
+    ]
+    return {
+        '_aws': {
+            'Timestamp': timestamp,
+            'CloudWatchMetrics': [{'Namespace': namespace, 'Dimensions': [['Endpoint', 'Method']], 'Metrics': metrics}],
+        },
+        'Endpoint': endpoint,
+        'Method': method,
+        'StatusCode': status_code,
+        'Latency': round(seconds * 1000, 3),
+        'Requests': 1,
+        'ClientErrors': int(400 <= status_code < 500),
+        'ServerErrors': int(status_code >= 500),
+        'InFlight': in_flight,
+        **dependency_metrics,
+    }
+
+
+class RequestMetrics(object):
+    """
+    Records the count, status code and latency of the requests by endpoint (url rule), and the requests in flight.
+
+    Exporters: `prometheus` serves the registry in the Prometheus text format on `/metrics`, for the container
+    deployment, while `emf` writes an Embedded Metric Format line per request to stdout, for the Lambda deployment,
+    along with the latency of the dependencies timed with `api.metrics.timed` while serving it.
+    """
+
+    def __init__(self, app: Flask = None, registry: MetricsRegistry = None, exporter=None, namespace=EMF_NAMESPACE,
+                 write_line=_print_line, clock=time.time):
+        self.registry = registry or MetricsRegistry()
+        self.exporter = exporter
+        self.namespace = namespace
+        self.write_line = write_line
+        self.clock = clock
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        app.extensions['metrics'] = self
+        app.before_request(self.__request_started)
+        app.after_request(self.__request_finished)
+        app.teardown_request(self.__request_torn_down)
+        if self.exporter == 'prometheus':
+            app.add_url_rule('/metrics', 'metrics', self.prometheus_metrics)
+
+    def prometheus_metrics(self):
+        return Response(self.registry.prometheus_text(), mimetype=PROMETHEUS_MIMETYPE)
+
+    def __request_started(self):
+        g.metrics_endpoint = request.url_rule.rule if request.url_rule else UNMATCHED_ENDPOINT
+        g.metrics_start = self.registry.clock()
+        g.metrics_dependencies = {}
+        g.metrics_in_flight = self.registry.request_started(g.metrics_endpoint)
+
+    def __request_finished(self, response):
+        self.__record(response.status_code)
+        return response
+
+    def __request_torn_down(self, _exception=None):
+        # requests failing before their response is built still leave the in-flight gauge
+        self.__record(500)
+
+    def __record(self, status_code):
+        if 'metrics_start' not in g or g.get('metrics_recorded'):
+            return
+        g.metrics_recorded = True
+        endpoint, method = g.metrics_endpoint, request.method
+        seconds = self.registry.clock() - g.metrics_start
+        self.registry.request_finished(endpoint, method, status_code, seconds)
+        if self.exporter == 'emf':
+            record = emf_record(self.namespace, endpoint, method, status_code, seconds,
+                                g.metrics_in_flight, g.metrics_dependencies,
+                                int(self.clock() * 1000))
+            self.write_line(json.dumps(record))
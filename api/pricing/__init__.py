@@ -0,0 +1 @@
+from .price_index import Ec2PriceIndex, PriceKey, PriceRange, on_demand_price
@@ -0,0 +1,113 @@
+import json
+import logging
+import math
+import threading
+import time
+from collections import namedtuple
+
+from api.caching import TTLCache
+
+DEFAULT_TTL = 7 * 24 * 60 * 60
+DEFAULT_OPERATING_SYSTEM = 'Linux'
+DEFAULT_TENANCY = 'Shared'
+# default MaxCount of a ParallelCluster compute resource, used to weight the compute resources of a queue
+DEFAULT_MAX_COUNT = 10
+
+_logger = logging.getLogger(__name__)
+
+PriceKey = namedtuple('PriceKey', ['region', 'instance_type', 'operating_system', 'tenancy'])
+
+PriceRange = namedtuple('PriceRange', ['estimate', 'min', 'max'])
+
+
+def on_demand_price(product):
+    """ Returns the hourly on-demand price in USD of a price list product, None if not available """
+    for term in product['terms']['OnDemand'].values():
+        for dimension in term['priceDimensions'].values():
+            price = float(dimension['pricePerUnit']['USD'])
+            return None if math.isnan(price) else price
+    return None
+
+
+def _is_on_demand_instance(attributes):
+    # excludes dedicated hosts, reserved capacity and pre-installed software (e.g. SQL Server) variants
+    return attributes.get('preInstalledSw', 'NA') == 'NA' and attributes.get('capacitystatus', 'Used') == 'Used'
+
+
+class Ec2PriceIndex(object):
+    """
+    On-demand EC2 prices keyed by (region, instance type, operating system, tenancy).
+
+    Prices are loaded lazily, one key at a time, by `fetch_price(key)` (a Pricing API call) and cached for
+    `ttl` seconds: once warm a lookup is a dict access. The index can be seeded from a bulk price list
+    file (the `index.json` of the AmazonEC2 offer of a region), loaded on the first lookup, to avoid the
+    Pricing API calls altogether.
+    """
+
+    def __init__(self, fetch_price, ttl=DEFAULT_TTL, seed_file=None, clock=time.monotonic):
+        self.fetch_price = fetch_price
+        self.seed_file = seed_file
+        self._prices = TTLCache(ttl=ttl, stale_ttl=ttl, clock=clock)
+        self._seed_lock = threading.Lock()
+        self._seeded = seed_file is None
+
+    def price(self, region, instance_type, operating_system=DEFAULT_OPERATING_SYSTEM, tenancy=DEFAULT_TENANCY):
+        if not self._seeded:
+            self.__seed_once()
+        key = PriceKey(region, instance_type, operating_system, tenancy)
+        return self._prices.get(key, lambda: self.fetch_price(key))
+
+    def seed(self, path):
+        """ Loads the on-demand prices of a bulk price list file, returns the number of prices loaded """
+        with open(path) as f:
+            offer = json.load(f)
+
+        loaded = 0
+        for sku, product in offer.get('products', {}).items():
+            attributes = product.get('attributes', {})
+            terms = offer.get('terms', {}).get('OnDemand', {}).get(sku)
+            if 'instanceType' not in attributes or not terms or not _is_on_demand_instance(attributes):
+                continue
+            key = PriceKey(attributes.get('regionCode'), attributes['instanceType'],
+                           attributes.get('operatingSystem'), attributes.get('tenancy'))
+            self._prices.put(key, on_demand_price({'terms': {'OnDemand': terms}}))
+            loaded += 1
+        _logger.info(f'Seeded {loaded} EC2 prices from {path}')
+        return loaded
+
+    def price_range(self, region, compute_resources, operating_system=DEFAULT_OPERATING_SYSTEM,
+                    tenancy=DEFAULT_TENANCY):
+        """
+        Returns the hourly price range of a node of a queue, from its compute resources given as a list of
+        (instance types, max count) pairs: the min and max over all the instance types, and an estimate
+        averaging the price of each compute resource weighted by its max count.
+        Instance types without a price are ignored, all the values are None if none has a price.
+        """
+        weighted_sum, total_weight, prices = 0.0, 0, []
+        for instance_types, max_count in compute_resources:
+            resource_prices = [price for price in (self.price(region, instance_type, operating_system, tenancy)
+                                                   for instance_type in instance_types) if price is not None]
+            if not resource_prices:
+                continue
+            weight = max_count or DEFAULT_MAX_COUNT
+            weighted_sum += weight * sum(resource_prices) / len(resource_prices)
+            total_weight += weight
+            prices.extend(resource_prices)
+
+        if not prices:
+            return PriceRange(None, None, None)
+        return PriceRange(weighted_sum / total_weight, min(prices), max(prices))
+
+    def stats(self):
+        return self._prices.stats()
+
+    def __seed_once(self):
+        # the bulk file is loaded on the first lookup rather than at startup, failures fall back to fetch_price
+        with self._seed_lock:
+            if self._seeded:
+                return
+            try:
+                self.seed(self.seed_file)
+            except Exception as e:
+                _logger.warning(f'Failed to seed EC2 prices from {self.seed_file}: {e}')
+            self._seeded = True
@@ -1,7 +1,7 @@
 from flask import Flask, Blueprint, current_app, jsonify, request
 
 from api.security.csrf.constants import CSRF_SECRET_KEY, SALT, CSRF_COOKIE_NAME
-from api.security.csrf.csrf import generate_csrf_token, set_csrf_cookie
+from api.security.csrf.csrf import csrf_secret_key, generate_csrf_token, set_csrf_cookie
 
 from api.security.fingerprint import IFingerprintGenerator
 
@@ -10,8 +10,7 @@ csrf_blueprint = Blueprint('csrf', __name__)
 
 @csrf_blueprint.get('/csrf')
 def get_and_set_csrf_token():
-    csrf_secret_key = current_app.config.get(CSRF_SECRET_KEY)
-    csrf_token = generate_csrf_token(csrf_secret_key, SALT)
+    csrf_token = generate_csrf_token(csrf_secret_key(current_app), SALT)
     resp = jsonify(csrf_token=csrf_token)
     set_csrf_cookie(resp, csrf_token)
     return resp
@@ -24,7 +23,7 @@ class CSRF(object):
             self.init_app(app, fingerprint_generator)
 
     def init_app(self, app, fingerprint_generator: IFingerprintGenerator):
-        csrf_secret_key = fingerprint_generator.fingerprint()
-
-        app.config['CSRF_SECRET_KEY'] = csrf_secret_key
+        # the secret key is derived from the fingerprint on first use, see csrf_secret_key
+        app.config.pop(CSRF_SECRET_KEY, None)
+        app.extensions['csrf'] = fingerprint_generator
         app.register_blueprint(csrf_blueprint)
@@ -1,6 +1,7 @@
 import functools
 import hashlib
 import os
+import threading
 
 from flask import request, current_app
 from itsdangerous import BadSignature, URLSafeTimedSerializer
@@ -10,10 +11,22 @@ from api.security.csrf import CSRF_SECRET_KEY
 from api.security.csrf.constants import CSRF_COOKIE_NAME, SALT, CSRF_TOKEN_HEADER
 
 CSRF_DEFAULT_MAX_AGE = 30
+_secret_key_lock = threading.Lock()
 
 digest_method = hashlib.sha256
 signer_kwargs = {'signer_kwargs': {'digest_method': digest_method}}
 
+def csrf_secret_key(app):
+    """ Returns the CSRF secret key of `app`, computed by its fingerprint generator the first time it is needed """
+    secret_key = app.config.get(CSRF_SECRET_KEY)
+    if secret_key is None:
+        with _secret_key_lock:
+            secret_key = app.config.get(CSRF_SECRET_KEY)
+            if secret_key is None:
+                secret_key = app.config[CSRF_SECRET_KEY] = app.extensions['csrf'].fingerprint()
+    return secret_key
+
+
 def generate_csrf_token(secret_key, salt):
     serializer = URLSafeTimedSerializer(secret_key, salt, **signer_kwargs)
     csrf_token_value = hashlib.sha256(os.urandom(64)).hexdigest()
@@ -54,7 +67,7 @@ def csrf_needed(func):
 
         csrf_cookie = request.cookies.get(CSRF_COOKIE_NAME)
         csrf_header = request.headers.get(CSRF_TOKEN_HEADER)
-        secret_key = current_app.config[CSRF_SECRET_KEY]
+        secret_key = csrf_secret_key(current_app)
 
         if not csrf_cookie:
             raise ValueError('Missing CSRF cookie')
@@ -1,3 +1,4 @@
+import functools
 from hashlib import pbkdf2_hmac
 from abc import ABC
 
@@ -8,6 +9,14 @@ class IFingerprintGenerator(ABC):
         pass
 
 SALT = 'cognito-fingerprint-salt'.encode()
+ITERATIONS = 500_000
+
+
+@functools.lru_cache(maxsize=8)
+def _derive_fingerprint(to_encrypt):
+    # 500k PBKDF2 iterations take a few hundred milliseconds: derive each fingerprint once per process
+    return pbkdf2_hmac('sha256', to_encrypt.encode(), SALT, ITERATIONS).hex()
+
 
 class CognitoFingerprintGenerator(IFingerprintGenerator):
 
@@ -17,5 +26,24 @@ class CognitoFingerprintGenerator(IFingerprintGenerator):
         self.user_pool_id = user_pool_id
 
     def fingerprint(self):
-        to_encrypt = self.client_id + self.client_secret + self.user_pool_id
-        return pbkdf2_hmac('sha256', to_encrypt.encode(), SALT, 500_000).hex()
\ No newline at end of file
+        return _derive_fingerprint(self.client_id + self.client_secret + self.user_pool_id)
+
+
+class PrecomputedFingerprintGenerator(IFingerprintGenerator):
+    """ Fingerprint computed ahead of time (e.g. at deploy time) and provided through the environment or a secret """
+
+    def __init__(self, fingerprint):
+        self._fingerprint = fingerprint
+
+    def fingerprint(self):
+        return self._fingerprint
+
+
+class LazyFingerprintGenerator(IFingerprintGenerator):
+    """ Builds the actual generator on first use, once the settings it depends on are needed anyway """
+
+    def __init__(self, factory):
+        self.factory = factory
+
+    def fingerprint(self):
+        return self.factory().fingerprint()
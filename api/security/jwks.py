@@ -0,0 +1,102 @@
+import logging
+import threading
+import time
+
+from jose.exceptions import JWTError
+
+DEFAULT_JWKS_TTL = 60 * 60
+DEFAULT_MIN_REFRESH_INTERVAL = 30
+
+_logger = logging.getLogger(__name__)
+
+
+class JwksKeyStore(object):
+    """
+    In-process store of the JSON Web Keys used to verify tokens, keyed by `kid`.
+
+    Keys are served from memory until `ttl` expires; after that the stale keys keep being
+    served while a single background thread reloads the key set. A token signed with an
+    unknown `kid` (e.g. after a key rotation) triggers one synchronous reload, throttled by
+    `min_refresh_interval` so that forged tokens cannot be used to hammer the JWKS endpoint.
+    Background reloads are throttled the same way, so that a JWKS outage does not start a reload per request.
+    At most one reload is in flight at any time: concurrent callers wait for it and share its result.
+    A reload that fails or returns no keys raises and keeps the previous key set.
+    """
+
+    def __init__(self, fetch_jwks, ttl=DEFAULT_JWKS_TTL, min_refresh_interval=DEFAULT_MIN_REFRESH_INTERVAL):
+        self.fetch_jwks = fetch_jwks
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self._keys = {}
+        self._expires_at = 0
+        self._last_refresh = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def get_key(self, kid):
+        if not kid:
+            raise JWTError('Token header does not contain a key id')
+
+        with self._lock:
+            key = self._keys.get(kid)
+            expired = time.monotonic() >= self._expires_at
+            if key is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if key is not None:
+            if expired:
+                self._refresh_in_background()
+            return key
+
+        self.refresh()
+        with self._lock:
+            key = self._keys.get(kid)
+        if key is None:
+            raise JWTError(f'Unable to find a signing key that matches: {kid}')
+        return key
+
+    def refresh(self, force=False):
+        """ Reload the key set, unless another caller completed a reload while this one was waiting """
+        generation = self._generation
+        with self._refresh_lock:
+            if self._generation != generation:
+                return
+            now = time.monotonic()
+            if not force and self.__throttled(now):
+                return
+
+            self._last_refresh = now
+            jwks = self.fetch_jwks()
+            keys = {key['kid']: key for key in jwks.get('keys') or [] if 'kid' in key}
+            if not keys:
+                raise JWTError('The JWKS response does not contain any key')
+
+            with self._lock:
+                self._keys = keys
+                self._expires_at = now + self.ttl
+                self._generation += 1
+                self.refreshes += 1
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'refreshes': self.refreshes, 'keys': len(self._keys)}
+
+    def _refresh_in_background(self):
+        if self._refresh_lock.locked() or self.__throttled(time.monotonic()):
+            return
+        threading.Thread(target=self._refresh_safely, daemon=True).start()
+
+    def _refresh_safely(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            _logger.warning(f'Unable to refresh JWKS, stale keys will be used: {e}')
+
+    def __throttled(self, now):
+        return self._last_refresh is not None and now - self._last_refresh < self.min_refresh_interval
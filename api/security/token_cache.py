@@ -0,0 +1,70 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_SIZE = 1024
+
+
+class VerifiedTokenCache(object):
+    """
+    Bounded LRU of the claims of already verified tokens.
+
+    Entries are keyed by a hash of the token (plus the verification context, such as the audience),
+    so raw tokens are never kept in memory, and they expire at the token `exp` claim: an expired token
+    is always verified again, which preserves the ExpiredSignatureError driven refresh flow.
+    A `max_size` of 0 disables the cache.
+    """
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE, clock=time.time):
+        self.max_size = max_size
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token, *context):
+        key = self.__key(token, context)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, claims = entry
+            if self.clock() >= expires_at:
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(claims)
+
+    def put(self, token, claims, *context):
+        expires_at = claims.get('exp')
+        if self.max_size <= 0 or not isinstance(expires_at, (int, float)):
+            return
+
+        key = self.__key(token, context)
+        with self._lock:
+            self._entries[key] = (expires_at, dict(claims))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+    @staticmethod
+    def __key(token, context):
+        digest = hashlib.sha256(token.encode())
+        for value in context:
+            digest.update(b'\0' + repr(value).encode())
+        return digest.digest()
@@ -0,0 +1,3 @@
+from .accounting import NDJSON_MIMETYPE, SacctCursor, sacct_page_command, stream_accounting
+from .cancel import JOB_EXPRESSION, MAX_CANCEL_JOBS, expand_job_expressions, parse_scancel_output, scancel_command
+from .parsers import QueueJob, ScontrolJob, parse_scontrol_jobs, parse_scontrol_line, parse_squeue_jobs
@@ -0,0 +1,79 @@
+import json
+import shlex
+import time
+from collections import namedtuple
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+# fields returned for every job, `submit` is the first key of the pagination order
+JOB_FIELDS = '{name, user, partition, state, job_id, exit_code, submit: .time.submit}'
+
+
+class SacctCursor(namedtuple('SacctCursor', ['submit', 'job_id'])):
+    """ Position after the last returned job, jobs being ordered by submit time and then by job id """
+
+    def __str__(self):
+        return f'{self.submit}-{self.job_id}'
+
+    @staticmethod
+    def parse(token):
+        if not token:
+            return None
+        submit, job_id = token.split('-', 1)
+        return SacctCursor(int(submit), int(job_id))
+
+
+def sacct_page_command(filters, cursor, page_size):
+    """
+    Returns the command printing, one per line, the first `page_size` jobs after `cursor`.
+
+    Every page runs sacct with the same `filters`, hence over the same window as /manager/sacct (--starttime
+    selects the jobs in any state after it, not the jobs submitted after it), and jq skips the jobs up to the
+    cursor. Without a `starttime` sacct defaults to midnight of the current day on the head node: a cursor
+    resumed on another day should come with an explicit `starttime`.
+    """
+    jq_filter = f'[.jobs[] | {JOB_FIELDS}'
+    if cursor:
+        jq_filter += (f' | select(.submit > {cursor.submit} or '
+                      f'(.submit == {cursor.submit} and .job_id > {cursor.job_id}))')
+    jq_filter += f'] | sort_by(.submit, .job_id) | .[:{page_size}][]'
+
+    sacct_args = " ".join(f"--{shlex.quote(str(k))} {shlex.quote(str(v))}" for k, v in filters.items())
+    sacct_args += " --allusers" if "user" not in filters else ""
+    return f"sacct {sacct_args} --json | jq -c {shlex.quote(jq_filter)}"
+
+
+def stream_accounting(run_page, cursor, page_size, max_duration, clock=time.monotonic):
+    """
+    Yields the jobs returned by `run_page(cursor)` as NDJSON lines, page after page, so that only one page
+    is held in memory at a time. The last line holds the cursor to resume from, or null when all the jobs
+    were returned: pages stop being fetched once `max_duration` seconds have elapsed.
+
+    Errors of the first page are raised, before anything is sent, the following ones are yielded as an
+    `error` line since the response status has already been sent.
+    """
+    deadline = clock() + max_duration
+    first_page = True
+    while True:
+        try:
+            output = run_page(cursor)
+        except Exception as e:
+            if first_page:
+                raise
+            yield json.dumps({'error': str(e), 'cursor': str(cursor)}) + '\n'
+            return
+        first_page = False
+
+        jobs = 0
+        for line in output.splitlines():
+            job = json.loads(line)
+            cursor = SacctCursor(job['submit'], job['job_id'])
+            jobs += 1
+            yield line + '\n'
+
+        if jobs < page_size:
+            yield json.dumps({'cursor': None}) + '\n'
+            return
+        if clock() >= deadline:
+            yield json.dumps({'cursor': str(cursor)}) + '\n'
+            return
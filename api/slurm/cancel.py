@@ -0,0 +1,64 @@
+import re
+import shlex
+
+# a job id, a range of job ids, an array task or an array expression accepted by scancel
+JOB_EXPRESSION = re.compile(r'^(?:\d+|\d+-\d+|\d+_\d+|\d+_\[\d+(?:-\d+)?(?:%\d+)?(?:,\d+(?:-\d+)?)*\])$')
+MAX_CANCEL_JOBS = 1000
+
+_SCANCEL_ERROR = re.compile(r'error: .*?job id (?P<job_id>[^\s:]+):?\s*(?P<message>.*)$', re.IGNORECASE)
+
+
+def expand_job_expressions(expressions, max_jobs=MAX_CANCEL_JOBS):
+    """
+    Returns the job ids and array expressions to pass to scancel, with the ranges of job ids expanded
+    since scancel does not accept them. Raises a ValueError if the expressions cover more than `max_jobs`.
+    """
+    job_ids = []
+    for expression in expressions:
+        if not JOB_EXPRESSION.match(expression):
+            raise ValueError(f'Invalid job id {expression}')
+        if '-' in expression and '_' not in expression:
+            first, last = (int(job_id) for job_id in expression.split('-'))
+            if last < first or last - first >= max_jobs:
+                raise ValueError(f'Invalid job id range {expression}')
+            job_ids.extend(str(job_id) for job_id in range(first, last + 1))
+        else:
+            job_ids.append(expression)
+        if len(job_ids) > max_jobs:
+            raise ValueError(f'Cannot cancel more than {max_jobs} jobs at once')
+    # keeps the first occurrence of duplicates, in the requested order
+    return list(dict.fromkeys(job_ids))
+
+
+def scancel_command(job_ids):
+    """ A single scancel for all the jobs, its errors are printed on stdout to be parsed per job """
+    return f"scancel {' '.join(shlex.quote(job_id) for job_id in job_ids)} 2>&1 || true"
+
+
+def parse_scancel_output(job_ids, output):
+    """
+    Returns the outcome of cancelling each of `job_ids` from the scancel output, which only reports errors.
+    Errors reported for the tasks of an array expression (e.g. 12_3 for 12_[1-5]) are attributed to it.
+    """
+    errors = {}
+    unattributed = []
+    for line in output.splitlines():
+        match = _SCANCEL_ERROR.search(line)
+        if match:
+            errors.setdefault(match.group('job_id'), []).append(match.group('message'))
+        elif 'error' in line.lower():
+            unattributed.append(line.strip())
+
+    outcomes = []
+    for job_id in job_ids:
+        messages = list(errors.get(job_id, []))
+        if '[' in job_id:
+            array_job_id = job_id.split('_', 1)[0]
+            messages += [message for task_id, task_messages in errors.items()
+                         if task_id != job_id and task_id.split('_', 1)[0] == array_job_id
+                         for message in task_messages]
+        if messages:
+            outcomes.append({'job_id': job_id, 'status': 'failed', 'message': '; '.join(messages)})
+        else:
+            outcomes.append({'job_id': job_id, 'status': 'cancelled'})
+    return outcomes, unattributed
@@ -0,0 +1,130 @@
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Optional
+
+# scontrol keys start with an uppercase letter and may contain ':', '/' or '_' (e.g. `AllocNode:Sid`,
+# `Socks/Node`, `MCS_label`): a lowercase `key=value` inside a value (e.g. in `Command=`) is not a new field
+_SCONTROL_FIELD = re.compile(r'(?:^|\s)([A-Z][A-Za-z0-9_:/.]*)=')
+_USER_ID = re.compile(r'^(?P<name>[^(]*)\((?P<id>\d+)\)$')
+_INTEGER = re.compile(r'^-?\d+$')
+
+
+def parse_scontrol_line(line):
+    """
+    Parses a `scontrol show <entity> -o` line into a dict of its fields, keeping the values as printed.
+    Values may contain spaces, they extend up to the next field.
+    """
+    matches = list(_SCONTROL_FIELD.finditer(line))
+    fields = {}
+    for match, next_match in zip(matches, matches[1:] + [None]):
+        end = next_match.start() if next_match else len(line)
+        fields[match.group(1)] = line[match.end():end].strip()
+    return fields
+
+
+def _integer(value):
+    return int(value) if value and _INTEGER.match(value) else None
+
+
+def _user_and_id(value):
+    match = _USER_ID.match(value or '')
+    return (match.group('name'), int(match.group('id'))) if match else (value, None)
+
+
+@dataclass(frozen=True, slots=True)
+class ScontrolJob:
+    """ A job of `scontrol show job -o`, with its main fields typed and all the raw fields in `fields` """
+
+    job_id: int
+    name: str
+    user: Optional[str]
+    user_id: Optional[int]
+    partition: Optional[str]
+    state: Optional[str]
+    reason: Optional[str]
+    node_list: Optional[str]
+    array_job_id: Optional[int]
+    num_cpus: Optional[int]
+    priority: Optional[int]
+    restarts: Optional[int]
+    fields: dict = field(repr=False, compare=False)
+
+    @staticmethod
+    def from_fields(fields):
+        user, user_id = _user_and_id(fields.get('UserId'))
+        return ScontrolJob(
+            job_id=int(fields['JobId']),
+            name=fields.get('JobName', ''),
+            user=user,
+            user_id=user_id,
+            partition=fields.get('Partition'),
+            state=fields.get('JobState'),
+            reason=fields.get('Reason'),
+            node_list=fields.get('NodeList'),
+            array_job_id=_integer(fields.get('ArrayJobId')),
+            num_cpus=_integer(fields.get('NumCPUs')),
+            priority=_integer(fields.get('Priority')),
+            restarts=_integer(fields.get('Restarts')),
+            fields=fields,
+        )
+
+    def to_dict(self):
+        """ Returns the fields as printed by scontrol, the payload expected by the job details panel """
+        return dict(self.fields)
+
+
+def parse_scontrol_jobs(output):
+    """ Parses the jobs of one `scontrol show job -o` call, one per line, skipping lines without a JobId """
+    jobs = []
+    for line in output.splitlines():
+        fields = parse_scontrol_line(line.strip())
+        if _integer(fields.get('JobId')) is not None:
+            jobs.append(ScontrolJob.from_fields(fields))
+    return jobs
+
+
+@dataclass(frozen=True, slots=True)
+class QueueJob:
+    """ A job of `squeue --json` reduced to the fields shown by the Scheduling page """
+
+    job_id: int
+    name: str
+    partition: str
+    nodes: str
+    job_state: str
+    time: object
+
+    def to_dict(self):
+        return {
+            'job_id': self.job_id,
+            'name': self.name,
+            'partition': self.partition,
+            'nodes': self.nodes,
+            'job_state': self.job_state,
+            'time': self.time,
+        }
+
+
+def _job_state(value):
+    # Slurm >= 23.02 reports the state as a list of flags, e.g. ["PENDING"] or ["RUNNING", "COMPLETING"]
+    return ','.join(value) if isinstance(value, list) else value
+
+
+def parse_squeue_jobs(output):
+    """ Parses the jobs of `squeue --json`, either as printed or as the list of jobs extracted with jq """
+    if not output.strip():
+        return []
+    data = json.loads(output)
+    jobs = data.get('jobs', []) if isinstance(data, dict) else data
+    return [
+        QueueJob(
+            job_id=job['job_id'],
+            name=job.get('name', ''),
+            partition=job.get('partition', ''),
+            nodes=job.get('nodes', ''),
+            job_state=_job_state(job.get('job_state')),
+            time=job.get('time'),
+        )
+        for job in jobs
+    ]
@@ -0,0 +1,3 @@
+from .cleanup import LogStreamCleanup
+from .output import read_command_output, ssm_output_log_stream
+from .waiter import CommandTimeoutError, CommandWaiter
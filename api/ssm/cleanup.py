@@ -0,0 +1,87 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+DEFAULT_DELAY = 30
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_MAX_PENDING = 10000
+
+_logger = logging.getLogger(__name__)
+
+
+class LogStreamCleanup(object):
+    """
+    Deletes the CloudWatch log streams written by SSM commands on a background thread, off the request path.
+
+    The SSM agent uploads the output asynchronously, so a stream may not exist yet right after a command
+    completes: deletions are delayed by `delay` seconds and retried when the stream is not found.
+    Streams that cannot be deleted, or that do not fit the queue, are left to the retention of the log group.
+    """
+
+    def __init__(self, get_logs_client, delay=DEFAULT_DELAY, max_attempts=DEFAULT_MAX_ATTEMPTS,
+                 max_pending=DEFAULT_MAX_PENDING, background=True, clock=time.monotonic):
+        self.get_logs_client = get_logs_client
+        self.delay = delay
+        self.max_attempts = max_attempts
+        self.max_pending = max_pending
+        self.background = background
+        self.clock = clock
+        self.deleted = 0
+        self.failed = 0
+        self._pending = []
+        self._sequence = itertools.count()
+        self._worker = None
+        self._condition = threading.Condition()
+
+    def schedule(self, region, log_group_name, log_stream_name, attempt=1):
+        with self._condition:
+            if len(self._pending) >= self.max_pending:
+                _logger.warning(f'Log stream cleanup queue is full, {log_stream_name} is left to the log group retention')
+                return
+            due = self.clock() + self.delay * attempt
+            heapq.heappush(self._pending, (due, next(self._sequence), (region, log_group_name, log_stream_name, attempt)))
+            self._condition.notify()
+            if self.background and (self._worker is None or not self._worker.is_alive()):
+                self._worker = threading.Thread(target=self.__run, name='log-stream-cleanup', daemon=True)
+                self._worker.start()
+
+    def pending(self):
+        with self._condition:
+            return len(self._pending)
+
+    def flush(self):
+        """ Processes every scheduled deletion right away, including retries, on the calling thread """
+        while True:
+            with self._condition:
+                if not self._pending:
+                    return
+                _due, _sequence, item = heapq.heappop(self._pending)
+            self.__delete(*item)
+
+    def __run(self):
+        while True:
+            with self._condition:
+                while not self._pending or self._pending[0][0] > self.clock():
+                    timeout = self._pending[0][0] - self.clock() if self._pending else None
+                    self._condition.wait(timeout)
+                _due, _sequence, item = heapq.heappop(self._pending)
+            self.__delete(*item)
+
+    def __delete(self, region, log_group_name, log_stream_name, attempt):
+        try:
+            self.get_logs_client(region).delete_log_stream(logGroupName=log_group_name, logStreamName=log_stream_name)
+            self.deleted += 1
+            return
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ResourceNotFoundException' and attempt < self.max_attempts:
+                self.schedule(region, log_group_name, log_stream_name, attempt=attempt + 1)
+                return
+            error = e
+        except Exception as e:
+            error = e
+        self.failed += 1
+        _logger.warning(f'Failed to delete log stream {log_stream_name} in log group {log_group_name}: {error}')
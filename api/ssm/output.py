@@ -0,0 +1,27 @@
+# get_command_invocation returns at most the first 24,000 characters written to stdout
+INLINE_OUTPUT_LIMIT = 24000
+TRUNCATION_MARKER = '--output truncated--'
+
+
+def ssm_output_log_stream(command_id, instance_id):
+    return f"{command_id}/{instance_id}/aws-runShellScript/stdout"
+
+
+def is_inline_output_complete(invocation):
+    content = invocation.get('StandardOutputContent') or ''
+    return len(content) < INLINE_OUTPUT_LIMIT and TRUNCATION_MARKER not in content
+
+
+def normalize_output(content):
+    """ Drops blank lines and surrounding whitespace, as done when reading the output from CloudWatch """
+    return "\n".join(line.strip() for line in content.splitlines() if line.strip())
+
+
+def read_command_output(invocation, read_from_cloudwatch):
+    """
+    Returns the stdout of a completed command invocation, read inline from the invocation when it fits
+    the 24KB limit, and through `read_from_cloudwatch()` only when it has been truncated
+    """
+    if is_inline_output_complete(invocation):
+        return normalize_output(invocation.get('StandardOutputContent') or '')
+    return read_from_cloudwatch()
@@ -0,0 +1,79 @@
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+# Statuses of a command invocation that has not completed yet
+PENDING_STATUSES = {'Pending', 'InProgress', 'Delayed'}
+
+DEFAULT_INITIAL_DELAY = 0.1
+DEFAULT_MAX_DELAY = 2.0
+DEFAULT_BACKOFF = 2.0
+
+
+class CommandTimeoutError(Exception):
+    def __init__(self, command_id, timeout):
+        super().__init__(f'Timed out waiting for command {command_id} to complete after {timeout} seconds.')
+        self.command_id = command_id
+        self.timeout = timeout
+
+
+class CommandWaiter(object):
+    """
+    Waits for an SSM command invocation to complete, polling `get_command_invocation` with an
+    exponential backoff: fast commands (e.g. `squeue`) are picked up after a fraction of a second,
+    while slow ones do not burn API calls. It counts the polls needed by each command.
+    """
+
+    def __init__(self, initial_delay=DEFAULT_INITIAL_DELAY, max_delay=DEFAULT_MAX_DELAY, backoff=DEFAULT_BACKOFF,
+                 sleep=None, clock=time.monotonic):
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+        self.sleep = sleep
+        self.clock = clock
+        self.commands = 0
+        self.polls = 0
+        self._lock = threading.Lock()
+
+    def wait(self, ssm, command_id, instance_id, timeout):
+        """ Returns the completed invocation and the number of polls it took, raises CommandTimeoutError """
+        deadline = self.clock() + timeout
+        delay = self.initial_delay
+        polls = 0
+
+        while True:
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                self.__record(polls)
+                raise CommandTimeoutError(command_id, timeout)
+            self.__sleep(min(delay, remaining))
+            delay = min(delay * self.backoff, self.max_delay)
+
+            polls += 1
+            invocation = self.__get_invocation(ssm, command_id, instance_id)
+            if invocation is not None and invocation['Status'] not in PENDING_STATUSES:
+                self.__record(polls)
+                return invocation, polls
+
+    def stats(self):
+        with self._lock:
+            return {'commands': self.commands, 'polls': self.polls}
+
+    def __sleep(self, seconds):
+        (self.sleep or time.sleep)(seconds)
+
+    def __record(self, polls):
+        with self._lock:
+            self.commands += 1
+            self.polls += polls
+
+    @staticmethod
+    def __get_invocation(ssm, command_id, instance_id):
+        try:
+            return ssm.get_command_invocation(CommandId=command_id, InstanceId=instance_id)
+        except ClientError as e:
+            # the invocation may not be visible yet right after send_command
+            if e.response['Error']['Code'] == 'InvocationDoesNotExist':
+                return None
+            raise
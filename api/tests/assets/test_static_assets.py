@@ -0,0 +1,133 @@
+import gzip
+import os
+
+import pytest
+from flask import Flask
+
+from api.assets import StaticAssets, is_hashed_asset, static_assets
+from api.assets.precompress import precompress
+from awslambda.serverless_wsgi import generate_response
+
+INDEX_HTML = b'<!DOCTYPE html><html><head><script src="/_next/static/chunks/main.js"></script></head></html>' * 20
+MAIN_JS = b'console.log("pcui");\n' * 200
+
+
+@pytest.fixture
+def static_folder(tmp_path):
+    chunks = tmp_path / '_next' / 'static' / 'chunks'
+    chunks.mkdir(parents=True)
+    (tmp_path / 'index.html').write_bytes(INDEX_HTML)
+    (tmp_path / 'manifest.json').write_bytes(b'{"name": "pcui"}')
+    (chunks / 'main-0123456789abcdef.js').write_bytes(MAIN_JS)
+    return tmp_path
+
+
+@pytest.fixture
+def assets_app(static_folder, monkeypatch):
+    monkeypatch.setattr(static_assets, 'brotli', None)
+    app = Flask(__name__, static_url_path='', static_folder=str(static_folder))
+    StaticAssets(app)
+    app.get('/')(lambda: app.extensions['assets'].index())
+    return app
+
+
+def test_index_is_read_once_and_revalidated_with_an_etag(assets_app, mocker):
+    """
+    Given the SPA index.html
+      when it is requested multiple times
+        it should read it from disk only once
+        it should require revalidation, answered with a 304 while unchanged
+    """
+    client = assets_app.test_client()
+    read_index = mocker.spy(static_assets.IndexPage, '__init__')
+
+    response = client.get('/')
+    revalidation = client.get('/', headers={'If-None-Match': response.headers['ETag']})
+
+    assert response.data == INDEX_HTML
+    assert response.headers['Cache-Control'] == 'no-cache'
+    assert revalidation.status_code == 304
+    assert read_index.call_count == 1
+
+
+def test_index_is_served_gzipped_from_memory(assets_app):
+    response = assets_app.test_client().get('/index.html', headers={'Accept-Encoding': 'gzip'})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.data) == INDEX_HTML
+    assert 'Accept-Encoding' in response.headers['Vary']
+
+
+def test_hashed_assets_are_precompressed_and_immutable(assets_app, static_folder):
+    """
+    Given a hashed asset precompressed at build time
+      when a client accepting gzip requests it
+        it should send the gzip variant with the asset content type
+        it should make it cacheable for a year as immutable
+    """
+    precompress(str(static_folder))
+    response = assets_app.test_client().get('/_next/static/chunks/main-0123456789abcdef.js',
+                                            headers={'Accept-Encoding': 'gzip'})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.mimetype == 'text/javascript'
+    assert gzip.decompress(response.get_data()) == MAIN_JS
+    assert response.cache_control.immutable
+    assert response.cache_control.max_age == 365 * 24 * 60 * 60
+    response.close()
+
+
+def test_assets_are_sent_uncompressed_without_variants_or_accept_encoding(assets_app, static_folder):
+    precompress(str(static_folder))
+    client = assets_app.test_client()
+
+    asset = client.get('/_next/static/chunks/main-0123456789abcdef.js')
+    manifest = client.get('/manifest.json', headers={'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in asset.headers
+    assert asset.get_data() == MAIN_JS
+    assert 'Content-Encoding' not in manifest.headers
+    assert not manifest.cache_control.immutable
+    assert client.get('/missing.js').status_code == 404
+    asset.close()
+    manifest.close()
+
+
+def test_precompress_writes_only_the_variants_worth_it(static_folder):
+    bytes_in, bytes_out = precompress(str(static_folder))
+
+    assert os.path.isfile(static_folder / 'index.html.gz')
+    assert os.path.isfile(static_folder / '_next' / 'static' / 'chunks' / 'main-0123456789abcdef.js.gz')
+    assert not os.path.isfile(static_folder / 'manifest.json.gz')
+    assert bytes_out < bytes_in
+
+
+@pytest.mark.parametrize('filename, hashed', [
+    ('_next/static/chunks/pages/index.js', True),
+    ('static/js/main.1a2b3c4d.js', True),
+    ('img/logo.png', False),
+    ('manifest.json', False),
+])
+def test_is_hashed_asset(filename, hashed):
+    assert is_hashed_asset(filename) == hashed
+
+
+def test_assets_are_sent_uncompressed_through_the_lambda_adapter(static_folder, monkeypatch):
+    """
+    Given precompressed assets served in Lambda, behind a REST API without binary media types
+      when requesting index.html and a script through the Lambda adapter
+        it should return them uncompressed, as text bodies
+    """
+    monkeypatch.setattr(static_assets, 'brotli', None)
+    precompress(str(static_folder))
+    app = Flask(__name__, static_url_path='', static_folder=str(static_folder))
+    StaticAssets(app, compressed=False)
+    client = app.test_client()
+
+    for path, content in (('/index.html', INDEX_HTML), ('/_next/static/chunks/main-0123456789abcdef.js', MAIN_JS)):
+        response = client.get(path, headers={'Accept-Encoding': 'gzip, br'})
+        lambda_response = generate_response(response, {'headers': {}})
+
+        assert 'Content-Encoding' not in lambda_response['headers']
+        assert lambda_response['isBase64Encoded'] is False
+        assert lambda_response['body'].encode() == content
@@ -0,0 +1,79 @@
+import threading
+
+from api.aws.clients import ClientRegistry, LazyClient
+
+
+def test_client_registry_reuses_clients(mocker):
+    """
+    Given a client registry
+      when the same client is requested multiple times
+        it should build it only once
+        it should account for the construction time saved
+    """
+    create_client = mocker.patch('api.aws.clients.boto3.client')
+    registry = ClientRegistry()
+
+    assert registry.get('ec2', 'eu-west-1') is registry.get('ec2', 'eu-west-1')
+
+    create_client.assert_called_once_with('ec2', region_name='eu-west-1', config=None)
+    stats = registry.stats()
+    assert (stats['created'], stats['reused']) == (1, 1)
+    assert stats['construction_time_saved'] == stats['construction_time']
+
+
+def test_client_registry_keys_clients_by_service_region_and_config(mocker):
+    """
+    Given a client registry
+      when clients for different services, regions or configs are requested
+        it should build a client for each of them
+    """
+    create_client = mocker.patch('api.aws.clients.boto3.client', side_effect=lambda *args, **kwargs: object())
+    registry = ClientRegistry()
+
+    registry.get('ec2', 'eu-west-1')
+    registry.get('ec2', 'us-east-1')
+    registry.get('ssm', 'eu-west-1')
+    registry.get('ssm', 'eu-west-1', read_timeout=5)
+    registry.get('ssm', 'eu-west-1', read_timeout=5)
+
+    assert create_client.call_count == 4
+
+
+def test_client_registry_builds_clients_once_under_concurrency(mocker):
+    """
+    Given a client registry
+      when many threads request the same client at the same time
+        it should build it only once
+    """
+    create_client = mocker.patch('api.aws.clients.boto3.client', side_effect=lambda *args, **kwargs: object())
+    registry = ClientRegistry()
+    results = []
+
+    threads = [threading.Thread(target=lambda: results.append(registry.get('logs', 'eu-west-1'))) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    create_client.assert_called_once()
+    assert len({id(client) for client in results}) == 1
+
+
+def test_lazy_client_builds_the_client_on_first_use(mocker):
+    """
+    Given a lazy client
+      when it is created
+        it should not build the boto3 client
+      when one of its methods is called
+        it should call the shared client of the registry
+    """
+    create_client = mocker.patch('api.aws.clients.boto3.client')
+    client = LazyClient('ce', 'us-east-1')
+
+    create_client.assert_not_called()
+
+    client.get_cost_and_usage(Granularity='DAILY')
+    client.get_cost_and_usage(Granularity='MONTHLY')
+
+    create_client.assert_called_once_with('ce', region_name='us-east-1', config=None)
+    assert create_client.return_value.get_cost_and_usage.call_count == 2
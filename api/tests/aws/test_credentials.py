@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta, timezone
+
+import api.PclusterApiHandler
+from api.PclusterApiHandler import sigv4_request
+from api.aws.credentials import CachedCredentialsProvider, assumed_role_credentials
+
+
+def _sts_credentials(key_id, expires_in):
+    return {
+        'AccessKeyId': key_id,
+        'SecretAccessKey': 'secret',
+        'SessionToken': 'token',
+        'Expiration': datetime.now(timezone.utc) + expires_in,
+    }
+
+
+def test_cached_credentials_provider_loads_credentials_once(mocker):
+    """
+    Given a cached credentials provider
+      when credentials are requested multiple times
+        it should load them only once
+    """
+    load_credentials = mocker.Mock()
+    provider = CachedCredentialsProvider(load_credentials)
+
+    provider.get()
+    provider.get()
+
+    load_credentials.assert_called_once()
+
+
+def test_assumed_role_credentials_refreshed_before_expiry(mocker):
+    """
+    Given credentials of an assumed role
+      when they are about to expire
+        it should assume the role again
+      when they are not about to expire
+        it should reuse them
+    """
+    assume_role = mocker.Mock(side_effect=[
+        _sts_credentials('expiring', timedelta(minutes=5)),
+        _sts_credentials('fresh', timedelta(hours=1)),
+    ])
+    provider = CachedCredentialsProvider(lambda: assumed_role_credentials(assume_role))
+
+    assert provider.get().access_key == 'fresh'
+    assert provider.get().access_key == 'fresh'
+    assert assume_role.call_count == 2
+
+
+def test_sigv4_request_assumes_api_user_role_once(mocker):
+    """
+    Given an API_USER_ROLE
+      when multiple requests are proxied to the ParallelCluster API
+        it should assume the role only once
+    """
+    mocker.patch.object(api.PclusterApiHandler, 'API_USER_ROLE', 'arn:aws:iam::123456789012:role/api-user')
+    setup_api_credentials = mocker.patch('api.PclusterApiHandler.setup_api_credentials',
+                                         return_value=_sts_credentials('key-id', timedelta(hours=1)))
+    mocker.patch.object(api.PclusterApiHandler, 'api_user_credentials', CachedCredentialsProvider(
+        lambda: assumed_role_credentials(lambda: api.PclusterApiHandler.setup_api_credentials('role'))))
+    mock_request = mocker.patch.object(api.PclusterApiHandler.http_sessions, 'request')
+
+    host = 'https://api-id.execute-api.us-east-1.amazonaws.com/prod'
+    sigv4_request('GET', host, '/v3/clusters')
+    sigv4_request('GET', host, '/v3/clusters')
+
+    setup_api_credentials.assert_called_once()
+    assert 'Credential=key-id/' in mock_request.call_args.kwargs['headers']['Authorization']
@@ -0,0 +1,59 @@
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+import api.PclusterApiHandler
+from api.aws.secrets import LazySecret
+
+
+@pytest.fixture
+def secrets_client():
+    client = MagicMock()
+    client.get_secret_value.return_value = {
+        'SecretString': json.dumps({'userPoolId': 'secret-pool', 'clientId': 'secret-id', 'clientSecret': 'secret'})
+    }
+    return client
+
+
+def test_lazy_secret_is_read_once_on_first_use(secrets_client):
+    """
+    Given a lazy secret
+      when it is created
+        it should not read the secret
+      when its values are read multiple times
+        it should read the secret only once
+    """
+    secret = LazySecret('secret-id', lambda: secrets_client)
+
+    assert not secret.loaded
+    secrets_client.get_secret_value.assert_not_called()
+
+    assert secret.get('userPoolId') == 'secret-pool'
+    assert secret.get('clientId') == 'secret-id'
+    assert secret.get('missing', 'default') == 'default'
+    secrets_client.get_secret_value.assert_called_once_with(SecretId='secret-id')
+
+
+def test_lazy_secret_is_empty_when_not_configured_or_unreadable(secrets_client):
+    secrets_client.get_secret_value.side_effect = Exception('AccessDenied')
+
+    assert LazySecret(None, lambda: secrets_client).value() == {}
+    assert LazySecret('secret-id', lambda: secrets_client).get('userPoolId') is None
+
+
+def test_cognito_settings_are_read_from_the_secret(mocker, secrets_client):
+    """
+    Given the Cognito settings are not set in the environment
+      when a setting is first needed
+        it should read the settings from the secret
+    """
+    mocker.patch.object(api.PclusterApiHandler, 'cognito_secret', LazySecret('secret-id', lambda: secrets_client))
+    mocker.patch.object(api.PclusterApiHandler, 'JWKS_URL', None)
+    mocker.patch.object(api.PclusterApiHandler, 'REGION', 'eu-west-1')
+
+    assert api.PclusterApiHandler.cognito_user_pool_id() == 'secret-pool'
+    assert api.PclusterApiHandler.cognito_client_id() == 'secret-id'
+    assert api.PclusterApiHandler.cognito_client_secret() == 'secret'
+    assert api.PclusterApiHandler.jwks_url() == \
+        'https://cognito-idp.eu-west-1.amazonaws.com/secret-pool/.well-known/jwks.json'
@@ -0,0 +1,86 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from api.aws.sessions import HttpSessionPool
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    statuses = []
+    connections = set()
+
+    def do_GET(self):
+        StubHandler.connections.add(self.client_address)
+        status = StubHandler.statuses.pop(0) if StubHandler.statuses else 200
+        body = b'{}'
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Set-Cookie', 'session=shared')
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_POST = do_PUT = do_DELETE = do_GET
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    StubHandler.statuses, StubHandler.connections = [], set()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+    server.server_close()
+
+
+def test_session_pool_one_session_per_origin():
+    """
+    Given an http session pool
+      when requesting sessions for urls on the same origin
+        it should return the same session
+      when requesting sessions for urls on different origins
+        it should return different sessions
+    """
+    pool = HttpSessionPool()
+
+    assert pool.session_for('https://api.example.com/prod/v3/clusters') is pool.session_for('https://API.example.com/prod')
+    assert pool.session_for('https://api.example.com/prod') is not pool.session_for('https://bucket.s3.amazonaws.com/config')
+
+
+def test_session_pool_reuses_connections_and_ignores_cookies(stub_server):
+    """
+    Given an http session pool
+      when sending multiple requests to the same origin
+        it should reuse the same kept-alive connection
+        it should not store the cookies set by the server
+    """
+    pool = HttpSessionPool()
+
+    for _ in range(3):
+        assert pool.get(f'{stub_server}/v3/clusters', timeout=5).status_code == 200
+
+    assert len(StubHandler.connections) == 1
+    assert len(pool.session_for(stub_server).cookies) == 0
+
+
+def test_session_pool_retries_throttled_reads(stub_server):
+    """
+    Given an http session pool
+      when the server answers 429 or 503
+        it should retry reads
+        it should not retry creations, updates or deletions
+    """
+    pool = HttpSessionPool(backoff_factor=0)
+
+    StubHandler.statuses = [429, 503]
+    assert pool.get(stub_server, timeout=5).status_code == 200
+
+    for method in ('POST', 'PUT', 'DELETE'):
+        StubHandler.statuses = [503]
+        assert pool.request(method, stub_server, timeout=5).status_code == 503
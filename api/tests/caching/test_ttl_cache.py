@@ -0,0 +1,128 @@
+import threading
+import time
+
+import pytest
+
+from api.caching import SnapshotStore, TTLCache
+
+
+class FakeClock:
+    def __init__(self, now=0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_ttl_cache_serves_fresh_entries_without_reloading(mocker):
+    """
+    Given a ttl cache
+      when an entry is requested within its ttl
+        it should be served without calling the loader again
+      when the ttl is expired and there is no stale window
+        it should be reloaded synchronously
+    """
+    clock = FakeClock()
+    cache = TTLCache(ttl=10, clock=clock)
+    load = mocker.Mock(side_effect=['first', 'second'])
+
+    assert cache.get('key', load) == 'first'
+    clock.now = 9
+    assert cache.get('key', load) == 'first'
+    clock.now = 10
+    assert cache.get('key', load) == 'second'
+    assert cache.stats() == {'hits': 1, 'stale_hits': 0, 'misses': 2, 'size': 1}
+
+
+def test_ttl_cache_serves_stale_entries_while_revalidating():
+    """
+    Given a ttl cache with a stale window
+      when an expired entry within the stale window is requested
+        it should serve the stale value
+        it should reload the entry in the background
+    """
+    clock = FakeClock()
+    cache = TTLCache(ttl=10, stale_ttl=100, clock=clock)
+    cache.get('key', lambda: 'stale')
+    clock.now = 50
+
+    assert cache.get('key', lambda: 'fresh') == 'stale'
+    assert _wait_for(lambda: cache.get('key', lambda: 'unexpected') == 'fresh')
+
+
+def test_ttl_cache_single_flight_load():
+    """
+    Given a ttl cache
+      when many threads request the same missing key at the same time
+        it should call the loader once and share its result
+    """
+    cache = TTLCache(ttl=10)
+    calls, results = [], []
+
+    def load():
+        calls.append(1)
+        time.sleep(0.1)
+        return 'value'
+
+    threads = [threading.Thread(target=lambda: results.append(cache.get('key', load))) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == ['value'] * 10
+
+
+def test_ttl_cache_does_not_cache_failures():
+    """
+    Given a ttl cache
+      when the loader raises
+        it should propagate the exception
+        it should call the loader again on the next request
+    """
+    cache = TTLCache(ttl=10)
+
+    def failing_load():
+        raise ValueError('boom')
+
+    with pytest.raises(ValueError):
+        cache.get('key', failing_load)
+    assert cache.get('key', lambda: 'value') == 'value'
+
+
+def test_ttl_cache_evicts_least_recently_used_entries():
+    cache = TTLCache(ttl=10, max_size=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a', lambda: None)
+    cache.put('c', 3)
+
+    assert cache.age('a') is not None
+    assert cache.age('b') is None
+
+
+def test_ttl_cache_seeded_from_snapshots(tmp_path, mocker):
+    """
+    Given a ttl cache backed by snapshots
+      when a value is loaded
+        it should be saved as a snapshot
+      when a new cold cache is asked for the same key
+        it should serve the snapshot straight away and revalidate it in the background
+    """
+    snapshots = SnapshotStore(str(tmp_path), 'instance-types')
+    TTLCache(ttl=10, stale_ttl=100, snapshots=snapshots).get('eu-west-1', lambda: {'instance_types': ['t3.micro']})
+
+    cold_cache = TTLCache(ttl=10, stale_ttl=100, snapshots=snapshots)
+    load = mocker.Mock(return_value={'instance_types': ['t3.micro', 'c7g.large']})
+
+    assert cold_cache.get('eu-west-1', load) == {'instance_types': ['t3.micro']}
+    assert _wait_for(lambda: load.called)
+    assert (tmp_path / 'instance-types-eu-west-1.json').exists()
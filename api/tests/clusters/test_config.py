@@ -0,0 +1,92 @@
+from unittest import mock
+
+import pytest
+
+import api.PclusterApiHandler
+from api.caching import TTLCache
+from api.clusters import ClusterConfig, config_version
+
+CONFIG = """
+Scheduling:
+  Scheduler: slurm
+  SlurmQueues:
+    - Name: queue-1
+      ComputeResources:
+        - Name: c5
+          InstanceType: c5.large
+    - Name: queue-2
+      ComputeResources:
+        - Name: flex
+          Instances:
+            - InstanceType: c5.large
+            - InstanceType: c6i.large
+"""
+CONFIG_URL = '/manager/get_cluster_configuration?cluster_name=cluster&region=eu-west-1'
+
+
+def _cluster_info(version_id='v1', signature='sig-1', updated='2024-01-01T00:00:00.000Z'):
+    url = f'https://bucket.s3.amazonaws.com/parallelcluster/clusters/cluster/configs/cluster-config.yaml' \
+          f'?versionId={version_id}&X-Amz-Signature={signature}'
+    return {'clusterName': 'cluster', 'lastUpdatedTime': updated, 'clusterConfiguration': {'url': url}}
+
+
+@pytest.fixture
+def cluster_api(mocker):
+    cluster_info = {'value': _cluster_info()}
+    mocker.patch('api.PclusterApiHandler.get_base_url', return_value='https://api-id.execute-api.eu-west-1.amazonaws.com/prod')
+    mocker.patch('api.PclusterApiHandler.sigv4_request',
+                 side_effect=lambda *args, **kwargs: mock.Mock(status_code=200, json=lambda: cluster_info['value']))
+    download = mocker.patch.object(api.PclusterApiHandler.http_sessions, 'get',
+                                   return_value=mock.Mock(text=CONFIG, status_code=200))
+    mocker.patch.object(api.PclusterApiHandler, 'cluster_configs', TTLCache(ttl=60))
+    return cluster_info, download
+
+
+def test_config_version_ignores_the_presigned_url_signature():
+    """
+    Given two describe-cluster responses
+      when only the signature of the presigned url differs
+        it should return the same version
+      when the configuration object version or the cluster update time differ
+        it should return different versions
+    """
+    assert config_version(_cluster_info(signature='a')) == config_version(_cluster_info(signature='b'))
+    assert config_version(_cluster_info(version_id='v1')) != config_version(_cluster_info(version_id='v2'))
+    assert config_version(_cluster_info(updated='t1')) != config_version(_cluster_info(updated='t2'))
+
+
+def test_cluster_config_indexes_compute_resources_by_queue():
+    config = ClusterConfig(CONFIG)
+
+    assert [resource['Name'] for resource in config.compute_resources('queue-2')] == ['flex']
+    with pytest.raises(KeyError):
+        config.compute_resources('missing')
+
+
+def test_cluster_config_is_downloaded_once_per_version(client, mock_disable_auth, cluster_api):
+    """
+    Given a cluster configuration
+      when requested multiple times
+        it should download it only once
+      when the cluster is updated
+        it should download the new configuration
+    """
+    cluster_info, download = cluster_api
+
+    assert client.get(CONFIG_URL).get_data(as_text=True) == CONFIG
+    client.get(CONFIG_URL)
+    assert download.call_count == 1
+
+    cluster_info['value'] = _cluster_info(version_id='v2')
+    client.get(CONFIG_URL)
+    assert download.call_count == 2
+
+
+def test_cluster_config_download_failures_are_not_cached(client, mock_disable_auth, cluster_api):
+    _cluster_info_value, download = cluster_api
+    download.return_value.raise_for_status.side_effect = Exception('Forbidden')
+
+    assert client.get(CONFIG_URL).status_code == 400
+
+    download.return_value.raise_for_status.side_effect = None
+    assert client.get(CONFIG_URL).status_code == 200
@@ -0,0 +1,151 @@
+import gzip
+import json
+
+import pytest
+from flask import Flask, Response
+
+from api.caching import cacheable_json_response
+from api.compression import ResponseCompression
+from api.compression import response_compression
+from api.metrics import MetricsRegistry
+from api.utils import build_flask_app
+from awslambda.serverless_wsgi import generate_response
+
+LARGE_PAYLOAD = {'instanceTypes': [{'InstanceType': f'c5.{i}xlarge', 'VCpuInfo': {'DefaultVCpus': i}} for i in range(200)]}
+
+
+@pytest.fixture
+def compression(monkeypatch):
+    monkeypatch.setattr(response_compression, 'brotli', None)
+    return ResponseCompression(min_size=1024)
+
+
+@pytest.fixture
+def compressed_app(compression):
+    app = Flask(__name__)
+    compression.init_app(app)
+
+    @app.get('/large')
+    def large():
+        return LARGE_PAYLOAD
+
+    @app.get('/small')
+    def small():
+        return {'version': '3.1.0'}
+
+    @app.get('/cached')
+    def cached():
+        return cacheable_json_response(LARGE_PAYLOAD, max_age=60)
+
+    @app.get('/stream')
+    def stream():
+        return Response(iter([b'{"a": 1}\n'] * 500), mimetype='application/x-ndjson')
+
+    return app
+
+
+def test_large_json_responses_are_gzipped(compressed_app, compression):
+    """
+    Given a client accepting gzip
+      when requesting a JSON response larger than the threshold
+        it should return it gzipped, varying on Accept-Encoding
+        it should account for the bytes saved on the route
+    """
+    response = compressed_app.test_client().get('/large', headers={'Accept-Encoding': 'gzip, deflate'})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert int(response.headers['Content-Length']) == len(response.data)
+    assert gzip.decompress(response.data) == compressed_app.test_client().get('/large').data
+    stats = compression.stats()['/large']
+    assert stats['responses'] == 1
+    assert stats['bytes_saved'] == stats['bytes_in'] - len(response.data) > 0
+
+
+@pytest.mark.parametrize('path, accept_encoding', [
+    ('/large', None),
+    ('/large', 'identity'),
+    ('/large', 'gzip;q=0'),
+    ('/small', 'gzip'),
+    ('/stream', 'gzip'),
+])
+def test_responses_are_not_compressed(compressed_app, path, accept_encoding):
+    """
+    Given a response too small, streamed, or requested without accepting gzip
+      when returning it
+        it should not compress it
+    """
+    headers = {'Accept-Encoding': accept_encoding} if accept_encoding else {}
+
+    response = compressed_app.test_client().get(path, headers=headers)
+
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_compressed_responses_keep_answering_conditional_requests(compressed_app):
+    """
+    Given a cacheable response with an ETag
+      when it is compressed
+        it should carry a weak ETag
+        it should answer a revalidation with that ETag with a 304
+    """
+    client = compressed_app.test_client()
+    response = client.get('/cached', headers={'Accept-Encoding': 'gzip'})
+    etag = response.headers['ETag']
+
+    revalidation = client.get('/cached', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+
+    assert etag.startswith('W/')
+    assert revalidation.status_code == 304
+
+
+def test_compressed_bytes_are_reported_to_the_metrics_registry(compressed_app):
+    """
+    Given a metrics registry
+      when compressing a response
+        it should report the bytes saved on the route
+    """
+    registry = MetricsRegistry()
+    compressed_app.extensions['compression'].registry = registry
+
+    response = compressed_app.test_client().get('/large', headers={'Accept-Encoding': 'gzip'})
+
+    bytes_in = len(gzip.decompress(response.data))
+    text = registry.prometheus_text()
+    assert f'pcui_compression_input_bytes_total{{endpoint="/large"}} {bytes_in}' in text
+    assert f'pcui_compression_saved_bytes_total{{endpoint="/large"}} {bytes_in - len(response.data)}' in text
+
+
+def test_build_flask_app_does_not_compress_in_lambda(monkeypatch):
+    """
+    Given the app built for Lambda, behind a REST API without binary media types
+      when returning a large JSON response through the Lambda adapter
+        it should return it uncompressed, as a text body
+    """
+    monkeypatch.setenv('AWS_LAMBDA_FUNCTION_NAME', 'ParallelClusterUIFun')
+    app = build_flask_app(__name__)
+    app.get('/large')(lambda: LARGE_PAYLOAD)
+
+    response = app.test_client().get('/large', headers={'Accept-Encoding': 'gzip, br'})
+    lambda_response = generate_response(response, {'headers': {}})
+
+    assert 'compression' not in app.extensions
+    assert 'Content-Encoding' not in lambda_response['headers']
+    assert lambda_response['isBase64Encoded'] is False
+    assert json.loads(lambda_response['body']) == LARGE_PAYLOAD
+
+
+def test_brotli_is_preferred_when_installed():
+    brotli = pytest.importorskip('brotli')
+    app = Flask(__name__)
+    ResponseCompression(app)
+    app.get('/large')(lambda: LARGE_PAYLOAD)
+
+    response = app.test_client().get('/large', headers={'Accept-Encoding': 'gzip, deflate, br'})
+
+    assert response.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(response.data).startswith(b'{"instanceTypes"')
+
+
+def test_build_flask_app_registers_response_compression(app):
+    assert isinstance(app.extensions['compression'], ResponseCompression)
@@ -1,14 +1,26 @@
 import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
 
+import api.PclusterApiHandler
 import api.security
+from api.aws.clients import clients
 from app import run
-import app as _app
 
 @pytest.fixture(autouse=True)
 def mock_cognito_variables(mocker):
-    mocker.patch.object(_app, 'CLIENT_ID', 'client-id')
-    mocker.patch.object(_app, 'USER_POOL_ID', 'user-pool')
-    mocker.patch.object(_app, 'CLIENT_SECRET', 'client-secret')
+    mocker.patch.object(api.PclusterApiHandler, 'CLIENT_ID', 'client-id')
+    mocker.patch.object(api.PclusterApiHandler, 'USER_POOL_ID', 'user-pool')
+    mocker.patch.object(api.PclusterApiHandler, 'CLIENT_SECRET', 'client-secret')
+    mocker.patch.object(api.PclusterApiHandler, 'CSRF_FINGERPRINT', 'csrf-fingerprint')
+
+@pytest.fixture(autouse=True)
+def clear_aws_clients():
+    """ boto3 clients are shared across requests, make sure mocked clients do not leak between tests """
+    clients.clear()
+    yield
+    clients.clear()
 
 @pytest.fixture()
 def app():
@@ -54,4 +66,24 @@ def mock_csrf_needed(mocker, app):
 
 @pytest.fixture
 def mock_disable_auth(mocker):
-    mocker.patch.object(api.utils, 'DISABLE_AUTH', True)
\ No newline at end of file
+    mocker.patch.object(api.utils, 'DISABLE_AUTH', True)
+
+class SigningKey:
+    """ RSA key pair able to sign tokens the same way Cognito does, exposing its public JWK """
+
+    def __init__(self, kid):
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.kid = kid
+        self.private_pem = private_key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                                     serialization.NoEncryption())
+        public_pem = private_key.public_key().public_bytes(serialization.Encoding.PEM,
+                                                           serialization.PublicFormat.SubjectPublicKeyInfo)
+        self.jwk = {**jwk.construct(public_pem, 'RS256').to_dict(), 'kid': kid}
+
+    def sign(self, claims):
+        return jwt.encode(claims, self.private_pem, algorithm='RS256', headers={'kid': self.kid})
+
+
+@pytest.fixture(scope='session')
+def signing_key():
+    return SigningKey('test-kid')
@@ -0,0 +1,87 @@
+import threading
+import time
+from datetime import date, timedelta
+
+
+class FakeCostExplorer:
+    """
+    Stand-in for the `ce` client: get_cost_and_usage returns the daily costs of `daily_costs(cluster, day)`
+    aggregated by DAILY or MONTHLY periods, `page_size` periods (or groups, when grouping by cluster) per page
+    like Cost Explorer paginates.
+    Each request takes `latency` seconds. It records every request, and the max number of requests in flight
+    at the same time.
+    """
+
+    def __init__(self, daily_costs=lambda cluster, day: 1.0, page_size=5, clusters=('cluster-name',), latency=0.01):
+        self.daily_costs = daily_costs
+        self.page_size = page_size
+        self.clusters = clusters
+        self.latency = latency
+        self.requests = []
+        self.max_concurrency = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def get_cost_and_usage(self, TimePeriod, Granularity, Metrics, Filter=None, GroupBy=None, NextPageToken=None):
+        with self._lock:
+            self.requests.append({'TimePeriod': TimePeriod, 'Granularity': Granularity, 'Metrics': Metrics,
+                                  'Filter': Filter, 'GroupBy': GroupBy, 'NextPageToken': NextPageToken})
+            self._in_flight += 1
+            self.max_concurrency = max(self.max_concurrency, self._in_flight)
+        try:
+            time.sleep(self.latency)
+            periods = self.__periods(TimePeriod['Start'], TimePeriod['End'], Granularity)
+            # grouped results are paginated by group, so that the groups of a period may span several pages
+            rows = [(period, cluster) for period in periods for cluster in self.clusters] if GroupBy else \
+                [(period, None) for period in periods]
+            offset = int(NextPageToken or 0)
+            page = rows[offset:offset + self.page_size]
+            page_periods = list(dict.fromkeys(period for period, _cluster in page))
+            response = {
+                'ResponseMetadata': {'HTTPStatusCode': 200},
+                'ResultsByTime': [
+                    self.__result(start, end, Metrics, Filter, GroupBy,
+                                  [cluster for period, cluster in page if period == (start, end)])
+                    for start, end in page_periods
+                ],
+            }
+            if offset + self.page_size < len(rows):
+                response['NextPageToken'] = str(offset + self.page_size)
+            return response
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def __result(self, start, end, metrics, cost_filter, group_by, clusters):
+        days = [date.fromisoformat(start) + timedelta(days=n)
+                for n in range((date.fromisoformat(end) - date.fromisoformat(start)).days)]
+        result = {'TimePeriod': {'Start': start, 'End': end}, 'Estimated': False}
+        if group_by:
+            result['Total'] = {}
+            result['Groups'] = [
+                {'Keys': [f'{group_by[0]["Key"]}${cluster}'],
+                 'Metrics': {metric: self.__amount(cluster, days) for metric in metrics}}
+                for cluster in clusters
+            ]
+        else:
+            cluster = cost_filter['Tags']['Values'][0]
+            result['Total'] = {metric: self.__amount(cluster, days) for metric in metrics}
+            result['Groups'] = []
+        return result
+
+    def __amount(self, cluster, days):
+        return {'Amount': str(sum(self.daily_costs(cluster, day) for day in days)), 'Unit': 'USD'}
+
+    @staticmethod
+    def __periods(start, end, granularity):
+        periods = []
+        period_start, end_date = date.fromisoformat(start), date.fromisoformat(end)
+        while period_start < end_date:
+            if granularity == 'DAILY':
+                period_end = period_start + timedelta(days=1)
+            else:
+                period_end = (period_start.replace(day=1) + timedelta(days=32)).replace(day=1)
+            period_end = min(period_end, end_date)
+            periods.append((period_start.isoformat(), period_end.isoformat()))
+            period_start = period_end
+        return periods
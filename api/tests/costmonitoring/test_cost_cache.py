@@ -0,0 +1,173 @@
+import threading
+from datetime import date
+from unittest import mock
+
+import importlib
+
+import pytest
+
+from api.caching import TTLCache
+from api.costmonitoring.cost_cache import CostDataCache, cost_periods
+from api.costmonitoring.costexplorer_client import CostExplorerClient
+from api.tests.costmonitoring.fake_ce import FakeCostExplorer
+from api.tests.ssm.fake_ssm import VirtualClock
+
+# the package exports the `costs` blueprint, shadowing the module of the same name
+costs_module = importlib.import_module('api.costmonitoring.costs')
+
+COSTS_URL = '/cost-monitoring/clusters/cluster-name?start=2023-05-01T00:00:00Z&end=2023-07-15T00:00:00Z'
+
+
+@pytest.fixture
+def costexplorer():
+    return FakeCostExplorer(page_size=100, latency=0)
+
+
+@pytest.fixture
+def clock():
+    return VirtualClock()
+
+
+def _cache(costexplorer, clock, today=date(2023, 7, 15)):
+    client = CostExplorerClient(costexplorer, cost_allocation_tags=['parallelcluster:cluster-name'])
+    return CostDataCache(client.get_cost_results, open_period_ttl=3600, clock=clock, today=lambda: today)
+
+
+def test_cost_periods_follow_cost_explorer_boundaries():
+    assert cost_periods('2023-05-15', '2023-07-10', 'MONTHLY') == [
+        ('2023-05-15', '2023-06-01'), ('2023-06-01', '2023-07-01'), ('2023-07-01', '2023-07-10')
+    ]
+    assert cost_periods('2023-05-30', '2023-06-01', 'DAILY') == [('2023-05-30', '2023-05-31'), ('2023-05-31', '2023-06-01')]
+
+
+def test_cost_cache_refreshes_only_the_open_period(costexplorer, clock):
+    """
+    Given cost data for closed months and the current one
+      when requested again before the open period expires
+        it should not call Cost Explorer
+      when requested again after the open period expired
+        it should only fetch the open period
+    """
+    cache = _cache(costexplorer, clock)
+
+    results, freshness = cache.get('cluster-name', '2023-05-01', '2023-07-15', 'MONTHLY')
+    assert [result['TimePeriod']['Start'] for result in results] == ['2023-05-01', '2023-06-01', '2023-07-01']
+    assert freshness == 3600
+
+    clock.sleep(600)
+    _results, freshness = cache.get('cluster-name', '2023-05-01', '2023-07-15', 'MONTHLY')
+    assert freshness == 3000
+    assert len(costexplorer.requests) == 1
+
+    clock.sleep(3600)
+    results, _freshness = cache.get('cluster-name', '2023-05-01', '2023-07-15', 'MONTHLY')
+    assert len(results) == 3
+    assert costexplorer.requests[-1]['TimePeriod'] == {'Start': '2023-07-01', 'End': '2023-07-15'}
+
+
+def test_cost_cache_keeps_estimated_periods_mutable(costexplorer, clock):
+    """
+    Given a closed period whose costs are still estimated by Cost Explorer
+      when the open period ttl elapses
+        it should fetch it again
+    """
+    cache = _cache(costexplorer, clock, today=date(2023, 8, 10))
+    original_get_cost_and_usage = costexplorer.get_cost_and_usage
+
+    def estimated_july(**kwargs):
+        response = original_get_cost_and_usage(**kwargs)
+        for result in response['ResultsByTime']:
+            result['Estimated'] = result['TimePeriod']['Start'] == '2023-07-01'
+        return response
+
+    costexplorer.get_cost_and_usage = estimated_july
+    _results, freshness = cache.get('cluster-name', '2023-06-01', '2023-08-01', 'MONTHLY')
+    clock.sleep(3600)
+    cache.get('cluster-name', '2023-06-01', '2023-08-01', 'MONTHLY')
+
+    assert freshness == 3600
+    assert costexplorer.requests[-1]['TimePeriod'] == {'Start': '2023-07-01', 'End': '2023-08-01'}
+
+
+def test_cost_cache_keys_include_cluster_and_granularity(costexplorer, clock):
+    cache = _cache(costexplorer, clock)
+
+    cache.get('cluster-name', '2023-05-01', '2023-06-01', 'MONTHLY')
+    cache.get('cluster-name', '2023-05-01', '2023-06-01', 'DAILY')
+    cache.get('other-cluster', '2023-05-01', '2023-06-01', 'MONTHLY')
+
+    assert len(costexplorer.requests) == 3
+
+
+def test_cost_cache_single_fetch_for_concurrent_misses(clock):
+    """
+    Given cost data that is not cached yet
+      when many concurrent requests ask for the same periods
+        it should call Cost Explorer once for all of them
+    """
+    costexplorer = FakeCostExplorer(page_size=100, latency=0.1)
+    cache = _cache(costexplorer, clock)
+    results = []
+
+    def get():
+        results.append(cache.get('cluster-name', '2023-05-01', '2023-07-15', 'MONTHLY')[0])
+
+    threads = [threading.Thread(target=get) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(costexplorer.requests) == 1
+    assert [len(result) for result in results] == [3] * 5
+
+
+def test_cost_cache_stores_periods_without_results(clock):
+    """
+    Given periods Cost Explorer returns no results for
+      when requested again
+        it should not fetch the closed periods again
+        it should fetch the open period again once expired
+    """
+    fetch = mock.Mock(return_value=[])
+    cache = CostDataCache(fetch, open_period_ttl=3600, clock=clock, today=lambda: date(2023, 7, 15))
+
+    assert cache.get('cluster-name', '2023-05-01', '2023-07-15', 'MONTHLY') == ([], 3600)
+    assert cache.get('cluster-name', '2023-05-01', '2023-07-15', 'MONTHLY') == ([], 3600)
+    assert fetch.call_count == 1
+
+    clock.sleep(3600)
+    cache.get('cluster-name', '2023-05-01', '2023-07-15', 'MONTHLY')
+    assert fetch.call_args_list[-1].args == ('cluster-name', '2023-07-01', '2023-07-15', 'MONTHLY')
+
+
+def test_get_cost_data_for_returns_cacheable_response(client, mock_disable_auth, mocker, costexplorer, clock):
+    """
+    Given the cost data endpoint
+      when requested twice
+        it should call Cost Explorer once
+        it should carry Cache-Control and ETag headers
+        it should answer a revalidation with an unchanged ETag with a 304
+    """
+    mocker.patch.object(costs_module, 'cost_data', _cache(costexplorer, clock))
+
+    response = client.get(COSTS_URL)
+    revalidation = client.get(COSTS_URL, headers={'If-None-Match': response.headers['ETag']})
+
+    assert response.status_code == 200
+    assert [cost['period']['start'] for cost in response.json['costs']] == ['2023-05-01', '2023-06-01', '2023-07-01']
+    assert response.headers['Cache-Control'] == 'private, max-age=3600'
+    assert revalidation.status_code == 304
+    assert len(costexplorer.requests) == 1
+
+
+def test_cost_monitoring_status_is_cached_until_activation(client, mock_disable_auth, mock_csrf_needed, mocker):
+    mocker.patch.object(costs_module, 'cost_monitoring_status_cache', TTLCache(ttl=600))
+    is_active = mocker.patch.object(costs_module.client, 'is_active', side_effect=[False, True])
+    mocker.patch.object(costs_module.client, 'activate')
+
+    assert client.get('/cost-monitoring').json == {'active': False}
+    assert client.get('/cost-monitoring').json == {'active': False}
+    client.put('/cost-monitoring')
+    assert client.get('/cost-monitoring').json == {'active': True}
+    assert is_active.call_count == 2
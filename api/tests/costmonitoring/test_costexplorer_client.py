@@ -1,7 +1,8 @@
 import pytest
 
 from botocore.exceptions import ClientError
-from api.costmonitoring.costexplorer_client import CostExplorerClient, CostMonitoringActivationException
+from api.costmonitoring.costexplorer_client import CostExplorerClient, CostMonitoringActivationException, split_in_windows
+from api.tests.costmonitoring.fake_ce import FakeCostExplorer
 
 
 @pytest.fixture
@@ -242,3 +243,48 @@ def test_get_cost_data_missing_parameter(costexplorer):
     assert 'cluster_name' in str(ex_cluster_name.value)
     assert 'start' in str(ex_start_date.value)
     assert 'end' in str(ex_end_date.value)
+
+
+def test_get_cost_data_follows_next_page_token():
+    """
+    Given a cost explorer returning its results on multiple pages
+      when retrieving cost data
+        it should pass the next page token back until the last page
+        it should return each period once
+    """
+    costexplorer = FakeCostExplorer(page_size=10)
+    client = CostExplorerClient(costexplorer, cost_allocation_tags=['parallelcluster:cluster-name'])
+
+    costs = client.get_cost_data('cluster-name', start='2023-05-01', end='2023-06-01', granularity='DAILY')
+
+    assert [cost['period']['start'] for cost in costs] == [f'2023-05-{day:02}' for day in range(1, 32)]
+    assert [request['NextPageToken'] for request in costexplorer.requests] == [None, '10', '20', '30']
+
+
+def test_get_cost_data_fetches_long_ranges_in_concurrent_windows():
+    """
+    Given a date range longer than the window size
+      when retrieving cost data
+        it should fetch windows aligned on months concurrently, with bounded parallelism
+        it should merge the periods in order
+    """
+    costexplorer = FakeCostExplorer(daily_costs=lambda cluster, day: day.month, page_size=2)
+    client = CostExplorerClient(costexplorer, cost_allocation_tags=['parallelcluster:cluster-name'],
+                                window_months=2, max_workers=3)
+
+    costs = client.get_cost_data('cluster-name', start='2023-01-15', end='2024-01-01')
+
+    assert [cost['period']['start'] for cost in costs] == ['2023-01-15'] + [f'2023-{month:02}-01' for month in range(2, 13)]
+    assert costs[1] == {'period': {'start': '2023-02-01', 'end': '2023-03-01'}, 'amount': 2 * 28, 'unit': 'USD'}
+    assert sorted(request['TimePeriod']['Start'] for request in costexplorer.requests if not request['NextPageToken']) == [
+        '2023-01-15', '2023-03-01', '2023-05-01', '2023-07-01', '2023-09-01', '2023-11-01'
+    ]
+    assert 1 < costexplorer.max_concurrency <= 3
+
+
+def test_split_in_windows_aligns_on_months():
+    assert split_in_windows('2023-01-15', '2023-03-10', months=1) == [
+        ('2023-01-15', '2023-02-01'), ('2023-02-01', '2023-03-01'), ('2023-03-01', '2023-03-10')
+    ]
+    assert split_in_windows('2023-11-01', '2024-02-01', months=3) == [('2023-11-01', '2024-02-01')]
+    assert split_in_windows('2023-01-01', '2023-01-01') == []
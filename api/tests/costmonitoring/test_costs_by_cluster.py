@@ -0,0 +1,85 @@
+import importlib
+
+import pytest
+
+from api.costmonitoring.cost_cache import CostDataCache
+from api.costmonitoring.costexplorer_client import CostExplorerClient
+from api.tests.costmonitoring.fake_ce import FakeCostExplorer
+
+# the package exports the `costs` blueprint, shadowing the module of the same name
+costs_module = importlib.import_module('api.costmonitoring.costs')
+
+COSTS_BY_CLUSTER_URL = '/cost-monitoring/clusters?start=2023-05-01T00:00:00Z&end=2023-07-01T00:00:00Z'
+CLUSTERS = ('cluster-b', 'cluster-a', '')
+
+
+def _daily_costs(cluster, day):
+    return {'cluster-a': 1.0, 'cluster-b': 2.0, '': 100.0}[cluster] * day.month
+
+
+@pytest.fixture
+def costexplorer():
+    return FakeCostExplorer(daily_costs=_daily_costs, page_size=2, clusters=CLUSTERS, latency=0)
+
+
+def test_get_cost_results_by_cluster_merges_groups_split_across_pages(costexplorer):
+    """
+    Given costs grouped by cluster returned on pages splitting the groups of a period
+      when retrieving them
+        it should return one result per period with all its groups
+    """
+    client = CostExplorerClient(costexplorer, cost_allocation_tags=['parallelcluster:cluster-name'])
+
+    results = client.get_cost_results_by_cluster('2023-05-01', '2023-07-01', 'MONTHLY', ['UnblendedCost'])
+
+    assert [result['TimePeriod']['Start'] for result in results] == ['2023-05-01', '2023-06-01']
+    assert [len(result['Groups']) for result in results] == [3, 3]
+    assert len(costexplorer.requests) == 3
+    assert costexplorer.requests[0]['GroupBy'] == [{'Type': 'TAG', 'Key': 'parallelcluster:cluster-name'}]
+
+
+def test_costs_by_cluster_returns_periods_by_clusters_matrix(costexplorer):
+    """
+    Given costs grouped by cluster for multiple metrics
+      when mapping them
+        it should return one matrix per metric with a row per period and a column per cluster
+        it should drop the costs not tagged with a cluster name
+    """
+    client = CostExplorerClient(costexplorer, cost_allocation_tags=['parallelcluster:cluster-name'])
+    metrics = ['UnblendedCost', 'BlendedCost']
+    results = client.get_cost_results_by_cluster('2023-05-01', '2023-07-01', 'MONTHLY', metrics)
+
+    costs = CostExplorerClient.costs_by_cluster(results, metrics)
+
+    assert costs['periods'] == {'start': ['2023-05-01', '2023-06-01'], 'end': ['2023-06-01', '2023-07-01']}
+    assert costs['clusters'] == ['cluster-a', 'cluster-b']
+    assert costs['metrics']['UnblendedCost'] == {'unit': 'USD', 'amounts': [[31 * 5, 62 * 5], [30 * 6, 60 * 6]]}
+    assert costs['metrics']['BlendedCost'] == costs['metrics']['UnblendedCost']
+
+
+def test_get_cost_data_by_cluster_uses_a_single_query(client, mock_disable_auth, mocker, costexplorer):
+    """
+    Given the cost data by cluster endpoint
+      when requested with daily granularity and multiple metrics
+        it should query Cost Explorer for all the clusters at once
+    """
+    costexplorer.page_size = 1000
+    explorer_client = CostExplorerClient(costexplorer, cost_allocation_tags=['parallelcluster:cluster-name'])
+    mocker.patch.object(costs_module, 'cost_data_by_cluster', CostDataCache(
+        lambda metrics, start, end, granularity: explorer_client.get_cost_results_by_cluster(start, end, granularity, metrics),
+        open_period_ttl=60,
+    ))
+
+    response = client.get(COSTS_BY_CLUSTER_URL + '&granularity=DAILY&metrics=UnblendedCost,UsageQuantity')
+
+    assert response.status_code == 200
+    assert len(response.json['periods']['start']) == 61
+    assert response.json['clusters'] == ['cluster-a', 'cluster-b']
+    assert set(response.json['metrics']) == {'UnblendedCost', 'UsageQuantity'}
+    assert len(costexplorer.requests) == 1
+    assert costexplorer.requests[0]['Metrics'] == ['UnblendedCost', 'UsageQuantity']
+
+
+@pytest.mark.parametrize('metrics', ['Unknown', 'UnblendedCost,UnblendedCost', 'UnblendedCost;reboot'])
+def test_get_cost_data_by_cluster_rejects_invalid_metrics(client, mock_disable_auth, metrics):
+    assert client.get(COSTS_BY_CLUSTER_URL + f'&metrics={metrics}').status_code == 400
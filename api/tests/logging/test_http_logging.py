@@ -0,0 +1,168 @@
+import logging
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+from flask import Flask, Response
+
+from api.logging import RequestResponseLogging, parse_sample_rates
+from api.logging.async_logging import AsyncLogging
+from api.logging.http_info import log_response_body_and_headers
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self, gate=None):
+        super().__init__()
+        self.records = []
+        self.threads = set()
+        self.gate = gate
+
+    def emit(self, record):
+        if self.gate:
+            self.gate.wait(5)
+        self.records.append(record)
+        self.threads.add(threading.current_thread().name)
+
+
+def _logged_bodies(logger):
+    return [call.args[0].get('body') for call in logger.info.call_args_list]
+
+
+def test_large_bodies_are_truncated_with_their_hash_and_not_parsed(mocker):
+    """
+    Given a JSON response larger than the max body size
+      when logging it
+        it should log it truncated, with its size and sha256
+        it should not parse it
+    """
+    logger = MagicMock()
+    response = Response('{"regions": ["' + 'eu-west-1", "' * 1000 + 'us-east-1"]}', mimetype='application/json')
+    get_json = mocker.spy(response, 'get_json')
+
+    log_response_body_and_headers(logger, response, max_body_size=64)
+
+    body = _logged_bodies(logger)[0]
+    assert body['truncated'] == response.get_data(as_text=True)[:64]
+    assert body['size'] == len(response.get_data())
+    assert len(body['sha256']) == 64
+    get_json.assert_not_called()
+
+
+def test_streamed_responses_are_not_consumed():
+    logger = MagicMock()
+    response = Response(iter([b'{"a": 1}']), mimetype='application/json')
+
+    log_response_body_and_headers(logger, response)
+
+    assert _logged_bodies(logger) == [None]
+    assert response.get_data() == b'{"a": 1}'
+
+
+@pytest.fixture
+def sampled_app():
+    app = Flask(__name__)
+    logger = MagicMock()
+    RequestResponseLogging(logger, app, sample_rates={'/polled': 0.1}, sample=lambda: 0.5)
+    app.add_url_rule('/polled', 'polled', lambda: {'jobs': []})
+    app.add_url_rule('/other', 'other', lambda: {'version': '3.1.0'})
+    return app, logger
+
+
+def test_requests_are_sampled_by_route(sampled_app):
+    """
+    Given a route with a sampling rate
+      when a request to it is not sampled
+        it should log neither the request nor its response
+      when requesting another route
+        it should log both
+    """
+    app, logger = sampled_app
+    client = app.test_client()
+
+    client.get('/polled')
+    assert logger.info.call_count == 0
+
+    client.get('/other')
+    assert logger.info.call_count == 2
+
+
+def test_server_errors_are_always_logged(sampled_app):
+    app, logger = sampled_app
+    app.view_functions['polled'] = lambda: ({'message': 'error'}, 500)
+
+    app.test_client().get('/polled')
+
+    assert _logged_bodies(logger) == [{'message': 'error'}]
+
+
+def test_async_logging_writes_records_from_the_listener_thread():
+    """
+    Given a logger handed to AsyncLogging
+      when logging records
+        it should pass them to the handlers of its parent from another thread
+    """
+    handler = RecordingHandler()
+    logging.getLogger('test-async').addHandler(handler)
+    async_logging = AsyncLogging('test-async.http')
+    async_logging.start()
+    try:
+        async_logging.logger.warning('first')
+        async_logging.logger.warning('second')
+
+        assert async_logging.flush()
+        assert [record.getMessage() for record in handler.records] == ['first', 'second']
+        assert threading.current_thread().name not in handler.threads
+    finally:
+        async_logging.stop()
+        logging.getLogger('test-async').removeHandler(handler)
+
+
+def test_async_logging_drops_records_when_the_queue_is_full():
+    gate = threading.Event()
+    handler = RecordingHandler(gate)
+    logging.getLogger('test-full').addHandler(handler)
+    async_logging = AsyncLogging('test-full.http', max_queue_size=2)
+    async_logging.start()
+    try:
+        for i in range(10):
+            async_logging.logger.warning('record %s', i)
+        gate.set()
+
+        assert async_logging.flush()
+        assert 7 <= async_logging.dropped <= 8
+        assert len(handler.records) == 10 - async_logging.dropped
+    finally:
+        async_logging.stop()
+        logging.getLogger('test-full').removeHandler(handler)
+
+
+def test_async_logging_starts_a_listener_in_forked_processes(mocker):
+    """
+    Given AsyncLogging started before a fork, whose listener thread the child does not inherit
+      when logging records from the child process
+        it should start a listener for the child and write them
+    """
+    handler = RecordingHandler()
+    logging.getLogger('test-fork').addHandler(handler)
+    async_logging = AsyncLogging('test-fork.http')
+    async_logging.start()
+    parent_listener = async_logging._listener
+    try:
+        # the parent listener thread is not running in the child process
+        parent_listener.stop()
+        mocker.patch('api.logging.async_logging.os.getpid', return_value=-1)
+        assert not async_logging.started
+
+        async_logging.logger.warning('from the child')
+
+        assert async_logging.started
+        assert async_logging.flush()
+        assert [record.getMessage() for record in handler.records] == ['from the child']
+    finally:
+        async_logging.stop()
+        logging.getLogger('test-fork').removeHandler(handler)
+
+
+def test_parse_sample_rates():
+    assert parse_sample_rates('/manager/queue_status=0.1,/api=0.5') == {'/manager/queue_status': 0.1, '/api': 0.5}
+    assert parse_sample_rates(None) == {}
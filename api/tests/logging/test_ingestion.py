@@ -0,0 +1,101 @@
+import importlib
+import json
+from unittest.mock import MagicMock
+
+import pytest
+from botocore.exceptions import ClientError
+
+from api.logging.ingestion import MAX_BATCH_BYTES, MAX_BATCH_EVENTS, CloudWatchLogSink, InMemoryLogSink, \
+    LogIngestion, event_size
+
+app_module = importlib.import_module('app')
+
+
+def _entries(count, message='sample-message'):
+    return [{'level': 'info', 'message': message} for _ in range(count)]
+
+
+def test_log_ingestion_writes_entries_in_batches_within_put_log_events_limits():
+    """
+    Given buffered log entries exceeding the PutLogEvents limits
+      when they are written
+        it should split them in batches of at most 10k events and 1 MB
+    """
+    sink = InMemoryLogSink()
+    ingestion = LogIngestion(sink, max_pending_events=20_000, background=False, clock=lambda: 1700000000.5)
+
+    assert ingestion.submit(_entries(MAX_BATCH_EVENTS + 1))
+    assert ingestion.submit(_entries(6, message='x' * 200_000))
+    ingestion.flush()
+
+    assert [len(batch) for batch in sink.batches] == [MAX_BATCH_EVENTS, 6, 1]
+    assert all(len(batch) <= MAX_BATCH_EVENTS for batch in sink.batches)
+    assert all(sum(event_size(event) for event in batch) <= MAX_BATCH_BYTES for batch in sink.batches)
+    assert len(sink.events) == MAX_BATCH_EVENTS + 7
+    assert sink.events[0] == {'timestamp': 1700000000500, 'message': '{"level": "INFO", "message": "sample-message"}'}
+    assert ingestion.written == MAX_BATCH_EVENTS + 7
+
+
+def test_log_ingestion_refuses_batches_not_fitting_the_buffer():
+    ingestion = LogIngestion(InMemoryLogSink(), max_pending_events=10, background=False)
+
+    assert ingestion.submit(_entries(8))
+    assert not ingestion.submit(_entries(3))
+    assert ingestion.pending() == 8
+
+
+def test_log_ingestion_writes_from_a_background_thread():
+    sink = InMemoryLogSink()
+    ingestion = LogIngestion(sink)
+
+    ingestion.submit([{'level': 'error', 'message': 'failure', 'extra': {'cluster': 'c1'}}])
+    ingestion.flush()
+
+    assert json.loads(sink.events[0]['message']) == {'cluster': 'c1', 'level': 'ERROR', 'message': 'failure'}
+
+
+def test_cloudwatch_log_sink_creates_its_stream_on_first_write():
+    """
+    Given a log stream that does not exist yet
+      when writing a batch
+        it should create the stream and write the batch with a single PutLogEvents call
+    """
+    logs = MagicMock()
+    not_found = ClientError({'Error': {'Code': 'ResourceNotFoundException'}}, 'PutLogEvents')
+    logs.put_log_events.side_effect = [not_found, {}]
+    sink = CloudWatchLogSink(lambda: logs, 'log-group', 'frontend/stream')
+    events = [{'timestamp': 1, 'message': 'a'}, {'timestamp': 1, 'message': 'b'}]
+
+    sink.put(events)
+
+    logs.create_log_stream.assert_called_once_with(logGroupName='log-group', logStreamName='frontend/stream')
+    logs.put_log_events.assert_called_with(logGroupName='log-group', logStreamName='frontend/stream', logEvents=events)
+
+
+def test_push_log_writes_the_batch_to_the_sink(client, mocker, mock_disable_auth, mock_csrf_needed):
+    sink = InMemoryLogSink()
+    ingestion = LogIngestion(sink, background=False)
+    mocker.patch.object(app_module, 'frontend_logs', ingestion)
+
+    response = client.post('/logs', json={'logs': _entries(3)})
+    ingestion.flush()
+
+    assert response.status_code == 200
+    assert len(sink.batches) == 1 and len(sink.batches[0]) == 3
+
+
+def test_push_log_answers_429_when_the_buffer_is_full(client, mocker, mock_disable_auth, mock_csrf_needed):
+    mocker.patch.object(app_module, 'frontend_logs', LogIngestion(InMemoryLogSink(), max_pending_events=2,
+                                                                  background=False))
+
+    response = client.post('/logs', json={'logs': _entries(3)})
+
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '5'
+
+
+@pytest.mark.parametrize('entry', [{'level': 'verbose', 'message': 'm'}, {'level': 'info'}])
+def test_push_log_rejects_invalid_entries(client, mocker, mock_disable_auth, mock_csrf_needed, entry):
+    mocker.patch.object(app_module, 'frontend_logs', LogIngestion(InMemoryLogSink(), background=False))
+
+    assert client.post('/logs', json={'logs': [entry]}).status_code == 400
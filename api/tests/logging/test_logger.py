@@ -4,6 +4,7 @@ from flask import Response
 
 from api.logging import RequestResponseLogging, log_request_body_and_headers, log_response_body_and_headers
 from api.logging.logger import DefaultLogger
+import json
 import logging
 
 
@@ -90,6 +91,7 @@ class MockRequest:
     headers = {'int_value': 100}
     args = {'region': 'eu-west-1'}
     json = {'username': 'user@email.com'}
+    is_json = True
     path = '/fake-path'
     environ = {
         'serverless.event': {
@@ -99,6 +101,12 @@ class MockRequest:
         }
     }
 
+    def get_data(self):
+        return json.dumps(self.json).encode()
+
+    def get_json(self, silent=False):
+        return self.json
+
 
 def test_log_request_body_and_headers():
     mock_logger = MagicMock(wraps=DefaultLogger(True))
@@ -0,0 +1,185 @@
+import json
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+import api.PclusterApiHandler
+from api.caching import TTLCache
+from api.metrics import MetricsRegistry, RequestMetrics, emf_record, timed
+from api.ssm import CommandWaiter
+from api.tests.ssm.fake_ssm import FakeSsm, constant
+
+
+class StepClock(object):
+    """ Advances by `step` seconds every time it is read """
+
+    def __init__(self, step):
+        self.step = step
+        self.now = 0.0
+
+    def __call__(self):
+        self.now += self.step
+        return self.now
+
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry(buckets=(0.1, 1.0), clock=StepClock(0.25))
+
+
+def _app(metrics):
+    app = Flask(__name__)
+    metrics.init_app(app)
+    app.add_url_rule('/clusters/<name>', 'cluster', lambda name: {'name': name})
+    app.add_url_rule('/fail', 'fail', lambda: ('nope', 400))
+
+    def queue_status():
+        with timed('SsmWaitCommand'):
+            pass
+        return {'jobs': []}
+
+    app.add_url_rule('/queue_status', 'queue_status', queue_status)
+    return app
+
+
+def test_prometheus_text_counts_requests_by_route_and_status(registry):
+    """
+    Given the prometheus exporter
+      when serving requests to parametrized and unknown routes
+        it should count them by url rule, method and status code
+        it should record their latency in the histogram buckets
+        it should serve the metrics on /metrics
+    """
+    client = _app(RequestMetrics(registry=registry, exporter='prometheus')).test_client()
+
+    client.get('/clusters/a')
+    client.get('/clusters/b')
+    client.get('/fail')
+    client.get('/missing')
+    response = client.get('/metrics')
+
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert 'pcui_http_requests_total{endpoint="/clusters/<name>",method="GET",status="200"} 2' in text
+    assert 'pcui_http_requests_total{endpoint="/fail",method="GET",status="400"} 1' in text
+    assert 'pcui_http_requests_total{endpoint="<unmatched>",method="GET",status="404"} 1' in text
+    assert 'pcui_http_request_duration_seconds_bucket{endpoint="/clusters/<name>",method="GET",le="0.1"} 0' in text
+    assert 'pcui_http_request_duration_seconds_bucket{endpoint="/clusters/<name>",method="GET",le="1.0"} 2' in text
+    assert 'pcui_http_request_duration_seconds_bucket{endpoint="/clusters/<name>",method="GET",le="+Inf"} 2' in text
+    assert 'pcui_http_request_duration_seconds_count{endpoint="/clusters/<name>",method="GET"} 2' in text
+    assert 'pcui_http_requests_in_flight{endpoint="/metrics"} 1' in text
+
+
+def test_metrics_endpoint_only_with_prometheus_exporter(registry):
+    client = _app(RequestMetrics(registry=registry, exporter='emf', write_line=lambda line: None)).test_client()
+
+    assert client.get('/metrics').status_code == 404
+
+
+def test_in_flight_gauge_tracks_concurrent_requests():
+    """
+    Given a slow endpoint
+      when two requests are being served
+        it should report both in flight, then none once they are done
+    """
+    registry = MetricsRegistry()
+    app = Flask(__name__)
+    RequestMetrics(app, registry=registry)
+    entered, release = threading.Barrier(3), threading.Event()
+
+    def slow():
+        entered.wait()
+        release.wait()
+        return {}
+
+    app.add_url_rule('/slow', 'slow', slow)
+    threads = [threading.Thread(target=lambda: app.test_client().get('/slow')) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    entered.wait()
+    assert registry.in_flight('/slow') == 2
+
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert registry.in_flight('/slow') == 0
+
+
+def test_emf_line_per_request_with_dependency_latency(registry):
+    """
+    Given the emf exporter
+      when serving a request timing a dependency
+        it should write one Embedded Metric Format line with the request and dependency latency
+        it should also record the dependency in the registry
+    """
+    lines = []
+    client = _app(RequestMetrics(registry=registry, exporter='emf', write_line=lines.append,
+                                 clock=lambda: 1700000000.0)).test_client()
+
+    client.get('/queue_status')
+
+    assert len(lines) == 1
+    record = json.loads(lines[0])
+    metrics = record['_aws']['CloudWatchMetrics'][0]
+    assert record['_aws']['Timestamp'] == 1700000000000
+    assert metrics['Namespace'] == 'ParallelClusterUI'
+    assert metrics['Dimensions'] == [['Endpoint', 'Method']]
+    assert {metric['Name'] for metric in metrics['Metrics']} >= {'Latency', 'InFlight', 'SsmWaitCommandLatency'}
+    assert record['Endpoint'] == '/queue_status'
+    assert record['StatusCode'] == 200
+    assert record['SsmWaitCommandLatency'] > 0
+    assert record['Latency'] >= record['SsmWaitCommandLatency']
+    assert record['InFlight'] == 1
+
+
+def test_emf_record_counts_errors():
+    client_error = emf_record('ns', '/fail', 'GET', 404, 0.01, 1, {}, 0)
+    server_error = emf_record('ns', '/fail', 'GET', 502, 0.01, 1, {}, 0)
+
+    assert (client_error['ClientErrors'], client_error['ServerErrors']) == (1, 0)
+    assert (server_error['ClientErrors'], server_error['ServerErrors']) == (0, 1)
+
+
+def test_failed_requests_leave_the_in_flight_gauge(registry):
+    """
+    Given an endpoint raising an unhandled exception
+      when serving it
+        it should record a 500 and decrement the in-flight gauge
+    """
+    app = Flask(__name__)
+    RequestMetrics(app, registry=registry)
+
+    def boom():
+        raise RuntimeError('boom')
+
+    app.add_url_rule('/boom', 'boom', boom)
+    app.test_client().get('/boom')
+
+    assert registry.in_flight('/boom') == 0
+    assert 'pcui_http_requests_total{endpoint="/boom",method="GET",status="500"} 1' in registry.prometheus_text()
+
+
+def test_queue_status_attributes_ssm_latency(app, mock_disable_auth, mocker):
+    """
+    Given the app built by build_flask_app with the emf exporter
+      when calling queue_status
+        it should report the SSM send and wait latency along with the request
+    """
+    mocker.patch('api.PclusterApiHandler.get_client',
+                 return_value=FakeSsm(time.monotonic, latency=constant(0.1), output='[{"job_id": 1}]'))
+    mocker.patch('api.PclusterApiHandler.log_stream_cleanup')
+    mocker.patch.object(api.PclusterApiHandler, 'ssm_waiter', CommandWaiter(initial_delay=0.05))
+    mocker.patch.object(api.PclusterApiHandler, 'queue_snapshots', TTLCache(ttl=60))
+    lines = []
+    request_metrics = app.extensions['metrics']
+    mocker.patch.multiple(request_metrics, exporter='emf', write_line=lines.append)
+
+    response = app.test_client().get('/manager/queue_status?instance_id=i-1&region=eu-west-1')
+
+    assert response.status_code == 200
+    record = json.loads(lines[-1])
+    assert record['Endpoint'] == '/manager/queue_status'
+    assert record['SsmWaitCommandLatency'] >= 50
+    assert 'SsmSendCommandLatency' in record
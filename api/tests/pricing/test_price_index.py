@@ -0,0 +1,105 @@
+import json
+from unittest import mock
+
+import pytest
+
+import api.PclusterApiHandler
+from api.clusters import ClusterConfig
+from api.pricing import Ec2PriceIndex, PriceKey, PriceRange
+
+PRICES = {'c5.large': 0.085, 'c6i.large': 0.1, 'p4d.24xlarge': 32.77}
+PRICE_ESTIMATE_URL = '/manager/price_estimate?cluster_name=cluster&region=eu-west-1&queue_name='
+CONFIG = """
+Scheduling:
+  SlurmQueues:
+    - Name: cpu
+      ComputeResources:
+        - Name: c5
+          InstanceType: c5.large
+          MaxCount: 30
+        - Name: flex
+          Instances:
+            - InstanceType: c5.large
+            - InstanceType: c6i.large
+          MaxCount: 10
+"""
+
+
+def _bulk_offer(region):
+    products, terms = {}, {}
+    for sku, (instance_type, price) in enumerate(PRICES.items()):
+        products[str(sku)] = {'attributes': {
+            'instanceType': instance_type, 'regionCode': region, 'operatingSystem': 'Linux', 'tenancy': 'Shared',
+            'preInstalledSw': 'NA', 'capacitystatus': 'Used',
+        }}
+        terms[str(sku)] = {f'{sku}.TERM': {'priceDimensions': {f'{sku}.DIM': {'pricePerUnit': {'USD': str(price)}}}}}
+    # same instance type with SQL Server pre-installed, that must not override the plain Linux price
+    products['sql'] = {'attributes': {**products['0']['attributes'], 'preInstalledSw': 'SQL Std'}}
+    terms['sql'] = {'sql.TERM': {'priceDimensions': {'sql.DIM': {'pricePerUnit': {'USD': '1.0'}}}}}
+    return {'products': products, 'terms': {'OnDemand': terms}}
+
+
+def test_price_index_fetches_each_price_once():
+    """
+    Given a price index
+      when looking up the same price multiple times
+        it should fetch it only once
+    """
+    fetch_price = mock.Mock(side_effect=lambda key: PRICES[key.instance_type])
+    prices = Ec2PriceIndex(fetch_price)
+
+    assert prices.price('eu-west-1', 'c5.large') == 0.085
+    assert prices.price('eu-west-1', 'c5.large') == 0.085
+    fetch_price.assert_called_once_with(PriceKey('eu-west-1', 'c5.large', 'Linux', 'Shared'))
+
+
+def test_price_index_is_seeded_from_bulk_file_on_first_lookup(tmp_path):
+    """
+    Given a bulk price list file
+      when looking up a price
+        it should be served from the file without calling the Pricing API
+        it should skip the products with pre-installed software
+    """
+    seed_file = tmp_path / 'index.json'
+    seed_file.write_text(json.dumps(_bulk_offer('eu-west-1')))
+    fetch_price = mock.Mock(return_value=None)
+    prices = Ec2PriceIndex(fetch_price, seed_file=str(seed_file))
+
+    assert prices.price('eu-west-1', 'c5.large') == 0.085
+    assert prices.price('eu-west-1', 'p4d.24xlarge') == 32.77
+    fetch_price.assert_not_called()
+
+
+def test_price_index_falls_back_to_pricing_api_when_seed_fails(tmp_path):
+    prices = Ec2PriceIndex(lambda key: 0.5, seed_file=str(tmp_path / 'missing.json'))
+
+    assert prices.price('eu-west-1', 'c5.large') == 0.5
+
+
+def test_price_range_weights_compute_resources_by_max_count():
+    """
+    Given a queue with a single and a multiple instance types compute resources
+      when computing its price range
+        it should return the min and max over all the instance types
+        it should weight the average price of each compute resource by its max count
+    """
+    prices = Ec2PriceIndex(lambda key: PRICES.get(key.instance_type))
+
+    price_range = prices.price_range('eu-west-1', [(['c5.large'], 30), (['c5.large', 'c6i.large'], 10)])
+
+    assert price_range.min == 0.085
+    assert price_range.max == 0.1
+    assert price_range.estimate == pytest.approx((30 * 0.085 + 10 * (0.085 + 0.1) / 2) / 40)
+    assert prices.price_range('eu-west-1', [(['unknown'], 1)]) == PriceRange(None, None, None)
+
+
+def test_price_estimate_supports_multiple_compute_resources(client, mock_disable_auth, mocker):
+    mocker.patch('api.PclusterApiHandler.get_parsed_cluster_config', return_value=ClusterConfig(CONFIG))
+    mocker.patch.object(api.PclusterApiHandler, 'ec2_prices', Ec2PriceIndex(lambda key: PRICES[key.instance_type]))
+
+    response = client.get(PRICE_ESTIMATE_URL + 'cpu')
+
+    assert response.status_code == 200
+    assert response.json['min'] == 0.085
+    assert response.json['max'] == 0.1
+    assert response.json['estimate'] == pytest.approx(0.086875)
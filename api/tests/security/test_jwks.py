@@ -0,0 +1,167 @@
+import threading
+import time
+
+import pytest
+import requests
+from jose.exceptions import JWTError
+
+import api.PclusterApiHandler
+from api.PclusterApiHandler import _fetch_jwks, jwt_decode
+from api.security.jwks import JwksKeyStore
+
+
+class FakeJwksEndpoint:
+    def __init__(self, *keys, delay=0):
+        self.keys = list(keys)
+        self.delay = delay
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        return {'keys': list(self.keys)}
+
+
+def test_jwks_key_store_fetches_keys_once():
+    """
+    Given a JWKS key store
+      when the same kid is requested multiple times within the ttl
+        it should fetch the key set only once and count the cache hits
+    """
+    endpoint = FakeJwksEndpoint({'kid': 'kid-1', 'n': 'n1'})
+    store = JwksKeyStore(endpoint)
+
+    assert store.get_key('kid-1') == {'kid': 'kid-1', 'n': 'n1'}
+    assert store.get_key('kid-1') == {'kid': 'kid-1', 'n': 'n1'}
+
+    assert endpoint.calls == 1
+    assert store.stats() == {'hits': 1, 'misses': 1, 'refreshes': 1, 'keys': 1}
+
+
+def test_jwks_key_store_unknown_kid_refreshes_once():
+    """
+    Given a JWKS key store
+      when a kid that is not in the key set is requested
+        it should reload the key set once
+        it should not reload it again within the min refresh interval
+    """
+    endpoint = FakeJwksEndpoint({'kid': 'kid-1'})
+    store = JwksKeyStore(endpoint, min_refresh_interval=60)
+    store.get_key('kid-1')
+
+    with pytest.raises(JWTError):
+        store.get_key('kid-2')
+    assert endpoint.calls == 1
+
+    endpoint.keys.append({'kid': 'kid-2'})
+    store.min_refresh_interval = 0
+    assert store.get_key('kid-2') == {'kid': 'kid-2'}
+    assert endpoint.calls == 2
+
+
+def test_jwks_key_store_serves_stale_keys_while_refreshing():
+    """
+    Given a JWKS key store
+      when the ttl is expired
+        it should keep serving the known key
+        it should reload the key set in the background
+    """
+    endpoint = FakeJwksEndpoint({'kid': 'kid-1'})
+    store = JwksKeyStore(endpoint, ttl=0, min_refresh_interval=0)
+    store.get_key('kid-1')
+
+    assert store.get_key('kid-1') == {'kid': 'kid-1'}
+
+    deadline = time.monotonic() + 5
+    while store.stats()['refreshes'] < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert endpoint.calls == 2
+
+
+def test_jwks_key_store_throttles_background_refreshes_during_an_outage():
+    """
+    Given a JWKS key store with expired keys
+      when the JWKS endpoint fails and many requests use the stale key
+        it should keep serving the stale key
+        it should not attempt another reload within the min refresh interval
+    """
+    endpoint = FakeJwksEndpoint({'kid': 'kid-1'})
+    store = JwksKeyStore(endpoint, ttl=0, min_refresh_interval=0.2)
+    store.get_key('kid-1')
+    time.sleep(0.25)
+    endpoint.keys = []
+
+    for _ in range(20):
+        assert store.get_key('kid-1') == {'kid': 'kid-1'}
+
+    deadline = time.monotonic() + 5
+    while endpoint.calls < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    assert endpoint.calls == 2
+
+
+@pytest.mark.parametrize('jwks', [
+    pytest.param({'keys': []}, id='empty_keys'),
+    pytest.param({'message': 'Internal server error'}, id='missing_keys'),
+])
+def test_jwks_key_store_keeps_keys_when_the_response_has_none(jwks):
+    """
+    Given a JWKS key store with a loaded key set
+      when a reload returns no keys
+        it should raise and keep serving the previous key set
+    """
+    endpoint = FakeJwksEndpoint({'kid': 'kid-1'})
+    store = JwksKeyStore(endpoint, min_refresh_interval=0)
+    store.get_key('kid-1')
+
+    store.fetch_jwks = lambda: jwks
+    with pytest.raises(JWTError):
+        store.refresh()
+
+    assert store.get_key('kid-1') == {'kid': 'kid-1'}
+    assert store.stats()['keys'] == 1
+
+
+def test_fetch_jwks_raises_on_error_responses(mocker):
+    response = mocker.Mock()
+    response.raise_for_status.side_effect = requests.HTTPError('503 Server Error')
+    mocker.patch('api.PclusterApiHandler.requests.get', return_value=response)
+    mocker.patch('api.PclusterApiHandler.jwks_url', return_value='https://cognito/jwks.json')
+
+    with pytest.raises(requests.HTTPError):
+        _fetch_jwks()
+    response.json.assert_not_called()
+
+
+def test_jwks_key_store_single_refresh_in_flight():
+    """
+    Given a JWKS key store
+      when many concurrent requests ask for a key that has not been loaded yet
+        it should perform a single fetch shared by all of them
+    """
+    endpoint = FakeJwksEndpoint({'kid': 'kid-1'}, delay=0.1)
+    store = JwksKeyStore(endpoint, min_refresh_interval=0)
+
+    threads = [threading.Thread(target=store.get_key, args=('kid-1',)) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert endpoint.calls == 1
+
+
+def test_jwt_decode_uses_the_key_matching_the_token_kid(mocker, signing_key):
+    """
+    Given a token signed with a key published in the JWKS
+      when decoding it
+        it should verify it with the key matching its kid without refetching the JWKS
+    """
+    endpoint = FakeJwksEndpoint(signing_key.jwk)
+    mocker.patch.object(api.PclusterApiHandler, 'jwks', JwksKeyStore(endpoint))
+    token = signing_key.sign({'username': 'user'})
+
+    assert jwt_decode(token) == {'username': 'user'}
+    assert jwt_decode(token) == {'username': 'user'}
+    assert endpoint.calls == 1
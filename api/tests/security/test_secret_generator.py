@@ -1,4 +1,10 @@
-from api.security.fingerprint import CognitoFingerprintGenerator
+from unittest.mock import MagicMock
+
+from flask import Flask
+
+from api.security.csrf import CSRF
+from api.security.fingerprint import CognitoFingerprintGenerator, LazyFingerprintGenerator, \
+    PrecomputedFingerprintGenerator
 
 
 def test_cognito_fingerprint_generator():
@@ -14,3 +20,42 @@ def test_cognito_fingerprint_generator():
     fingerprint = gen.fingerprint()
 
     assert fingerprint == expected_fingerprint
+
+
+def test_cognito_fingerprint_is_derived_once(mocker):
+    """
+    Given multiple CognitoFingerprintGenerator with the same values
+      when computing their fingerprint
+        it should derive it only once per process
+    """
+    pbkdf2 = mocker.patch('api.security.fingerprint.pbkdf2_hmac', return_value=b'\x01')
+
+    for _ in range(3):
+        assert CognitoFingerprintGenerator('memo-client-id', 'client-secret', 'pool-id').fingerprint() == '01'
+
+    pbkdf2.assert_called_once()
+
+
+def test_csrf_secret_key_is_computed_on_first_use():
+    """
+    Given an app with the CSRF extension
+      when it is initialized
+        it should not compute the fingerprint
+      when a CSRF token is first requested
+        it should compute the fingerprint once
+    """
+    generator = MagicMock()
+    generator.fingerprint.return_value = 'fingerprint'
+    app = Flask(__name__)
+    CSRF(app, LazyFingerprintGenerator(lambda: generator))
+
+    generator.fingerprint.assert_not_called()
+
+    client = app.test_client()
+    assert client.get('/csrf').status_code == 200
+    assert client.get('/csrf').status_code == 200
+    generator.fingerprint.assert_called_once()
+
+
+def test_precomputed_fingerprint_generator():
+    assert PrecomputedFingerprintGenerator('precomputed').fingerprint() == 'precomputed'
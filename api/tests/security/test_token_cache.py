@@ -0,0 +1,89 @@
+import time
+
+import api.PclusterApiHandler
+from api.PclusterApiHandler import jwt_decode
+from api.security.jwks import JwksKeyStore
+from api.security.token_cache import VerifiedTokenCache
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_verified_token_cache_returns_claims_until_exp():
+    """
+    Given a verified token cache
+      when a token has been cached
+        it should return its claims until the token exp
+        it should evict the entry once the token is expired
+    """
+    clock = FakeClock(1000)
+    cache = VerifiedTokenCache(clock=clock)
+    cache.put('token', {'username': 'user', 'exp': 1010})
+
+    assert cache.get('token') == {'username': 'user', 'exp': 1010}
+
+    clock.now = 1010
+    assert cache.get('token') is None
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'size': 0}
+
+
+def test_verified_token_cache_evicts_least_recently_used():
+    """
+    Given a verified token cache with a max size
+      when more tokens than the max size are cached
+        it should evict the least recently used ones
+    """
+    cache = VerifiedTokenCache(max_size=2, clock=FakeClock(0))
+    cache.put('token-1', {'exp': 10})
+    cache.put('token-2', {'exp': 10})
+    cache.get('token-1')
+    cache.put('token-3', {'exp': 10})
+
+    assert cache.get('token-1') is not None
+    assert cache.get('token-2') is None
+    assert cache.get('token-3') is not None
+
+
+def test_verified_token_cache_keys_include_verification_context():
+    """
+    Given a verified token cache
+      when the same token is verified with different audiences
+        it should not share the cached claims between them
+    """
+    cache = VerifiedTokenCache(clock=FakeClock(0))
+    cache.put('token', {'exp': 10}, 'audience-1', None)
+
+    assert cache.get('token', 'audience-1', None) is not None
+    assert cache.get('token', 'audience-2', None) is None
+    assert cache.get('token') is None
+
+
+def test_verified_token_cache_skips_tokens_without_exp_or_when_disabled():
+    cache = VerifiedTokenCache(clock=FakeClock(0))
+    cache.put('token', {'username': 'user'})
+    disabled = VerifiedTokenCache(max_size=0, clock=FakeClock(0))
+    disabled.put('token', {'exp': 10})
+
+    assert cache.get('token') is None
+    assert disabled.get('token') is None
+
+
+def test_jwt_decode_verifies_each_token_once(mocker, signing_key):
+    """
+    Given a valid token
+      when decoding it multiple times
+        it should verify its signature only the first time
+    """
+    mocker.patch.object(api.PclusterApiHandler, 'jwks', JwksKeyStore(lambda: {'keys': [signing_key.jwk]}))
+    mocker.patch.object(api.PclusterApiHandler, 'verified_tokens', VerifiedTokenCache())
+    jose_decode = mocker.spy(api.PclusterApiHandler.jwt, 'decode')
+    token = signing_key.sign({'username': 'user', 'exp': int(time.time()) + 60})
+
+    assert jwt_decode(token)['username'] == 'user'
+    assert jwt_decode(token)['username'] == 'user'
+    assert jose_decode.call_count == 1
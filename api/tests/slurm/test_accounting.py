@@ -0,0 +1,147 @@
+import json
+import shlex
+
+import pytest
+
+from api.slurm import SacctCursor, sacct_page_command, stream_accounting
+
+SACCT_STREAM_URL = '/manager/sacct/stream?instance_id=i-1&cluster_name=cluster&region=eu-west-1'
+
+
+class FakeSacct:
+    """ Runs pages over `jobs` like the sacct | jq command would, counting the pages fetched """
+
+    def __init__(self, jobs, page_size):
+        self.jobs = sorted(jobs, key=lambda job: (job['submit'], job['job_id']))
+        self.page_size = page_size
+        self.pages = 0
+
+    def __call__(self, cursor):
+        self.pages += 1
+        after = [job for job in self.jobs if cursor is None or (job['submit'], job['job_id']) > cursor]
+        return "\n".join(json.dumps(job) for job in after[:self.page_size])
+
+
+def _jobs(count):
+    return [{'job_id': job_id, 'name': f'job-{job_id}', 'submit': 1700000000 + job_id // 3} for job_id in range(count)]
+
+
+def _parse(lines):
+    records = [json.loads(line) for line in lines]
+    return records[:-1], records[-1]
+
+
+def test_stream_accounting_returns_all_jobs_page_by_page():
+    """
+    Given more jobs than fit in one page
+      when streaming the accounting
+        it should return every job once, in submit and job id order
+        it should end with a null cursor
+    """
+    sacct = FakeSacct(_jobs(25), page_size=10)
+
+    jobs, last = _parse(stream_accounting(sacct, None, 10, max_duration=60))
+
+    assert [job['job_id'] for job in jobs] == list(range(25))
+    assert last == {'cursor': None}
+    assert sacct.pages == 3
+
+
+def test_stream_accounting_resumes_from_cursor_once_out_of_time():
+    """
+    Given a stream that runs out of time
+      when resuming it from the returned cursor
+        it should return the remaining jobs without duplicates
+    """
+    sacct = FakeSacct(_jobs(25), page_size=10)
+
+    first_jobs, first_last = _parse(stream_accounting(sacct, None, 10, max_duration=0))
+    cursor = SacctCursor.parse(first_last['cursor'])
+    second_jobs, second_last = _parse(stream_accounting(sacct, cursor, 10, max_duration=60))
+
+    assert [job['job_id'] for job in first_jobs + second_jobs] == list(range(25))
+    assert cursor == SacctCursor(1700000003, 9)
+    assert second_last == {'cursor': None}
+
+
+def test_stream_accounting_raises_first_page_errors_and_yields_the_following_ones():
+    """
+    Given a page command failing
+      when it is the first page
+        it should raise the error before anything is yielded
+      when it is a following page
+        it should yield the error with the cursor to resume from
+    """
+    def failing(cursor):
+        raise Exception('head node unreachable')
+
+    pages = iter(['{"job_id": 1, "submit": 10}'])
+
+    def failing_after_first_page(cursor):
+        if cursor is None:
+            return next(pages)
+        return failing(cursor)
+
+    with pytest.raises(Exception, match='head node unreachable'):
+        next(stream_accounting(failing, None, 1, max_duration=60))
+    lines = list(stream_accounting(failing_after_first_page, None, 1, max_duration=60))
+
+    assert json.loads(lines[-1]) == {'error': 'head node unreachable', 'cursor': '10-1'}
+
+
+def test_sacct_page_command_filters_after_cursor():
+    command = sacct_page_command({'partition': 'queue-1'}, SacctCursor(1700000000, 42), 100)
+    sacct, jq = command.split(' | jq -c ')
+
+    assert sacct == 'sacct --partition queue-1 --allusers --json'
+    assert 'select(.submit > 1700000000 or (.submit == 1700000000 and .job_id > 42))' in shlex.split(jq)[0]
+    assert shlex.split(jq)[0].endswith('| sort_by(.submit, .job_id) | .[:100][]')
+
+
+def test_sacct_page_command_keeps_the_requested_window_after_the_cursor():
+    """
+    Given a cursor on a job submitted before the requested starttime (e.g. a job still running at that time)
+      when building the command of the next page
+        it should keep the requested starttime, so that the pages cover the window of /manager/sacct
+        it should only rely on jq to skip the jobs up to the cursor
+    """
+    command = sacct_page_command({'starttime': '2024-06-01T00:00:00'}, SacctCursor(1717192800, 5), 2)
+    sacct, jq = command.split(' | jq -c ')
+
+    assert sacct == 'sacct --starttime 2024-06-01T00:00:00 --allusers --json'
+    assert 'select(.submit > 1717192800 or (.submit == 1717192800 and .job_id > 5))' in shlex.split(jq)[0]
+
+
+def test_sacct_stream_endpoint_returns_ndjson(client, mock_disable_auth, mock_csrf_needed, mocker):
+    """
+    Given the sacct stream endpoint
+      when requesting a page size smaller than the number of jobs
+        it should return NDJSON lines with the jobs followed by the final cursor
+    """
+    sacct = FakeSacct(_jobs(5), page_size=2)
+    ssm_command = mocker.patch('api.PclusterApiHandler.ssm_command',
+                               side_effect=lambda *args, **kwargs: sacct(sacct_cursor(args[3])))
+
+    response = client.post(SACCT_STREAM_URL + '&page_size=2', json={'starttime': '2023-11-14T00:00:00'})
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    jobs, last = _parse(response.get_data(as_text=True).splitlines())
+    assert [job['job_id'] for job in jobs] == list(range(5))
+    assert last == {'cursor': None}
+    assert ssm_command.call_count == 3
+
+
+def test_sacct_stream_endpoint_rejects_invalid_cursor(client, mock_disable_auth, mock_csrf_needed):
+    response = client.post(SACCT_STREAM_URL + '&cursor=1;reboot', json={})
+
+    assert response.status_code == 400
+
+
+def sacct_cursor(command):
+    """ Extracts the cursor from the jq select of a page command """
+    if 'select(.submit > ' not in command:
+        return None
+    submit = command.split('select(.submit > ')[1].split(' ')[0]
+    job_id = command.split('.job_id > ')[1].split(')')[0]
+    return SacctCursor(int(submit), int(job_id))
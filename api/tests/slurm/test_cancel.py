@@ -0,0 +1,95 @@
+import pytest
+
+import api.PclusterApiHandler
+from api.caching import TTLCache
+from api.slurm import expand_job_expressions, parse_scancel_output, scancel_command
+
+CANCEL_JOBS_URL = '/manager/cancel_jobs?instance_id=i-1&region=eu-west-1'
+
+
+def test_expand_job_expressions_expands_ranges_only():
+    """
+    Given job ids, ranges and array expressions
+      when expanding them
+        it should expand the ranges of job ids and keep the array expressions for scancel
+        it should drop duplicates
+    """
+    expressions = ['12', '14-16', '30_5', '31_[1-100%10]', '15']
+
+    assert expand_job_expressions(expressions) == ['12', '14', '15', '16', '30_5', '31_[1-100%10]']
+
+
+@pytest.mark.parametrize('expressions', [
+    pytest.param(['1;reboot'], id='injection'),
+    pytest.param(['20-10'], id='reversed_range'),
+    pytest.param(['1-2000'], id='range_too_large'),
+    pytest.param(['1-600', '1000-1600'], id='too_many_jobs'),
+])
+def test_expand_job_expressions_rejects_invalid_expressions(expressions):
+    with pytest.raises(ValueError):
+        expand_job_expressions(expressions)
+
+
+def test_parse_scancel_output_reports_outcome_per_job():
+    """
+    Given the output of a scancel with some failing jobs
+      when parsing it
+        it should report each job as cancelled or failed with the scancel error
+        it should attribute array task errors to their array expression
+    """
+    output = (
+        "scancel: error: Kill job error on job id 13: Invalid job id specified\n"
+        "scancel: error: Kill job error on job id 31_4: Job/step already completing or completed\n"
+        "scancel: error: Unexpected failure\n"
+    )
+
+    outcomes, errors = parse_scancel_output(['12', '13', '30_5', '31_[1-5]'], output)
+
+    assert outcomes == [
+        {'job_id': '12', 'status': 'cancelled'},
+        {'job_id': '13', 'status': 'failed', 'message': 'Invalid job id specified'},
+        {'job_id': '30_5', 'status': 'cancelled'},
+        {'job_id': '31_[1-5]', 'status': 'failed', 'message': 'Job/step already completing or completed'},
+    ]
+    assert errors == ['scancel: error: Unexpected failure']
+
+
+def test_cancel_jobs_runs_a_single_scancel(client, mock_disable_auth, mock_csrf_needed, mocker):
+    """
+    Given a list of job ids and ranges
+      when cancelling them
+        it should run a single scancel over SSM
+        it should return the outcome of each job
+        it should invalidate the queue snapshot
+    """
+    ssm_command = mocker.patch(
+        'api.PclusterApiHandler.ssm_command',
+        return_value='scancel: error: Kill job error on job id 14: Invalid job id specified',
+    )
+    snapshots = mocker.patch.object(api.PclusterApiHandler, 'queue_snapshots', TTLCache(ttl=60))
+    snapshots.put(('eu-west-1', 'i-1', 'ec2-user'), {'jobs': []})
+
+    response = client.post(CANCEL_JOBS_URL, json={'job_ids': ['12-14', '20_[1-3]']})
+
+    assert response.status_code == 200
+    assert response.json['status'] == 'partial'
+    assert [outcome['status'] for outcome in response.json['jobs']] == ['cancelled', 'cancelled', 'failed', 'cancelled']
+    assert ssm_command.call_count == 1
+    assert ssm_command.call_args.args[3] == scancel_command(['12', '13', '14', '20_[1-3]'])
+    assert snapshots.age(('eu-west-1', 'i-1', 'ec2-user')) is None
+
+
+@pytest.mark.parametrize('body', [
+    pytest.param({'job_ids': []}, id='empty'),
+    pytest.param({'job_ids': ['12 13']}, id='space'),
+    pytest.param({'job_ids': ['$(reboot)']}, id='injection'),
+    pytest.param({'job_ids': ['1-5000']}, id='too_many_jobs'),
+    pytest.param({}, id='missing'),
+])
+def test_cancel_jobs_rejects_invalid_job_ids(client, mock_disable_auth, mock_csrf_needed, mocker, body):
+    ssm_command = mocker.patch('api.PclusterApiHandler.ssm_command')
+
+    response = client.post(CANCEL_JOBS_URL, json=body)
+
+    assert response.status_code == 400
+    ssm_command.assert_not_called()
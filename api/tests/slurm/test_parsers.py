@@ -0,0 +1,102 @@
+import json
+
+import pytest
+
+from api.slurm import QueueJob, parse_scontrol_jobs, parse_scontrol_line, parse_squeue_jobs
+
+SCONTROL_JOB = (
+    "JobId={job_id} JobName=train model UserId=ec2-user(1000) GroupId=ec2-user(1000) MCS_label=N/A Priority=4294901759 "
+    "Nice=0 Account=(null) QOS=(null) JobState=RUNNING Reason=None Dependency=(null) Requeue=1 Restarts=0 BatchFlag=1 "
+    "Reboot=0 ExitCode=0:0 RunTime=00:01:02 TimeLimit=UNLIMITED SubmitTime=2024-01-01T10:00:00 Partition=queue-1 "
+    "AllocNode:Sid=ip-10-0-0-1:1234 NodeList=queue-1-dy-c5-1 NumNodes=1 NumCPUs=2 NumTasks=1 CPUs/Task=1 "
+    "ReqB:S:C:T=0:0:*:* TRES=cpu=2,node=1,billing=2 Socks/Node=* NtasksPerN:B:S:C=0:0:*:* "
+    "Command=/home/ec2-user/train.sh --epochs 10 --name=final WorkDir=/home/ec2-user/my jobs "
+    "Comment=compare a=b runs StdOut=/home/ec2-user/slurm-{job_id}.out Power="
+)
+JOB_URL = '/manager/scontrol_job?instance_id=i-1&region=eu-west-1&job_id='
+JOBS_URL = '/manager/scontrol_jobs?instance_id=i-1&region=eu-west-1&job_ids='
+
+
+def test_parse_scontrol_line_keeps_values_with_spaces():
+    """
+    Given a scontrol one-line output with values containing spaces and `=`
+      when parsing it
+        it should keep each value up to the next field
+    """
+    fields = parse_scontrol_line(SCONTROL_JOB.format(job_id=12))
+
+    assert fields['JobName'] == 'train model'
+    assert fields['Command'] == '/home/ec2-user/train.sh --epochs 10 --name=final'
+    assert fields['WorkDir'] == '/home/ec2-user/my jobs'
+    assert fields['Comment'] == 'compare a=b runs'
+    assert fields['TRES'] == 'cpu=2,node=1,billing=2'
+    assert fields['AllocNode:Sid'] == 'ip-10-0-0-1:1234'
+    assert fields['Socks/Node'] == '*'
+    assert fields['Power'] == ''
+
+
+def test_parse_scontrol_jobs_returns_typed_records():
+    """
+    Given the output of scontrol show job -o for several jobs
+      when parsing it
+        it should return one record per job with its numeric fields parsed
+    """
+    output = "\n".join(SCONTROL_JOB.format(job_id=job_id) for job_id in (12, 13)) + "\n\n"
+
+    jobs = parse_scontrol_jobs(output)
+
+    assert [job.job_id for job in jobs] == [12, 13]
+    assert (jobs[0].user, jobs[0].user_id) == ('ec2-user', 1000)
+    assert (jobs[0].num_cpus, jobs[0].priority, jobs[0].restarts) == (2, 4294901759, 0)
+    assert jobs[0].state == 'RUNNING'
+    assert jobs[0].to_dict()['JobId'] == '12'
+
+
+@pytest.mark.parametrize('job_state, expected', [
+    pytest.param('RUNNING', 'RUNNING', id='slurm_22'),
+    pytest.param(['PENDING'], 'PENDING', id='slurm_23'),
+    pytest.param(['RUNNING', 'COMPLETING'], 'RUNNING,COMPLETING', id='slurm_23_flags'),
+])
+def test_parse_squeue_jobs_normalizes_job_state(job_state, expected):
+    output = json.dumps({'jobs': [{'job_id': 1, 'name': 'a', 'partition': 'q', 'nodes': 'n', 'job_state': job_state}]})
+
+    assert parse_squeue_jobs(output) == [QueueJob(1, 'a', 'q', 'n', expected, None)]
+    assert parse_squeue_jobs('') == []
+
+
+def test_scontrol_job_returns_fields(client, mock_disable_auth, mocker):
+    mocker.patch('api.PclusterApiHandler.ssm_command', return_value=SCONTROL_JOB.format(job_id=12))
+
+    response = client.get(JOB_URL + '12')
+
+    assert response.status_code == 200
+    assert response.json['WorkDir'] == '/home/ec2-user/my jobs'
+
+
+def test_scontrol_job_not_found(client, mock_disable_auth, mocker):
+    mocker.patch('api.PclusterApiHandler.ssm_command', return_value='')
+
+    assert client.get(JOB_URL + '12').status_code == 404
+
+
+def test_scontrol_jobs_fetches_all_jobs_in_one_command(client, mock_disable_auth, mocker):
+    """
+    Given several job ids
+      when requesting their details
+        it should run a single SSM command
+        it should report the jobs not found
+    """
+    ssm_command = mocker.patch('api.PclusterApiHandler.ssm_command',
+                               return_value="\n".join(SCONTROL_JOB.format(job_id=job_id) for job_id in (12, 13)))
+
+    response = client.get(JOBS_URL + '12,13,14')
+
+    assert response.status_code == 200
+    assert [job['JobId'] for job in response.json['jobs']] == ['12', '13']
+    assert response.json['missing'] == ['14']
+    assert ssm_command.call_count == 1
+    assert ssm_command.call_args.args[3].count('scontrol show job') == 3
+
+
+def test_scontrol_jobs_rejects_invalid_job_ids(client, mock_disable_auth):
+    assert client.get(JOBS_URL + '12;reboot').status_code == 400
@@ -0,0 +1,68 @@
+import itertools
+import random
+
+from botocore.exceptions import ClientError
+
+
+class VirtualClock:
+    """ Monotonic clock advanced only by sleeping, so that tests simulating slow commands run instantly """
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def constant(seconds):
+    return lambda: seconds
+
+
+def lognormal(median, sigma, seed=0):
+    """ Command latencies skewed towards fast commands with a long tail, like squeue/sacct on a busy head node """
+    rng = random.Random(seed)
+    return lambda: median * rng.lognormvariate(0, sigma)
+
+
+class FakeSsm:
+    """
+    Stand-in for the SSM client: every command sent completes after a latency drawn from `latency`,
+    measured on `clock`. Invocations only become visible after `visibility_delay`, like in SSM.
+    """
+
+    def __init__(self, clock, latency=constant(0.5), status='Success', output='', visibility_delay=0.0):
+        self.clock = clock
+        self.latency = latency
+        self.status = status
+        self.output = output
+        self.visibility_delay = visibility_delay
+        self.invocations = {}
+        self.polls = 0
+        self._ids = itertools.count()
+
+    def send_command(self, InstanceIds, **kwargs):
+        command_id = f'command-{next(self._ids)}'
+        sent_at = self.clock()
+        self.invocations[command_id] = {
+            'sent_at': sent_at,
+            'visible_at': sent_at + self.visibility_delay,
+            'completes_at': sent_at + self.latency(),
+            'parameters': kwargs.get('Parameters'),
+        }
+        return {'Command': {'CommandId': command_id}}
+
+    def get_command_invocation(self, CommandId, InstanceId):
+        self.polls += 1
+        invocation = self.invocations[CommandId]
+        if self.clock() < invocation['visible_at']:
+            raise ClientError({'Error': {'Code': 'InvocationDoesNotExist', 'Message': ''}}, 'GetCommandInvocation')
+        if self.clock() < invocation['completes_at']:
+            return {'Status': 'InProgress', 'StandardOutputContent': '', 'StandardErrorContent': ''}
+        return {'Status': self.status, 'StandardOutputContent': self.output, 'StandardErrorContent': ''}
+
+    def latency_of(self, command_id):
+        invocation = self.invocations[command_id]
+        return invocation['completes_at'] - invocation['sent_at']
@@ -0,0 +1,130 @@
+import logging
+import threading
+from unittest import mock
+
+import pytest
+from botocore.exceptions import ClientError
+
+import api.PclusterApiHandler
+from api.PclusterApiHandler import ssm_command
+from api.pcm_globals import _logger_ctxvar
+from api.ssm import CommandWaiter, LogStreamCleanup, read_command_output
+from api.ssm.output import INLINE_OUTPUT_LIMIT, TRUNCATION_MARKER
+from api.tests.ssm.fake_ssm import FakeSsm, VirtualClock, constant
+
+
+@pytest.fixture(autouse=True)
+def bind_logger():
+    token = _logger_ctxvar.set(logging.getLogger("test"))
+    yield
+    _logger_ctxvar.reset(token)
+
+
+@pytest.fixture
+def clock():
+    return VirtualClock()
+
+
+def _not_found():
+    return ClientError({'Error': {'Code': 'ResourceNotFoundException', 'Message': ''}}, 'DeleteLogStream')
+
+
+def test_read_command_output_uses_inline_output_when_complete():
+    """
+    Given a command invocation whose output fits the inline limit
+      when reading its output
+        it should return the inline output without reading CloudWatch
+    """
+    read_from_cloudwatch = mock.Mock()
+
+    output = read_command_output({'StandardOutputContent': '  line 1\n\n line 2 \n'}, read_from_cloudwatch)
+
+    assert output == 'line 1\nline 2'
+    read_from_cloudwatch.assert_not_called()
+
+
+@pytest.mark.parametrize('content', [
+    pytest.param('x' * INLINE_OUTPUT_LIMIT, id='at_limit'),
+    pytest.param('x' * 100 + '\n' + TRUNCATION_MARKER, id='truncation_marker'),
+])
+def test_read_command_output_falls_back_to_cloudwatch_when_truncated(content):
+    read_from_cloudwatch = mock.Mock(return_value='full output')
+
+    assert read_command_output({'StandardOutputContent': content}, read_from_cloudwatch) == 'full output'
+
+
+def test_ssm_command_reads_cloudwatch_only_for_large_outputs(mocker, clock):
+    """
+    Given a small and a large command output
+      when running the commands
+        it should read CloudWatch only for the large output
+        it should schedule the deletion of the output log stream of both commands
+    """
+    ssm = FakeSsm(clock, latency=constant(0.1), output='[{"job_id": 1}]')
+    mocker.patch('api.PclusterApiHandler.get_client', return_value=ssm)
+    mocker.patch.object(api.PclusterApiHandler, 'ssm_waiter', CommandWaiter(sleep=clock.sleep, clock=clock))
+    cleanup = mocker.patch.object(api.PclusterApiHandler, 'log_stream_cleanup')
+    read_from_cloudwatch = mocker.patch('api.PclusterApiHandler.read_ssm_output_from_cloudwatch',
+                                        return_value='large output')
+
+    assert ssm_command('eu-west-1', 'i-1', 'ec2-user', 'squeue') == '[{"job_id": 1}]'
+    ssm.output = 'x' * INLINE_OUTPUT_LIMIT
+    assert ssm_command('eu-west-1', 'i-1', 'ec2-user', 'squeue') == 'large output'
+
+    assert read_from_cloudwatch.call_count == 1
+    assert [call.args[2] for call in cleanup.schedule.call_args_list] == [
+        'command-0/i-1/aws-runShellScript/stdout',
+        'command-1/i-1/aws-runShellScript/stdout',
+    ]
+
+
+def test_log_stream_cleanup_retries_streams_not_uploaded_yet():
+    """
+    Given a log stream not created yet by the SSM agent
+      when its deletion is processed
+        it should retry the deletion up to the max attempts
+    """
+    logs = mock.Mock()
+    logs.delete_log_stream.side_effect = [_not_found(), None]
+    cleanup = LogStreamCleanup(lambda region: logs, delay=0, background=False)
+    cleanup.schedule('eu-west-1', 'group', 'stream')
+    cleanup.flush()
+
+    assert logs.delete_log_stream.call_count == 2
+    assert (cleanup.deleted, cleanup.failed) == (1, 0)
+
+
+def test_log_stream_cleanup_gives_up_after_max_attempts():
+    logs = mock.Mock()
+    logs.delete_log_stream.side_effect = _not_found()
+    cleanup = LogStreamCleanup(lambda region: logs, delay=0, max_attempts=3, background=False)
+    cleanup.schedule('eu-west-1', 'group', 'stream')
+    cleanup.flush()
+
+    assert logs.delete_log_stream.call_count == 3
+    assert (cleanup.deleted, cleanup.failed) == (0, 1)
+    assert cleanup.pending() == 0
+
+
+def test_log_stream_cleanup_drops_streams_when_full():
+    cleanup = LogStreamCleanup(lambda region: mock.Mock(), delay=60, max_pending=1, background=False)
+    cleanup.schedule('eu-west-1', 'group', 'stream-1')
+    cleanup.schedule('eu-west-1', 'group', 'stream-2')
+
+    assert cleanup.pending() == 1
+
+
+def test_log_stream_cleanup_deletes_streams_in_background():
+    """
+    Given a log stream scheduled for deletion
+      when its delay has elapsed
+        it should be deleted by the background worker
+    """
+    logs = mock.Mock()
+    deleted = threading.Event()
+    logs.delete_log_stream.side_effect = lambda **kwargs: deleted.set()
+    cleanup = LogStreamCleanup(lambda region: logs, delay=0.05)
+    cleanup.schedule('eu-west-1', 'group', 'stream')
+
+    assert deleted.wait(timeout=5)
+    logs.delete_log_stream.assert_called_once_with(logGroupName='group', logStreamName='stream')
@@ -0,0 +1,103 @@
+import statistics
+
+import pytest
+
+import api.PclusterApiHandler
+from api.ssm import CommandTimeoutError, CommandWaiter
+from api.tests.ssm.fake_ssm import FakeSsm, VirtualClock, constant, lognormal
+
+
+@pytest.fixture
+def clock():
+    return VirtualClock()
+
+
+@pytest.fixture
+def waiter(clock):
+    return CommandWaiter(sleep=clock.sleep, clock=clock)
+
+
+def _run(ssm, waiter, timeout=60):
+    command_id = ssm.send_command(InstanceIds=['i-1'])['Command']['CommandId']
+    invocation, polls = waiter.wait(ssm, command_id, 'i-1', timeout)
+    return command_id, invocation, polls
+
+
+def test_waiter_picks_up_fast_commands_quickly(clock, waiter):
+    """
+    Given a command completing in 50ms
+      when waiting for it
+        it should be detected with a single poll well before the former fixed 0.75s sleep
+    """
+    ssm = FakeSsm(clock, latency=constant(0.05))
+
+    _, invocation, polls = _run(ssm, waiter)
+
+    assert invocation['Status'] == 'Success'
+    assert polls == 1
+    assert clock() < 0.2
+
+
+def test_waiter_backs_off_on_slow_commands(clock, waiter):
+    """
+    Given a command completing in 30s
+      when waiting for it
+        it should poll far less than once every 0.75s
+    """
+    ssm = FakeSsm(clock, latency=constant(30))
+
+    _, _, polls = _run(ssm, waiter)
+
+    assert polls <= 20
+    assert clock() < 32
+    assert waiter.stats() == {'commands': 1, 'polls': polls}
+
+
+def test_waiter_times_out_at_the_requested_deadline(clock, waiter):
+    ssm = FakeSsm(clock, latency=constant(30))
+
+    with pytest.raises(CommandTimeoutError):
+        _run(ssm, waiter, timeout=5)
+    assert clock() == pytest.approx(5)
+
+
+def test_waiter_tolerates_invocations_not_visible_yet(clock, waiter):
+    ssm = FakeSsm(clock, latency=constant(0.5), visibility_delay=0.2)
+
+    _, invocation, _ = _run(ssm, waiter)
+
+    assert invocation['Status'] == 'Success'
+
+
+def test_waiter_detection_delay_over_latency_distribution(clock, waiter):
+    """
+    Given commands with lognormal latencies (median 1s, long tail)
+      when waiting for each of them
+        it should detect the completion at most one backoff interval after the command ends
+    """
+    ssm = FakeSsm(clock, latency=lognormal(median=1, sigma=1))
+    overheads, poll_counts = [], []
+
+    for _ in range(200):
+        start = clock()
+        command_id, _, polls = _run(ssm, waiter, timeout=300)
+        overheads.append(clock() - start - ssm.latency_of(command_id))
+        poll_counts.append(polls)
+
+    assert max(overheads) <= waiter.max_delay
+    assert statistics.median(poll_counts) <= 5
+
+
+def test_queue_status_uses_requested_timeout(client, mock_disable_auth, mocker, clock):
+    """
+    Given the queue_status endpoint
+      when the client requests a deadline shorter than the command latency
+        it should give up at that deadline
+    """
+    mocker.patch('api.PclusterApiHandler.get_client', return_value=FakeSsm(clock, latency=constant(30)))
+    mocker.patch.object(api.PclusterApiHandler, 'ssm_waiter', CommandWaiter(sleep=clock.sleep, clock=clock))
+
+    response = client.get('/manager/queue_status?instance_id=i-1&region=eu-west-1&timeout=5')
+
+    assert response.status_code == 400
+    assert clock() == pytest.approx(5)
@@ -24,10 +24,8 @@ def mock_ssm_send(mocker):
 
     mocker.patch("api.PclusterApiHandler.boto3.client", return_value=mock_client)
     mocker.patch("api.PclusterApiHandler.time.sleep")
-    mocker.patch(
-        "api.PclusterApiHandler.read_and_delete_ssm_output_from_cloudwatch",
-        return_value="",
-    )
+    mocker.patch("api.PclusterApiHandler.read_ssm_output_from_cloudwatch", return_value="")
+    mocker.patch("api.PclusterApiHandler.log_stream_cleanup")
     return mock_client
 
 
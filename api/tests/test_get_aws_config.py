@@ -0,0 +1,166 @@
+import time
+
+import pytest
+
+import api.PclusterApiHandler
+from api.caching import TTLCache
+
+
+class FakeAwsClient:
+    """ Stand-in for a boto3 client, serving each operation from a list of pages """
+
+    def __init__(self, paginated, **pages):
+        self.paginated = paginated
+        self.pages = pages
+        self.calls = []
+
+    def can_paginate(self, operation):
+        return operation in self.paginated
+
+    def get_paginator(self, operation):
+        client = self
+
+        class Paginator:
+            def paginate(self, **kwargs):
+                client.calls.append((operation, kwargs))
+                return client._pages(operation)
+
+        return Paginator()
+
+    def _pages(self, operation):
+        pages = self.pages[operation]
+        if isinstance(pages, Exception):
+            raise pages
+        return [page() if callable(page) else page for page in pages]
+
+    def __getattr__(self, operation):
+        def describe(**kwargs):
+            self.calls.append((operation, kwargs))
+            pages = self._pages(operation)
+            return pages[1] if 'NextToken' in kwargs else pages[0]
+        return describe
+
+    def call_count(self, operation):
+        return len([call for call in self.calls if call[0] == operation])
+
+
+@pytest.fixture
+def mock_aws_clients(mocker):
+    ec2 = FakeAwsClient(
+        {'describe_vpcs', 'describe_subnets', 'describe_security_groups', 'describe_instance_types'},
+        describe_key_pairs=[{'KeyPairs': [{'KeyName': 'key'}]}],
+        describe_vpcs=[{'Vpcs': [{'VpcId': 'vpc-1'}]}],
+        describe_subnets=[{'Subnets': [{'SubnetId': 'subnet-1'}]}, {'Subnets': [{'SubnetId': 'subnet-2'}]}],
+        describe_security_groups=[{'SecurityGroups': [{'GroupId': 'sg-1', 'GroupName': 'sg', 'VpcId': 'vpc-1'}]}],
+        describe_instance_types=[{'InstanceTypes': [{'InstanceType': 'c5n.18xlarge'}]}],
+    )
+    fsx = FakeAwsClient(
+        {'describe_file_systems', 'describe_volumes'},
+        describe_file_systems=[{'FileSystems': []}],
+        describe_volumes=[{'Volumes': [{'Lifecycle': 'CREATED'}, {'Lifecycle': 'DELETING'}]}],
+        describe_file_caches=[{'FileCaches': [{'Lifecycle': 'AVAILABLE'}], 'NextToken': 'token'},
+                              {'FileCaches': [{'Lifecycle': 'AVAILABLE'}]}],
+    )
+    efs = FakeAwsClient({'describe_file_systems'}, describe_file_systems=[{'FileSystems': [{'FileSystemId': 'fs-1'}]}])
+
+    clients = {'ec2': ec2, 'fsx': fsx, 'efs': efs}
+    mocker.patch('api.PclusterApiHandler.get_client', side_effect=lambda service, region=None: clients[service])
+    mocker.patch.object(api.PclusterApiHandler, 'aws_config_cache', TTLCache(ttl=60))
+    return clients
+
+
+def test_get_aws_config(client, mock_disable_auth, mock_aws_clients):
+    """
+    Given the get_aws_configuration endpoint
+      when all the AWS services answer
+        it should return the resources of every page of every service
+        it should report the latency of every source
+    """
+    response = client.get('/manager/get_aws_configuration?region=eu-west-1')
+
+    assert response.status_code == 200
+    assert response.json['security_groups'] == [{'GroupId': 'sg-1', 'GroupName': 'sg'}]
+    assert response.json['vpcs'] == [{'VpcId': 'vpc-1'}]
+    assert response.json['fsx_volumes'] == [{'Lifecycle': 'CREATED'}]
+    assert response.json['efa_instance_types'] == ['c5n.18xlarge']
+    assert response.json['subnets'] == [{'SubnetId': 'subnet-1'}, {'SubnetId': 'subnet-2'}]
+    assert response.json['file_caches'] == [{'Lifecycle': 'AVAILABLE'}, {'Lifecycle': 'AVAILABLE'}]
+    assert set(response.json['latencies']) == set(api.PclusterApiHandler.AWS_CONFIG_SOURCES)
+
+
+def test_get_aws_config_calls_services_concurrently(client, mock_disable_auth, mock_aws_clients):
+    """
+    Given the get_aws_configuration endpoint
+      when every AWS call is slow
+        it should take about as long as the slowest call, not as their sum
+    """
+    def slow(response):
+        def _slow():
+            time.sleep(0.2)
+            return response
+        return _slow
+
+    ec2, efs = mock_aws_clients['ec2'], mock_aws_clients['efs']
+    ec2.pages['describe_vpcs'] = [slow({'Vpcs': []})]
+    ec2.pages['describe_subnets'] = [slow({'Subnets': []})]
+    ec2.pages['describe_key_pairs'] = [slow({'KeyPairs': []})]
+    efs.pages['describe_file_systems'] = [slow({'FileSystems': []})]
+
+    start = time.monotonic()
+    response = client.get('/manager/get_aws_configuration?region=eu-west-1')
+
+    assert response.status_code == 200
+    assert time.monotonic() - start < 0.6
+
+
+def test_get_aws_config_partial_results_on_optional_failures(client, mock_disable_auth, mock_aws_clients):
+    """
+    Given the get_aws_configuration endpoint
+      when an optional service such as FSx fails
+        it should return an empty list for it and the other resources
+    """
+    mock_aws_clients['fsx'].pages['describe_file_systems'] = Exception('FSx not available')
+
+    response = client.get('/manager/get_aws_configuration?region=eu-west-1')
+
+    assert response.status_code == 200
+    assert response.json['fsx_filesystems'] == []
+    assert response.json['efs_filesystems'] == [{'FileSystemId': 'fs-1'}]
+
+
+def test_get_aws_config_caches_each_source(client, mock_disable_auth, mock_aws_clients):
+    """
+    Given the get_aws_configuration endpoint
+      when called twice for the same region
+        it should call each AWS API once
+    """
+    client.get('/manager/get_aws_configuration?region=eu-west-1')
+    client.get('/manager/get_aws_configuration?region=eu-west-1')
+
+    assert mock_aws_clients['ec2'].call_count('describe_vpcs') == 1
+    assert mock_aws_clients['efs'].call_count('describe_file_systems') == 1
+
+
+def test_get_aws_config_filtered_by_vpc(client, mock_disable_auth, mock_aws_clients):
+    """
+    Given the get_aws_configuration endpoint
+      when only the subnets and security groups of a VPC are requested
+        it should filter them server side by VPC
+        it should not describe the other resources
+    """
+    response = client.get('/manager/get_aws_configuration?region=eu-west-1&vpc_id=vpc-0123456789abcdef0'
+                          '&resources=subnets,security_groups')
+
+    assert response.status_code == 200
+    assert set(response.json) == {'subnets', 'security_groups', 'region', 'latencies'}
+    vpc_filter = {'Filters': [{'Name': 'vpc-id', 'Values': ['vpc-0123456789abcdef0']}]}
+    assert ('describe_subnets', vpc_filter) in mock_aws_clients['ec2'].calls
+    assert ('describe_security_groups', vpc_filter) in mock_aws_clients['ec2'].calls
+    assert mock_aws_clients['ec2'].call_count('describe_vpcs') == 0
+
+
+@pytest.mark.parametrize('query', ['resources=subnets,volumes', 'vpc_id=not-a-vpc'])
+def test_get_aws_config_invalid_filters(client, mock_disable_auth, mock_aws_clients, query):
+    response = client.get(f'/manager/get_aws_configuration?region=eu-west-1&{query}')
+
+    assert response.status_code == 400
@@ -0,0 +1,52 @@
+import pytest
+
+import api.PclusterApiHandler
+from api.caching import TTLCache
+
+INSTANCE_TYPES_PAGE = {
+    'InstanceTypes': [{
+        'InstanceType': 't3.micro',
+        'NetworkInfo': {},
+        'MemoryInfo': {'SizeInMiB': 1024},
+        'VCpuInfo': {'DefaultVCpus': 2},
+    }]
+}
+
+
+@pytest.fixture
+def mock_ec2(mocker):
+    ec2 = mocker.Mock()
+    ec2.get_paginator.return_value.paginate.return_value = [INSTANCE_TYPES_PAGE]
+    mocker.patch('api.PclusterApiHandler.get_client', return_value=ec2)
+    mocker.patch.object(api.PclusterApiHandler, 'instance_types_cache', TTLCache(ttl=60))
+    return ec2
+
+
+def test_get_instance_types_cached_per_region(client, mock_disable_auth, mock_ec2):
+    """
+    Given the get_instance_types endpoint
+      when called multiple times for the same region
+        it should describe the instance types only once
+    """
+    first = client.get('/manager/get_instance_types?region=eu-west-1')
+    second = client.get('/manager/get_instance_types?region=eu-west-1')
+
+    assert first.status_code == second.status_code == 200
+    assert first.json['instance_types'][0]['InstanceType'] == 't3.micro'
+    assert mock_ec2.get_paginator.call_count == 1
+
+
+def test_get_instance_types_revalidated_with_etag(client, mock_disable_auth, mock_ec2):
+    """
+    Given the get_instance_types endpoint
+      when the browser revalidates its copy with If-None-Match
+        it should answer 304 without a body
+    """
+    response = client.get('/manager/get_instance_types?region=eu-west-1')
+    assert 'max-age=3600' in response.headers['Cache-Control']
+
+    revalidated = client.get('/manager/get_instance_types?region=eu-west-1',
+                             headers={'If-None-Match': response.headers['ETag']})
+
+    assert revalidated.status_code == 304
+    assert revalidated.data == b''
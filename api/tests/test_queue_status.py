@@ -0,0 +1,66 @@
+import threading
+import time
+
+import pytest
+
+import api.PclusterApiHandler
+from api.caching import TTLCache
+from api.ssm import CommandWaiter
+from api.tests.ssm.fake_ssm import FakeSsm, constant
+
+QUEUE_STATUS_URL = '/manager/queue_status?instance_id=i-1&region=eu-west-1'
+
+
+@pytest.fixture
+def fake_ssm(mocker):
+    ssm = FakeSsm(time.monotonic, latency=constant(0.2), output='[{"job_id": 1}]')
+    mocker.patch('api.PclusterApiHandler.get_client', return_value=ssm)
+    mocker.patch('api.PclusterApiHandler.log_stream_cleanup')
+    mocker.patch.object(api.PclusterApiHandler, 'ssm_waiter', CommandWaiter(initial_delay=0.05))
+    mocker.patch.object(api.PclusterApiHandler, 'queue_snapshots', TTLCache(ttl=60))
+    return ssm
+
+
+def test_queue_status_returns_snapshot_time(client, mock_disable_auth, fake_ssm):
+    """
+    Given the queue_status endpoint
+      when polled twice within the max age
+        it should run squeue only once
+        it should return the time the snapshot was taken
+    """
+    first = client.get(QUEUE_STATUS_URL)
+    second = client.get(QUEUE_STATUS_URL)
+
+    assert first.json == second.json
+    assert [job['job_id'] for job in first.json['jobs']] == [1]
+    assert first.json['snapshot_time'].endswith('Z')
+    assert len(fake_ssm.invocations) == 1
+
+
+def test_queue_status_single_flight_for_concurrent_viewers(app, mock_disable_auth, fake_ssm):
+    """
+    Given the queue_status endpoint
+      when many viewers of the same cluster poll it at the same time
+        it should share a single in-flight SSM command
+    """
+    responses = []
+
+    def poll():
+        responses.append(app.test_client().get(QUEUE_STATUS_URL))
+
+    threads = [threading.Thread(target=poll) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [response.status_code for response in responses] == [200] * 5
+    assert len(fake_ssm.invocations) == 1
+
+
+def test_cancel_job_invalidates_queue_snapshot(client, mock_disable_auth, fake_ssm):
+    client.get(QUEUE_STATUS_URL)
+    client.get('/manager/cancel_job?instance_id=i-1&region=eu-west-1&job_id=1')
+    client.get(QUEUE_STATUS_URL)
+
+    assert len(fake_ssm.invocations) == 3
@@ -11,19 +11,30 @@
 import datetime
 import os
 
-import boto3
 import dateutil
-from flask import Flask, Response, request, send_from_directory
+from flask import Flask, Response, request
 import requests
 
+from api.assets import StaticAssets
+from api.aws.clients import get_client
+from api.compression import ResponseCompression
 from api.pcm_globals import PCMGlobals, logger
 from api.exception import ExceptionHandler
-from api.logging import RequestResponseLogging
+from api.logging import RequestResponseLogging, http_logging, parse_sample_rates
+from api.logging.http_info import DEFAULT_MAX_BODY_SIZE
+from api.logging.logger import DefaultLogger
+from api.metrics import RequestMetrics, metrics
 from api.security import SecurityHeaders
+from api.ssm.output import ssm_output_log_stream
 
 # needed to only allow tests to disable auth
 DISABLE_AUTH=False
 
+HTTP_LOG_SAMPLE_RATES = os.getenv("HTTP_LOG_SAMPLE_RATES")
+HTTP_LOG_MAX_BODY_SIZE = int(os.getenv("HTTP_LOG_MAX_BODY_SIZE", DEFAULT_MAX_BODY_SIZE))
+# EMF lines in Lambda, where CloudWatch extracts them from the logs, else opt-in with METRICS_EXPORTER=prometheus
+METRICS_EXPORTER = os.getenv("METRICS_EXPORTER", "emf" if os.getenv("AWS_LAMBDA_FUNCTION_NAME") else None)
+
 def to_utc_datetime(time_in, default_timezone=datetime.timezone.utc) -> datetime.datetime:
     """
     Convert a given string, datetime or int into utc datetime.
@@ -67,6 +78,9 @@ def to_iso_timestr(time_in: datetime.datetime) -> str:
 def running_local():
     return os.getenv("ENV") == "dev"
 
+def running_in_lambda():
+    return bool(os.getenv("AWS_LAMBDA_FUNCTION_NAME"))
+
 def disable_auth():
     return DISABLE_AUTH
 
@@ -98,10 +112,21 @@ def build_flask_app(name):
     app = Flask(name, **additional_args)
     # Pcm globals setter functions before any other before_func
     PCMGlobals(app, running_local=is_running_local)
+    # after_request hooks run in reverse order: responses are compressed once every other hook is done.
+    # Not in Lambda, where the REST API has no binary media types to decode the compressed bodies
+    if not running_in_lambda():
+        ResponseCompression(app, registry=metrics)
 
     SecurityHeaders(app, running_local=is_running_local)
     ExceptionHandler(app, running_local=is_running_local)
-    RequestResponseLogging(app=app, logger=logger)
+    RequestMetrics(app, registry=metrics, exporter=METRICS_EXPORTER)
+    http_logging.start()
+    # records are handed to the handlers of the pcluster-manager logger by the http_logging thread
+    http_logger = DefaultLogger(is_running_local=False, name=http_logging.name)
+    RequestResponseLogging(app=app, logger=http_logger, sample_rates=parse_sample_rates(HTTP_LOG_SAMPLE_RATES),
+                           max_body_size=HTTP_LOG_MAX_BODY_SIZE)
+    if not is_running_local:
+        StaticAssets(app, compressed=not running_in_lambda())
 
     return app
 
@@ -110,17 +135,17 @@ def serve_frontend(app, path=""):
     if running_local():
         return proxy_to("http://localhost:3000/" + path)
 
-    return send_from_directory(app.static_folder, "index.html")
+    return app.extensions["assets"].index()
 
-def read_and_delete_ssm_output_from_cloudwatch(
+def read_ssm_output_from_cloudwatch(
         region: str,
         log_group_name: str,
         command_id: str,
         instance_id: str,
 ) -> str:
-    logs_client = boto3.client('logs', region_name=region)
+    logs_client = get_client('logs', region)
 
-    log_stream_name =  f"{command_id}/{instance_id}/aws-runShellScript/stdout"
+    log_stream_name = ssm_output_log_stream(command_id, instance_id)
 
     logger.info(
         f"Reading output for SSM command {command_id} from logstream {log_stream_name} in log group {log_group_name}"
@@ -149,13 +174,11 @@ def read_and_delete_ssm_output_from_cloudwatch(
                     output_lines.append(message)
             if not next_token or normalize_logs_token(next_token) == normalize_logs_token(next_backward_token):
                 break
-        delete_log_stream(logs_client, log_group_name, log_stream_name)
     except Exception as ex:
         logger.error(
             f"Failed to read output for SSM command {command_id} "
             f"from logstream {log_stream_name} in log group {log_group_name}: {ex}"
         )
-        delete_log_stream(logs_client, log_group_name, log_stream_name)
 
     logger.info(
         f"Completed reading of output for SSM command {command_id} "
@@ -166,13 +189,3 @@ def read_and_delete_ssm_output_from_cloudwatch(
 
 def normalize_logs_token(token: str) -> str:
     return token.split('/', 1)[1] if token and '/' in token else token
-
-def delete_log_stream(logs_client, log_group_name: str, log_stream_name: str):
-    try:
-        logs_client.delete_log_stream(
-            logGroupName=log_group_name,
-            logStreamName=log_stream_name,
-        )
-        logger.info(f"Deleted log stream {log_stream_name} in log group {log_group_name}")
-    except Exception as ex:
-        logger.error(f"Failed to delete log stream {log_stream_name} in log group {log_group_name}: {ex}")
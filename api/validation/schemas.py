@@ -1,7 +1,11 @@
 from marshmallow import Schema, fields, validate, INCLUDE, validates_schema
 
 from api.validation.validators import aws_region_validator, is_alphanumeric_with_hyphen, \
-    valid_api_log_levels_predicate, size_not_exceeding, is_safe_path
+    valid_api_log_levels_predicate, size_not_exceeding, is_safe_path, job_expressions_within_limit, \
+    are_cost_explorer_metrics
+from api.slurm import JOB_EXPRESSION, MAX_CANCEL_JOBS
+
+SSM_COMMAND_MAX_TIMEOUT = 300
 
 
 class EC2ActionSchema(Schema):
@@ -42,6 +46,8 @@ GetCustomImageConfig = GetCustomImageConfigSchema(unknown=INCLUDE)
 
 class GetAwsConfigSchema(Schema):
     region = fields.String(validate=aws_region_validator)
+    vpc_id = fields.String(validate=validate.Regexp(r'^vpc-[0-9a-f]{8,17}$'))
+    resources = fields.String(validate=validate.Length(max=512)) # comma separated subset of the resources to describe
 
 GetAwsConfig = GetAwsConfigSchema(unknown=INCLUDE)
 
@@ -56,6 +62,7 @@ class GetDcvSessionSchema(Schema):
     user = fields.String(validate=validate.Length(max=64))
     instance_id = fields.String(required=True, validate=validate.Length(max=60))
     region = fields.String(validate=aws_region_validator)
+    timeout = fields.Integer(validate=validate.Range(min=1, max=SSM_COMMAND_MAX_TIMEOUT)) # seconds to wait for the SSM command
 
 GetDcvSession = GetDcvSessionSchema(unknown=INCLUDE)
 
@@ -64,6 +71,7 @@ class QueueStatusSchema(Schema):
     user = fields.String(validate=validate.Length(max=64))
     instance_id = fields.String(required=True, validate=validate.Length(max=60))
     region = fields.String(required=True, validate=aws_region_validator)
+    timeout = fields.Integer(validate=validate.Range(min=1, max=SSM_COMMAND_MAX_TIMEOUT))
 
 QueueStatus = QueueStatusSchema(unknown=INCLUDE)
 
@@ -73,28 +81,70 @@ class ScontrolJobSchema(Schema):
     instance_id = fields.String(required=True, validate=validate.Length(max=60))
     job_id = fields.String(required=True, validate=validate.Length(max=256))
     region = fields.String(required=True, validate=aws_region_validator)
+    timeout = fields.Integer(validate=validate.Range(min=1, max=SSM_COMMAND_MAX_TIMEOUT))
 
 ScontrolJob = ScontrolJobSchema(unknown=INCLUDE)
 
 
+class ScontrolJobsSchema(Schema):
+    user = fields.String(validate=validate.Length(max=64))
+    instance_id = fields.String(required=True, validate=validate.Length(max=60))
+    # comma separated job ids or array tasks, e.g. 12,13_4
+    job_ids = fields.String(required=True, validate=validate.And(validate.Length(max=2048),
+                                                                  validate.Regexp(r'^\d+(_\d+)?(,\d+(_\d+)?)*$')))
+    region = fields.String(required=True, validate=aws_region_validator)
+    timeout = fields.Integer(validate=validate.Range(min=1, max=SSM_COMMAND_MAX_TIMEOUT))
+
+ScontrolJobs = ScontrolJobsSchema(unknown=INCLUDE)
+
+
 class CancelJobSchema(Schema):
     user = fields.String(validate=validate.Length(max=64))
     instance_id = fields.String(required=True, validate=validate.Length(max=60))
     job_id = fields.String(required=True, validate=validate.Length(max=256))
     region = fields.String(required=True, validate=aws_region_validator)
+    timeout = fields.Integer(validate=validate.Range(min=1, max=SSM_COMMAND_MAX_TIMEOUT))
 
 CancelJob = CancelJobSchema(unknown=INCLUDE)
 
 
+class CancelJobsSchema(Schema):
+    user = fields.String(validate=validate.Length(max=64))
+    instance_id = fields.String(required=True, validate=validate.Length(max=60))
+    region = fields.String(required=True, validate=aws_region_validator)
+    timeout = fields.Integer(validate=validate.Range(min=1, max=SSM_COMMAND_MAX_TIMEOUT))
+
+CancelJobs = CancelJobsSchema(unknown=INCLUDE)
+
+
+class CancelJobsBodySchema(Schema):
+    # job ids, ranges of job ids (12-20), array tasks (12_3) or array expressions (12_[1-5,7])
+    job_ids = fields.List(
+        fields.String(validate=validate.And(validate.Length(max=256), validate.Regexp(JOB_EXPRESSION))),
+        required=True,
+        validate=validate.And(validate.Length(min=1, max=MAX_CANCEL_JOBS), job_expressions_within_limit),
+    )
+
+CancelJobsBody = CancelJobsBodySchema(unknown=INCLUDE)
+
+
 class SacctSchema(Schema):
     user = fields.String(validate=validate.Length(max=64))
     instance_id = fields.String(required=True, validate=validate.Length(max=60))
     cluster_name = fields.String(required=True, validate=validate.And(is_alphanumeric_with_hyphen, validate.Length(max=60)))
     region = fields.String(required=True, validate=aws_region_validator)
+    timeout = fields.Integer(validate=validate.Range(min=1, max=SSM_COMMAND_MAX_TIMEOUT))
 
 Sacct = SacctSchema(unknown=INCLUDE)
 
 
+class SacctStreamSchema(SacctSchema):
+    cursor = fields.String(validate=validate.Regexp(r'^\d{1,12}-\d{1,12}$'))
+    page_size = fields.Integer(validate=validate.Range(min=1, max=1000))
+
+SacctStream = SacctStreamSchema(unknown=INCLUDE)
+
+
 class LoginSchema(Schema):
     code = fields.String(required=True, validate=validate.Length(max=128))
 
@@ -136,5 +186,13 @@ PCProxyBody = PCProxyBodySchema(max_size=1000000, unknown=INCLUDE)
 class GetCostDataSchema(Schema):
     start = fields.DateTime(required=True)
     end = fields.DateTime()
+    granularity = fields.String(validate=validate.OneOf(['DAILY', 'MONTHLY']))
 
 GetCostData = GetCostDataSchema(unknown=INCLUDE)
+
+
+class GetCostDataByClusterSchema(GetCostDataSchema):
+    # comma separated Cost Explorer metrics, e.g. UnblendedCost,UsageQuantity
+    metrics = fields.String(validate=validate.And(validate.Length(max=256), are_cost_explorer_metrics))
+
+GetCostDataByCluster = GetCostDataByClusterSchema(unknown=INCLUDE)
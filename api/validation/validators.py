@@ -4,6 +4,7 @@ from marshmallow import validate, ValidationError
 import re
 
 from api.logging import VALID_LOG_LEVELS
+from api.slurm import expand_job_expressions
 
 # PC available regions
 PC_REGIONS = [
@@ -33,6 +34,21 @@ def size_not_exceeding(data, size):
     if byte_size > size:
         raise ValidationError(f'Request body exceeded max size of {size} bytes')
 
+COST_EXPLORER_METRICS = {
+    'AmortizedCost', 'BlendedCost', 'NetAmortizedCost', 'NetUnblendedCost',
+    'NormalizedUsageAmount', 'UnblendedCost', 'UsageQuantity',
+}
+
+def are_cost_explorer_metrics(arg: str):
+    metrics = arg.split(',')
+    return len(metrics) == len(set(metrics)) and set(metrics) <= COST_EXPLORER_METRICS
+
+def job_expressions_within_limit(expressions):
+    try:
+        expand_job_expressions(expressions)
+    except ValueError as e:
+        raise ValidationError(str(e))
+
 def is_safe_path(arg: str):
     """
     Validates if a given path is safe from path traversal attacks.
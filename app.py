@@ -18,6 +18,7 @@ import api.utils as utils
 from api.PclusterApiHandler import (
     authenticated,
     cancel_job,
+    cancel_jobs,
     create_user,
     delete_user,
     ec2_action,
@@ -35,18 +36,26 @@ from api.PclusterApiHandler import (
     price_estimate,
     queue_status,
     sacct,
+    sacct_stream,
     scontrol_job,
-    CLIENT_ID, CLIENT_SECRET, USER_POOL_ID, pc
+    scontrol_jobs,
+    cognito_client_id,
+    cognito_client_secret,
+    cognito_user_pool_id,
+    csrf_fingerprint,
+    pc
 )
 from api.costmonitoring import costs
-from api.logging import parse_log_entry, push_log_entry
+from api.logging import frontend_logs, parse_log_entry, push_log_entry
 from api.pcm_globals import logger
 from api.security.csrf import CSRF
 from api.security.csrf.csrf import csrf_needed
-from api.security.fingerprint import CognitoFingerprintGenerator
+from api.security.fingerprint import CognitoFingerprintGenerator, LazyFingerprintGenerator, \
+    PrecomputedFingerprintGenerator
 from api.validation import validated, EC2Action
 from api.validation.schemas import CreateUser, DeleteUser, GetClusterConfig, GetCustomImageConfig, GetAwsConfig, GetInstanceTypes,\
-     Login, PushLog, PriceEstimate, GetDcvSession, QueueStatus, ScontrolJob, CancelJob, Sacct
+     Login, PushLog, PriceEstimate, GetDcvSession, QueueStatus, ScontrolJob, ScontrolJobs, CancelJob, CancelJobs,\
+     CancelJobsBody, Sacct, SacctStream
 
 ADMINS_GROUP = { "admin" }
 
@@ -67,12 +76,19 @@ class PClusterJSONEncoder(DefaultJSONProvider):
         return DefaultJSONProvider.default(self, obj)
 
 
+def fingerprint_generator():
+    precomputed_fingerprint = csrf_fingerprint()
+    if precomputed_fingerprint:
+        return PrecomputedFingerprintGenerator(precomputed_fingerprint)
+    return CognitoFingerprintGenerator(cognito_client_id(), cognito_client_secret(), cognito_user_pool_id())
+
+
 def run():
     app = utils.build_flask_app(__name__)
     app.config["APPLICATION_ROOT"] = '/pcui'
     app.json = PClusterJSONEncoder(app)
     app.url_map.converters["regex"] = RegexConverter
-    CSRF(app, CognitoFingerprintGenerator(CLIENT_ID, CLIENT_SECRET, USER_POOL_ID))
+    CSRF(app, LazyFingerprintGenerator(fingerprint_generator))
 
     @app.errorhandler(401)
     def custom_401(_error):
@@ -170,6 +186,13 @@ def run():
     def cancel_job_():
         return cancel_job()
 
+    @app.route("/manager/cancel_jobs", methods=["POST"])
+    @authenticated(ADMINS_GROUP)
+    @csrf_needed
+    @validated(params=CancelJobs, body=CancelJobsBody)
+    def cancel_jobs_():
+        return cancel_jobs()
+
     @app.route("/manager/price_estimate")
     @authenticated(ADMINS_GROUP)
     @validated(params=PriceEstimate)
@@ -183,12 +206,25 @@ def run():
     def sacct_():
         return sacct()
 
+    @app.route("/manager/sacct/stream", methods=["POST"])
+    @authenticated(ADMINS_GROUP)
+    @csrf_needed
+    @validated(params=SacctStream)
+    def sacct_stream_():
+        return sacct_stream()
+
     @app.route("/manager/scontrol_job")
     @authenticated(ADMINS_GROUP)
     @validated(params=ScontrolJob)
     def scontrol_job_():
         return scontrol_job()
 
+    @app.route("/manager/scontrol_jobs")
+    @authenticated(ADMINS_GROUP)
+    @validated(params=ScontrolJobs)
+    def scontrol_jobs_():
+        return scontrol_jobs()
+
     @app.route("/login")
     @validated(params=Login)
     def login_():
@@ -203,6 +239,11 @@ def run():
     @csrf_needed
     @validated(body=PushLog)
     def push_log():
+        if frontend_logs is not None:
+            if not frontend_logs.submit(request.json['logs']):
+                return {'message': 'Too many log entries are waiting to be written, retry later'}, 429, {'Retry-After': '5'}
+            return {}, 200
+
         for entry in request.json['logs']:
             level, message, extra = parse_log_entry(logger, entry)
             push_log_entry(logger, level, message, extra)
@@ -15,6 +15,7 @@ from typing import Any, Dict
 import app
 import logging
 
+from api.logging import frontend_logs, http_logging
 from awslambda.serverless_wsgi import handle_request
 
 # Initialize as a global to re-use across Lambda invocations
@@ -39,7 +40,12 @@ def lambda_handler(event: Dict[str, Any], context) -> Dict[str, Any]:
             pcluster_manager_api = _init_flask_app()
         # Setting default region to region where lambda function is executed
         os.environ["AWS_DEFAULT_REGION"] = os.environ["AWS_REGION"]
-        return handle_request(pcluster_manager_api, event, context)
+        response = handle_request(pcluster_manager_api, event, context)
+        # the threads writing the logs are frozen along with the container once this returns
+        http_logging.flush()
+        if frontend_logs is not None:
+            frontend_logs.flush()
+        return response
     except Exception as e:
         logging.critical("Unexpected exception: %s", e, exc_info=True)
         raise Exception("Unexpected fatal exception. Please look at API logs for details on the encountered failure.")
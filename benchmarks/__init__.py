@@ -0,0 +1,33 @@
+"""
+Micro-benchmarks for the PCUI backend.
+
+Each module can be run from the root of the project, e.g. `python -m benchmarks.auth_latency`,
+and prints a small latency report on stdout. They do not need AWS credentials.
+"""
+import statistics
+import time
+
+
+def measure(func, iterations):
+    """ Run `func` `iterations` times, returning the latency of every call in milliseconds """
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def report(title, results):
+    """ Print a latency table, `results` maps a scenario name to its latencies in milliseconds """
+    print(title)
+    print(f"{'scenario':<28}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, latencies in results.items():
+        print(f"{name:<28}{statistics.mean(latencies):>10.3f}{percentile(latencies, 50):>10.3f}"
+              f"{percentile(latencies, 99):>10.3f}")
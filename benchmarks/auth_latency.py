@@ -0,0 +1,51 @@
+"""
+Per-request latency of `authenticate()` with and without the verified-token cache.
+
+    python -m benchmarks.auth_latency --iterations 2000
+"""
+import argparse
+import time
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from flask import Flask
+from jose import jwk, jwt
+
+import api.PclusterApiHandler as handler
+from api.security.jwks import JwksKeyStore
+from api.security.token_cache import VerifiedTokenCache
+from benchmarks import measure, report
+
+KID = 'benchmark-kid'
+
+
+def _signed_access_token():
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_pem = private_key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                            serialization.NoEncryption())
+    public_pem = private_key.public_key().public_bytes(serialization.Encoding.PEM,
+                                                       serialization.PublicFormat.SubjectPublicKeyInfo)
+    public_jwk = {**jwk.construct(public_pem, 'RS256').to_dict(), 'kid': KID}
+    claims = {'username': 'benchmark', handler.USER_ROLES_CLAIM: ['admin'], 'exp': int(time.time()) + 3600}
+    return jwt.encode(claims, private_pem, algorithm='RS256', headers={'kid': KID}), public_jwk
+
+
+def run(iterations):
+    token, public_jwk = _signed_access_token()
+    handler.jwks = JwksKeyStore(lambda: {'keys': [public_jwk]})
+    app = Flask(__name__)
+
+    results = {}
+    for name, cache_size in (('without token cache', 0), ('with token cache', 1024)):
+        handler.verified_tokens = VerifiedTokenCache(max_size=cache_size)
+        with app.test_request_context(headers={'Cookie': f'accessToken={token}'}):
+            handler.authenticate({'admin'})  # warm up the JWKS store
+            results[name] = measure(lambda: handler.authenticate({'admin'}), iterations)
+
+    report(f'authenticate() latency over {iterations} requests with the same access token', results)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=2000)
+    run(parser.parse_args().iterations)
@@ -0,0 +1,71 @@
+"""
+Cold start of the backend, phase by phase: every iteration starts a new interpreter, like a new Lambda
+container, and times the imports, `app.run()` and the first requests.
+
+The first /csrf request pays for the PBKDF2 fingerprint unless `--precomputed-fingerprint` is given,
+which sets CSRF_FINGERPRINT as a deployment would.
+
+    python -m benchmarks.cold_start --iterations 20
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks import report
+
+PHASES_SCRIPT = '''
+import json, time
+phases = {}
+start = time.perf_counter()
+import api.PclusterApiHandler
+phases['import PclusterApiHandler'] = time.perf_counter() - start
+start = time.perf_counter()
+import app
+phases['import app'] = time.perf_counter() - start
+start = time.perf_counter()
+flask_app = app.run()
+phases['app.run()'] = time.perf_counter() - start
+client = flask_app.test_client()
+start = time.perf_counter()
+client.get('/manager/get_version')
+phases['first request'] = time.perf_counter() - start
+start = time.perf_counter()
+client.get('/csrf')
+phases['first /csrf request'] = time.perf_counter() - start
+print(json.dumps({name: seconds * 1000 for name, seconds in phases.items()}))
+'''
+
+
+def _cold_start(env):
+    output = subprocess.run([sys.executable, '-c', PHASES_SCRIPT], env=env, check=True, capture_output=True,
+                            text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run(iterations, precomputed_fingerprint):
+    env = {
+        **os.environ,
+        'AWS_DEFAULT_REGION': 'us-east-1',
+        'USER_POOL_ID': 'benchmark-pool',
+        'CLIENT_ID': 'benchmark-client-id',
+        'CLIENT_SECRET': 'benchmark-client-secret',
+    }
+    if precomputed_fingerprint:
+        env['CSRF_FINGERPRINT'] = 'benchmark-fingerprint'
+
+    results = {}
+    for _ in range(iterations):
+        for phase, latency in _cold_start(env).items():
+            results.setdefault(phase, []).append(latency)
+
+    report(f'Cold start phases over {iterations} new interpreters', results)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--precomputed-fingerprint', action='store_true', help='set CSRF_FINGERPRINT')
+    args = parser.parse_args()
+    run(args.iterations, args.precomputed_fingerprint)
@@ -0,0 +1,61 @@
+"""
+Per-request overhead of the request/response logging for a large JSON response (like `get_aws_config`),
+logging full bodies synchronously versus capped bodies, written synchronously or by the `AsyncLogging` thread.
+
+Records are written to a temporary file.
+
+    python -m benchmarks.logging_overhead --iterations 200 --response-kb 2048
+"""
+import argparse
+import logging
+import tempfile
+
+from flask import Flask
+
+from api.logging import RequestResponseLogging
+from api.logging.async_logging import AsyncLogging
+from api.logging.logger import DefaultLogger
+from benchmarks import measure, report
+
+BENCHMARK_LOGGER = 'benchmark'
+
+
+def _app(payload, logger=None, max_body_size=None):
+    app = Flask(__name__)
+    if logger is not None:
+        RequestResponseLogging(logger, app, max_body_size=max_body_size)
+    app.get('/manager/get_aws_config')(lambda: payload)
+    return app
+
+
+def run(iterations, response_kb):
+    payload = {'vpcs': [{'VpcId': f'vpc-{i:08x}', 'CidrBlock': '10.0.0.0/16'} for i in range(response_kb * 1024 // 48)]}
+    with tempfile.NamedTemporaryFile('w') as log_file:
+        parent = logging.getLogger(BENCHMARK_LOGGER)
+        parent.addHandler(logging.FileHandler(log_file.name))
+        parent.propagate = False
+        async_logging = AsyncLogging(f'{BENCHMARK_LOGGER}.async')
+        async_logging.start()
+
+        scenarios = {
+            'no logging': _app(payload),
+            'full bodies, sync': _app(payload, DefaultLogger(False, name=f'{BENCHMARK_LOGGER}.sync')),
+            'capped bodies, sync': _app(payload, DefaultLogger(False, name=f'{BENCHMARK_LOGGER}.sync'), 8 * 1024),
+            'capped bodies, async': _app(payload, DefaultLogger(False, name=async_logging.name), 8 * 1024),
+        }
+        results = {}
+        for name, app in scenarios.items():
+            client = app.test_client()
+            results[name] = measure(lambda: client.get('/manager/get_aws_config'), iterations)
+            async_logging.flush(timeout=60)
+        async_logging.stop()
+
+    report(f'Request latency with a {response_kb} KB JSON response over {iterations} requests', results)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--response-kb', type=int, default=2048)
+    args = parser.parse_args()
+    run(args.iterations, args.response_kb)
@@ -0,0 +1,99 @@
+"""
+Latency of the requests proxied to the ParallelCluster API, with a new connection per request
+(module-level `requests` functions) versus the kept-alive connections of `HttpSessionPool`.
+
+The API is replaced by a local stub server, served over TLS unless `--plain-http` is given.
+
+    python -m benchmarks.proxy_latency --iterations 500
+"""
+import argparse
+import datetime
+import os
+import ssl
+import tempfile
+import threading
+import warnings
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from urllib3.exceptions import InsecureRequestWarning
+
+from api.aws.sessions import HttpSessionPool
+from benchmarks import measure, report
+
+RESPONSE_BODY = b'{"clusters": []}'
+
+
+class StubApiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(RESPONSE_BODY)))
+        self.end_headers()
+        self.wfile.write(RESPONSE_BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+def _self_signed_certificate(directory):
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'localhost')])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    certificate = (
+        x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+        .serial_number(x509.random_serial_number()).not_valid_before(now)
+        .not_valid_after(now + datetime.timedelta(days=1)).sign(key, hashes.SHA256())
+    )
+    cert_file, key_file = os.path.join(directory, 'cert.pem'), os.path.join(directory, 'key.pem')
+    with open(cert_file, 'wb') as f:
+        f.write(certificate.public_bytes(serialization.Encoding.PEM))
+    with open(key_file, 'wb') as f:
+        f.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                  serialization.NoEncryption()))
+    return cert_file, key_file
+
+
+def _start_stub_server(tls, directory):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubApiHandler)
+    scheme = 'http'
+    if tls:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(*_self_signed_certificate(directory))
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        scheme = 'https'
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'{scheme}://127.0.0.1:{server.server_port}'
+
+
+def run(iterations, tls):
+    warnings.simplefilter('ignore', InsecureRequestWarning)
+    with tempfile.TemporaryDirectory() as directory:
+        server, base_url = _start_stub_server(tls, directory)
+        url = f'{base_url}/prod/v3/clusters'
+        pool = HttpSessionPool()
+        try:
+            results = {
+                'connection per request': measure(lambda: requests.get(url, timeout=30, verify=False), iterations),
+                'pooled session': measure(lambda: pool.get(url, timeout=30, verify=False), iterations),
+            }
+        finally:
+            pool.close()
+            server.shutdown()
+
+    report(f'Proxied request latency over {iterations} requests to a local {"TLS " if tls else ""}stub API', results)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=500)
+    parser.add_argument('--plain-http', action='store_true', help='serve the stub API without TLS')
+    args = parser.parse_args()
+    run(args.iterations, tls=not args.plain_http)
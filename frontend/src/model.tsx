@@ -799,6 +799,10 @@ function QueueStatus(
       if (response.status === 200) {
         console.log(response.data)
         setState(['clusters', 'index', clusterName, 'jobs'], response.data.jobs)
+        setState(
+          ['clusters', 'index', clusterName, 'jobsSnapshotTime'],
+          response.data.snapshot_time,
+        )
         successCallback && successCallback(response.data)
       }
     })
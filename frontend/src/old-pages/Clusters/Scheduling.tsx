@@ -61,6 +61,24 @@ const ValueWithLabel = ({
   </div>
 )
 
+function SnapshotAge({snapshotTime}: {snapshotTime: string}) {
+  const {t} = useTranslation()
+  const [now, setNow] = React.useState(Date.now())
+
+  React.useEffect(() => {
+    const timerId = setInterval(() => setNow(Date.now()), 1000)
+    return () => {
+      clearInterval(timerId)
+    }
+  }, [])
+
+  const seconds = Math.max(
+    0,
+    Math.round((now - Date.parse(snapshotTime)) / 1000),
+  )
+  return <span>{t('cluster.scheduling.snapshotAge', {seconds})}</span>
+}
+
 function refreshQueues(callback?: (arg: any) => void) {
   const clusterName = getState(['app', 'clusters', 'selected'])
   const region = getState(['aws', 'region'])
@@ -270,6 +288,10 @@ export default function ClusterScheduling() {
     clusterName,
     'jobs',
   ])
+  const jobsSnapshotTime: string = useState([
+    ...clusterPath,
+    'jobsSnapshotTime',
+  ])
   const defaultRegion = useState(['aws', 'region'])
   const region = useState(['app', 'selectedRegion']) || defaultRegion
 
@@ -364,7 +386,15 @@ export default function ClusterScheduling() {
             {...collectionProps}
             trackBy="job_id"
             header={
-              <Header variant="h3" counter={jobs && `(${jobs.length})`}>
+              <Header
+                variant="h3"
+                counter={jobs && `(${jobs.length})`}
+                description={
+                  jobsSnapshotTime && (
+                    <SnapshotAge snapshotTime={jobsSnapshotTime} />
+                  )
+                }
+              >
                 {t('cluster.scheduling.tableTitle')}
               </Header>
             }